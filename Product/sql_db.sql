@@ -72,4 +72,90 @@ CREATE TABLE features (
 );
 
 ALTER TABLE milestones
-ADD COLUMN progress INTEGER DEFAULT 0 CHECK (progress >= 0 AND progress <= 100);
\ No newline at end of file
+ADD COLUMN progress INTEGER DEFAULT 0 CHECK (progress >= 0 AND progress <= 100);
+-- Response cache keys for generated roadmaps / milestone plans (app/core/cache.py)
+ALTER TABLE roadmaps ADD COLUMN IF NOT EXISTS cache_key VARCHAR(64);
+CREATE INDEX IF NOT EXISTS ix_roadmaps_cache_key ON roadmaps (cache_key);
+ALTER TABLE milestone_plans ADD COLUMN IF NOT EXISTS cache_key VARCHAR(64);
+CREATE INDEX IF NOT EXISTS ix_milestone_plans_cache_key ON milestone_plans (cache_key);
+-- Background generation jobs (app/core/jobs.py)
+CREATE TABLE IF NOT EXISTS jobs (
+    id VARCHAR(36) PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed', 'cancelled')),
+    payload JSON NOT NULL,
+    result JSON,
+    error TEXT,
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    expires_at TIMESTAMPTZ
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS ix_jobs_expires_at ON jobs (expires_at);
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS user_id INT REFERENCES users(id) ON DELETE CASCADE;
+CREATE INDEX IF NOT EXISTS ix_jobs_user_id ON jobs (user_id);
+-- Feature dependency graph edges (app/core/dependency_graph.py)
+CREATE TABLE IF NOT EXISTS feature_dependencies (
+    feature_id INT NOT NULL REFERENCES features(id) ON DELETE CASCADE,
+    depends_on_id INT NOT NULL REFERENCES features(id) ON DELETE CASCADE,
+    project_id INT NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    source VARCHAR(20) NOT NULL DEFAULT 'manual' CHECK (source IN ('manual', 'llm')),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (feature_id, depends_on_id),
+    CONSTRAINT ck_feature_dependencies_not_self CHECK (feature_id <> depends_on_id)
+);
+CREATE INDEX IF NOT EXISTS ix_feature_dependencies_depends_on_id ON feature_dependencies (depends_on_id);
+CREATE INDEX IF NOT EXISTS ix_feature_dependencies_project_id ON feature_dependencies (project_id);
+-- Server-side chat sessions with a rolling summary (app/useage/chat_service.py)
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    id SERIAL PRIMARY KEY,
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    title VARCHAR(255),
+    summary TEXT,
+    summarized_through INT,
+    summary_job_id VARCHAR(36),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS ix_chat_sessions_user_id ON chat_sessions (user_id);
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id SERIAL PRIMARY KEY,
+    session_id INT NOT NULL REFERENCES chat_sessions(id) ON DELETE CASCADE,
+    role VARCHAR(20) NOT NULL CHECK (role IN ('user', 'assistant')),
+    content TEXT NOT NULL,
+    tool_action JSON,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS ix_chat_messages_session_id ON chat_messages (session_id);
+-- Shared token buckets for rate limiting across workers (app/core/ratelimit.py)
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    key VARCHAR(255) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at DOUBLE PRECISION NOT NULL
+);
+-- Revisioned UML documents: JSON Patch deltas with periodic snapshots (app/useage/uml_service.py)
+ALTER TABLE project_uml ADD COLUMN IF NOT EXISTS revision INT NOT NULL DEFAULT 0;
+CREATE TABLE IF NOT EXISTS project_uml_revisions (
+    id SERIAL PRIMARY KEY,
+    uml_id INT NOT NULL REFERENCES project_uml(id) ON DELETE CASCADE,
+    revision INT NOT NULL,
+    patch JSON,
+    snapshot JSON,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT uq_project_uml_revisions_uml_revision UNIQUE (uml_id, revision)
+);
+CREATE INDEX IF NOT EXISTS ix_project_uml_revisions_uml_id ON project_uml_revisions (uml_id);
+-- Generated daily task plans, kept apart from milestone_plans (app/core/cache.py)
+CREATE TABLE IF NOT EXISTS task_plans (
+    id SERIAL PRIMARY KEY,
+    milestones TEXT NOT NULL,
+    tech_stack VARCHAR(255),
+    temperature DOUBLE PRECISION NOT NULL DEFAULT 0.2,
+    content TEXT NOT NULL,
+    cache_key VARCHAR(64),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS ix_task_plans_cache_key ON task_plans (cache_key);
@@ -2,7 +2,9 @@
 
 # Re-exports for convenience
 from .systemDesignLLM import generate_system_design as generate_system_design
+from .systemDesignLLM import agenerate_system_design as agenerate_system_design
 
 __all__ = [
     "generate_system_design",
+    "agenerate_system_design",
 ]
@@ -1,13 +1,13 @@
-import os
 import json
 from typing import Optional, Dict, Any
 
 from langchain.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.tools import tool
 from pydantic import BaseModel, Field
 
-from app.core.config import get_settings
+from app.core.llm import get_chat_model
+from app.core.instrumentation import llm_config
+from app.core.singleflight import coalesce
 
 class DependencyAnalysisOutput(BaseModel):
     new_feature: str = Field(description="The new feature being analyzed.")
@@ -71,18 +71,7 @@ def analyze_feature_dependencies_tool(
     Returns:
         DependencyAnalysisOutput: An object containing the new feature, its dependencies, and reasoning.
     """
-    settings = get_settings()
-    api_key = (settings.api_key or os.getenv("API_KEY") or os.getenv("GOOGLE_API_KEY"))
-    if not api_key:
-        raise RuntimeError(
-            "API key is not set. Please set API_KEY or GOOGLE_API_KEY in your environment/.env."
-        )
-
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
-        temperature=0.2,
-        google_api_key=api_key,
-    )
+    llm = get_chat_model(temperature=0.2)
 
     formatted_prompt = dependency_prompt.format(
         project_name=project_name,
@@ -92,15 +81,18 @@ def analyze_feature_dependencies_tool(
         new_feature=new_feature,
     )
 
-    response = llm.invoke(formatted_prompt)
+    response = llm.invoke(formatted_prompt, config=llm_config("dependencies"))
+    return _parse_dependency_response(response.content)
+
 
+def _parse_dependency_response(content: str) -> DependencyAnalysisOutput:
     try:
-        json_output = json.loads(response.content)
+        json_output = json.loads(content)
         return DependencyAnalysisOutput(**json_output)
     except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse LLM response as JSON: {e}. Response: {response.content}")
+        raise ValueError(f"Failed to parse LLM response as JSON: {e}. Response: {content}")
     except Exception as e:
-        raise ValueError(f"Error creating DependencyAnalysisOutput from LLM response: {e}. Response: {response.content}")
+        raise ValueError(f"Error creating DependencyAnalysisOutput from LLM response: {e}. Response: {content}")
 
 # This function will be the main entry point for using this LLM for dependency analysis
 def get_feature_dependencies(
@@ -126,10 +118,33 @@ def get_feature_dependencies(
     # Directly call the tool function. If this were part of a larger agent system,
     # you might set up an AgentExecutor here, but for a single specific task,
     # direct tool invocation is simpler.
-    return analyze_feature_dependencies_tool(
+    return analyze_feature_dependencies_tool.func(
+        project_name=project_name,
+        features=features,
+        milestones=milestones,
+        tech_stack=tech_stack,
+        new_feature=new_feature,
+    )
+
+
+@coalesce("dependencies")  # identical concurrent analyses share one model call
+async def aget_feature_dependencies(
+    project_name: str,
+    features: str,
+    milestones: str,
+    tech_stack: str,
+    new_feature: str,
+) -> DependencyAnalysisOutput:
+    """Async variant of get_feature_dependencies; awaits the model call."""
+    llm = get_chat_model(temperature=0.2)
+
+    formatted_prompt = dependency_prompt.format(
         project_name=project_name,
         features=features,
         milestones=milestones,
         tech_stack=tech_stack,
         new_feature=new_feature,
-    )
\ No newline at end of file
+    )
+
+    response = await llm.ainvoke(formatted_prompt, config=llm_config("dependencies"))
+    return _parse_dependency_response(response.content)
@@ -1,16 +1,21 @@
-import functools
-from typing import Optional, Dict, Any
-import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Callable, Hashable, Iterator, Tuple
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain.tools import Tool, tool # Import Tool and tool decorator
 from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
 
-from app.core.config import get_settings
-from app.agents.tasksLLM import create_new_task_tool, get_tasks_for_user_by_status_tool # Import the new tool
+from app.core.db import SessionLocal
+from app.core.llm import get_chat_model
+from app.core.instrumentation import llm_config
+from app.core.metrics import metrics
+from app.agents.tasksLLM import create_task, list_tasks_for_user
 
 
 SYSTEM_PROMPT = """
@@ -22,126 +27,203 @@ For general task listing or filtering by status, you can use `get_tasks_for_agen
 For creating tasks, use `create_task_for_agent`.
 """
 
-def chat_with_agent(
-    query: str,
-    current_user_id: int,
-    chat_history: Optional[list] = None,
-) -> Dict[str, Any]:
+# Built once at import; only the model and tools are bound per call.
+PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_PROMPT),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ]
+)
+
+
+@dataclass
+class ChatContext:
+    """Per-turn state the tools share; bound with `chat_context(...)`.
+
+    All tool calls of one agent turn use a single DB session, opened on first
+    use and closed when the turn ends, and reuse each other's read results
+    until a tool writes.
     """
-    Engages in a chat with an AI agent that can use tools.
+    user_id: int
+    _db: Optional[Session] = field(default=None, repr=False)
+    _reads: Dict[Hashable, str] = field(default_factory=dict, repr=False)
+    # The executor may run several sync tools of one step in parallel threads; a Session is not thread-safe
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
-    Args:
-        query (str): The user's current query.
-        current_user_id (int): The ID of the current user, who is assigning the task.
-        chat_history (Optional[list]): A list of previous chat messages (HumanMessage, AIMessage).
+    @contextmanager
+    def session(self) -> Iterator[Session]:
+        with self._lock:
+            if self._db is None:
+                self._db = SessionLocal()
+            yield self._db
 
-    Returns:
-        Dict[str, Any]: A dict with keys:
-            - output: str (the agent's natural language response)
-            - tool_action: Optional[dict] if a recognized tool was invoked (e.g., {"type": "show_task_status", "task_id": int})
+    def read(self, key: Hashable, fetch: Callable[[Session], str]) -> str:
+        """`fetch(db)`, or its result from earlier in this turn."""
+        with self.session() as db:
+            if key in self._reads:
+                metrics.incr("chat.tool_reads.cached")
+                return self._reads[key]
+            metrics.incr("chat.tool_reads.fetched")
+            try:
+                result = self._reads[key] = fetch(db)
+            except Exception:
+                db.rollback()  # keep the shared session usable for the turn's other tools
+                raise
+            return result
+
+    def write(self, apply: Callable[[Session], str]) -> str:
+        """`apply(db)`; drops cached reads, which may now be stale."""
+        with self.session() as db:
+            self._reads.clear()
+            return apply(db)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self._reads.clear()
+
+
+metrics.define_rate("chat.tool_reads.cached_rate", "chat.tool_reads.cached", "chat.tool_reads.fetched")
+
+_CHAT_CONTEXT: ContextVar[Optional[ChatContext]] = ContextVar("chat_context", default=None)
+
+
+@contextmanager
+def chat_context(user_id: int) -> Iterator[ChatContext]:
+    """Bind the current user for tool calls made while the block runs.
+
+    ContextVars follow the request across awaits and into the executor threads
+    LangChain uses for sync tools, so concurrent requests never see each other's user.
     """
-    settings = get_settings()
-    api_key = (settings.api_key or os.getenv("API_KEY") or os.getenv("GOOGLE_API_KEY"))
-    if not api_key:
-        raise RuntimeError(
-            "API key is not set. Please set API_KEY or GOOGLE_API_KEY in your environment/.env."
-        )
+    ctx = ChatContext(user_id=user_id)
+    token = _CHAT_CONTEXT.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _CHAT_CONTEXT.reset(token)
+        ctx.close()
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
-        temperature=0.2,
-        google_api_key=api_key,
-    )
 
-    @tool
-    def create_task_for_agent(
-        description: str,
-        project_id: int,
-        user_id: int,  # Assignee
-        task_type: str = "development",
-        status: str = "todo",
-        eta: Optional[str] = None, # ISO 8601 format string
-    ) -> str:
-        """
-        Creates a new task assignment in the database.
-
-        Args:
-            description (str): A detailed description of the task.
-            project_id (int): The ID of the project the task belongs to.
-            user_id (int): The ID of the user to whom the task is assigned.
-            task_type (str, optional): The type of task (e.g., "development", "bug", "research"). Defaults to "development".
-            status (str, optional): The current status of the task (e.g., "todo", "in progress", "completed"). Defaults to "todo".
-            eta (Optional[str], optional): The estimated time of arrival/completion for the task in ISO 8601 format (e.g., "2025-12-31T23:59:59").
-        Returns:
-            str: A confirmation message indicating whether the task was created successfully.
-        """
-        return create_new_task_tool.func(
+def current_chat_context() -> ChatContext:
+    ctx = _CHAT_CONTEXT.get()
+    if ctx is None:
+        raise RuntimeError("Chat tools called outside chat_context()")
+    return ctx
+
+
+@tool
+def create_task_for_agent(
+    description: str,
+    project_id: int,
+    user_id: int,  # Assignee
+    task_type: str = "development",
+    status: str = "todo",
+    eta: Optional[str] = None, # ISO 8601 format string
+) -> str:
+    """
+    Creates a new task assignment in the database.
+
+    Args:
+        description (str): A detailed description of the task.
+        project_id (int): The ID of the project the task belongs to.
+        user_id (int): The ID of the user to whom the task is assigned.
+        task_type (str, optional): The type of task (e.g., "development", "bug", "research"). Defaults to "development".
+        status (str, optional): The current status of the task (e.g., "todo", "in progress", "completed"). Defaults to "todo".
+        eta (Optional[str], optional): The estimated time of arrival/completion for the task in ISO 8601 format (e.g., "2025-12-31T23:59:59").
+    Returns:
+        str: A confirmation message indicating whether the task was created successfully.
+    """
+    ctx = current_chat_context()
+    return ctx.write(
+        lambda db: create_task(
+            db,
             description=description,
             project_id=project_id,
             user_id=user_id,
-            assigned_by_user_id=current_user_id, # Use the captured current_user_id
+            assigned_by_user_id=ctx.user_id,
             task_type=task_type,
             status=status,
             eta=eta,
         )
+    )
 
-    @tool
-    def get_tasks_for_agent(
-        status: Optional[str] = None,
-    ) -> str:
-        """
-        Retrieves a list of tasks assigned to the current user, optionally filtered by status.
-
-        Args:
-            status (Optional[str], optional): The status of the tasks to filter by (e.g., "todo", "in progress", "completed").
-                                              If None, retrieves tasks with "todo" or "in progress" status.
-        Returns:
-            str: A formatted string listing the tasks, or a message if no tasks are found.
-        """
-        return get_tasks_for_user_by_status_tool.func(
-            user_id=current_user_id,
-            status=status,
+
+@tool
+def get_tasks_for_agent(
+    status: Optional[str] = None,
+    offset: int = 0,
+) -> str:
+    """
+    Retrieves a page of tasks assigned to the current user, optionally filtered by status.
+
+    Args:
+        status (Optional[str], optional): The status of the tasks to filter by (e.g., "todo", "in progress", "completed").
+                                          If None, retrieves tasks with "todo" or "in progress" status.
+        offset (int, optional): How many tasks to skip; use the offset given at the end of the previous page.
+    Returns:
+        str: Task counts per status and one page of tasks, or a message if no tasks are found.
+    """
+    ctx = current_chat_context()
+    try:
+        return ctx.read(
+            ("tasks", status, offset),
+            lambda db: list_tasks_for_user(db, ctx.user_id, status, offset=offset),
         )
+    except Exception as e:
+        return f"Failed to retrieve tasks: {e}"
 
-    @tool
-    def show_task_status(task_id: int) -> str:
-        """
-        Use this when the user asks for the status of a specific task by id (e.g., "what is the status of task 21").
-        This tool should be called by the LLM to indicate the frontend should display the task status UI.
-
-        Args:
-            task_id (int): The ID of the task the user referenced.
-
-        Returns:
-            str: A short acknowledgement. The server will capture the tool call and send structured metadata to the client.
-        """
-        # We don't perform DB access here; the frontend will fetch and render the task.
-        return f"Show status for task {task_id} for user {current_user_id}"
-
-    tools = [create_task_for_agent, get_tasks_for_agent, show_task_status] # Register the new tool
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", SYSTEM_PROMPT),
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("human", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ]
-    )
 
-    agent = create_tool_calling_agent(llm, tools, prompt)
-    # return_intermediate_steps=True lets us inspect tool invocations
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True, return_intermediate_steps=True)
+@tool
+def show_task_status(task_id: int) -> str:
+    """
+    Use this when the user asks for the status of a specific task by id (e.g., "what is the status of task 21").
+    This tool should be called by the LLM to indicate the frontend should display the task status UI.
+
+    Args:
+        task_id (int): The ID of the task the user referenced.
+
+    Returns:
+        str: A short acknowledgement. The server will capture the tool call and send structured metadata to the client.
+    """
+    # We don't perform DB access here; the frontend will fetch and render the task.
+    return f"Show status for task {task_id} for user {current_chat_context().user_id}"
 
-    if chat_history is None:
-        chat_history = []
 
-    response = agent_executor.invoke(
-        {
-            "input": query,
-            "chat_history": chat_history,
-        }
-    )
+TOOLS = [create_task_for_agent, get_tasks_for_agent, show_task_status]
+
+# (llm, executor) for the current chat model; rebuilt only if get_chat_model hands out a new one
+_EXECUTOR: Optional[Tuple[Any, AgentExecutor]] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _build_agent_executor(llm) -> AgentExecutor:
+    agent = create_tool_calling_agent(llm, TOOLS, PROMPT)
+    # return_intermediate_steps=True lets us inspect tool invocations; verbose stays off
+    # so the hot path doesn't print every step to stdout
+    return AgentExecutor(agent=agent, tools=TOOLS, verbose=False, return_intermediate_steps=True)
+
+
+def get_agent_executor() -> AgentExecutor:
+    """The tool-calling agent, built once per process rather than per message."""
+    global _EXECUTOR
+    llm = get_chat_model(temperature=0.2)
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None or _EXECUTOR[0] is not llm:
+            _EXECUTOR = (llm, _build_agent_executor(llm))
+        return _EXECUTOR[1]
+
+
+def clear_agent_executor() -> None:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        _EXECUTOR = None
+
+
+def _to_result(response: Dict[str, Any], current_user_id: int) -> Dict[str, Any]:
     output_text = response.get("output", "")
 
     tool_action: Optional[Dict[str, Any]] = None
@@ -169,3 +251,51 @@ def chat_with_agent(
 
     return {"output": output_text, "tool_action": tool_action}
 
+
+def chat_with_agent(
+    query: str,
+    current_user_id: int,
+    chat_history: Optional[list] = None,
+) -> Dict[str, Any]:
+    """
+    Engages in a chat with an AI agent that can use tools.
+
+    Args:
+        query (str): The user's current query.
+        current_user_id (int): The ID of the current user, who is assigning the task.
+        chat_history (Optional[list]): A list of previous chat messages (HumanMessage, AIMessage).
+
+    Returns:
+        Dict[str, Any]: A dict with keys:
+            - output: str (the agent's natural language response)
+            - tool_action: Optional[dict] if a recognized tool was invoked (e.g., {"type": "show_task_status", "task_id": int})
+    """
+    with chat_context(current_user_id):
+        response = get_agent_executor().invoke(
+            {
+                "input": query,
+                "chat_history": chat_history or [],
+            },
+            config=llm_config("chat"),
+        )
+    return _to_result(response, current_user_id)
+
+
+async def achat_with_agent(
+    query: str,
+    current_user_id: int,
+    chat_history: Optional[list] = None,
+) -> Dict[str, Any]:
+    """Async variant of chat_with_agent; same arguments and return shape.
+
+    Model calls are awaited; the synchronous DB tools run in LangChain's executor threads.
+    """
+    with chat_context(current_user_id):
+        response = await get_agent_executor().ainvoke(
+            {
+                "input": query,
+                "chat_history": chat_history or [],
+            },
+            config=llm_config("chat"),
+        )
+    return _to_result(response, current_user_id)
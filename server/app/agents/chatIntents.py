@@ -0,0 +1,168 @@
+"""Rule-based fast path in front of the chat agent.
+
+Simple commands ("status of task 21", "show my todo tasks") are matched by a
+small regex grammar and answered straight from the database, skipping the
+tool-calling LLM loop. Anything that doesn't match exactly one intent, or
+that asks for a write ("create", "assign", ...), falls through to the agent.
+
+Add an intent with `GRAMMAR.register(name, patterns, resolver)`; patterns are
+full-matched against the normalised query and their named groups become the
+resolver's params.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Pattern, Sequence
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.agents.tasksLLM import list_tasks_for_user
+from app.core.metrics import metrics
+from app.models.taskassignment import TaskAssignment
+
+
+@dataclass
+class Intent:
+    name: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+# resolver(params, user_id, db) -> {"output": str, "tool_action": Optional[dict]}
+IntentResolver = Callable[[Dict[str, Any], int, Session], Dict[str, Any]]
+
+# Polite/filler prefixes and suffixes stripped before matching
+_PREFIX = re.compile(
+    r"^(?:(?:hey|hi|ok|okay|please|pls|kindly|can you|could you|would you|will you|"
+    r"show me|show|tell me|give me|get me|get|list|check|display|fetch|what(?:'s| is| are)|"
+    r"i want to see|i'd like to see|let me see)\s+)+"
+)
+_SUFFIX = re.compile(r"(?:\s+(?:please|pls|thanks|thank you|now))+$")
+# Words that mean the user wants something the fast path can't do
+_VETO = re.compile(r"\b(?:create|add|new|assign|update|change|set|delete|remove|move|mark|why|how many|and|or|but)\b")
+
+# Synonym -> TaskAssignment.status (see ALLOWED_STATUS in routes/task_assignments.py)
+STATUS_SYNONYMS = {
+    "todo": "todo",
+    "to do": "todo",
+    "to-do": "todo",
+    "in progress": "in progress",
+    "in-progress": "in progress",
+    "ongoing": "in progress",
+    "active": "in progress",
+    "assigned": "assigned",
+    "done": "done",
+    "completed": "done",
+    "complete": "done",
+    "finished": "done",
+    "approved": "approved",
+    "sent for approval": "sent for approval",
+    "awaiting approval": "sent for approval",
+    "pending approval": "sent for approval",
+}
+_STATUS = "|".join(sorted((re.escape(s) for s in STATUS_SYNONYMS), key=len, reverse=True))
+
+
+def normalize(query: str) -> str:
+    text = query.strip().lower()
+    text = re.sub(r"[?!.,;:]+$", "", text)
+    text = re.sub(r"\s+", " ", text)
+    text = _SUFFIX.sub("", text)
+    return _PREFIX.sub("", text).strip()
+
+
+class IntentGrammar:
+    def __init__(self) -> None:
+        self._rules: List[tuple] = []  # (name, [compiled patterns], resolver)
+
+    def register(self, name: str, patterns: Sequence[str], resolver: IntentResolver) -> None:
+        compiled: List[Pattern] = [re.compile(p) for p in patterns]
+        self._rules.append((name, compiled, resolver))
+
+    def classify(self, query: str) -> Optional[Intent]:
+        """Return the single intent the query matches, or None if zero or several match."""
+        text = normalize(query)
+        if not text or _VETO.search(text):
+            return None
+        matches = []
+        for name, patterns, _ in self._rules:
+            for pattern in patterns:
+                m = pattern.fullmatch(text)
+                if m:
+                    params = {k: v for k, v in m.groupdict().items() if v is not None}
+                    matches.append(Intent(name, params))
+                    break
+        if len(matches) != 1:
+            return None  # ambiguous: let the LLM decide
+        return matches[0]
+
+    def resolve(self, intent: Intent, user_id: int, db: Session) -> Dict[str, Any]:
+        for name, _, resolver in self._rules:
+            if name == intent.name:
+                return resolver(intent.params, user_id, db)
+        raise KeyError(intent.name)
+
+
+# ---------- resolvers ----------
+def _show_task_status(params: Dict[str, Any], user_id: int, db: Session) -> Dict[str, Any]:
+    task_id = int(params["task_id"])
+    # Only tasks assigned to or by the user; anyone else's task reads as missing
+    task = (
+        db.query(TaskAssignment)
+        .filter(
+            TaskAssignment.id == task_id,
+            or_(TaskAssignment.user_id == user_id, TaskAssignment.assigned_by == user_id),
+        )
+        .first()
+    )
+    if task is None:
+        return {"output": f"I couldn't find task {task_id}.", "tool_action": None}
+    return {
+        "output": f"Task {task_id} is {task.status or 'unknown'}.",
+        "tool_action": {"type": "show_task_status", "task_id": task_id, "user_id": user_id},
+    }
+
+
+def _get_tasks(params: Dict[str, Any], user_id: int, db: Session) -> Dict[str, Any]:
+    status = STATUS_SYNONYMS.get(params.get("status", ""))
+    return {"output": list_tasks_for_user(db, user_id, status), "tool_action": None}
+
+
+_TASK_REF = r"task(?: id| number| no\.?)? ?#?(?P<task_id>\d+)"
+
+GRAMMAR = IntentGrammar()
+GRAMMAR.register(
+    "show_task_status",
+    [
+        rf"(?:the )?(?:current )?status (?:of |for )?(?:the )?{_TASK_REF}",
+        rf"{_TASK_REF}(?:'s)? status",
+        rf"(?:how is|where is|where are we (?:on|with)) {_TASK_REF}(?: going| at)?",
+        rf"{_TASK_REF}",
+    ],
+    _show_task_status,
+)
+GRAMMAR.register(
+    "get_tasks_for_agent",
+    [
+        rf"(?:all )?(?:of )?(?:my )?(?:(?P<status>{_STATUS}) )?(?:tasks|todos|to-dos)",
+        rf"(?:all )?(?:of )?(?:my )?(?:tasks|todos) (?:that are |which are |with status |in status )?(?P<status>{_STATUS})",
+        r"what (?:am i|should i be) working on",
+    ],
+    _get_tasks,
+)
+
+
+metrics.define_rate("chat.fast_path.hit_rate", "chat.fast_path.hits", "chat.fast_path.misses")
+
+
+def try_fast_path(query: str, user_id: int, db: Session) -> Optional[Dict[str, Any]]:
+    """Answer `query` without the LLM if the grammar recognises it, else return None."""
+    intent = GRAMMAR.classify(query)
+    if intent is None:
+        metrics.incr("chat.fast_path.misses")
+        return None
+    result = GRAMMAR.resolve(intent, user_id, db)
+    metrics.incr("chat.fast_path.hits")
+    metrics.incr(f"chat.fast_path.intent.{intent.name}")
+    return result
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from typing import List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from app.core.llm import get_chat_model
+from app.core.instrumentation import llm_config
+
+
+SYSTEM_PROMPT = """
+You maintain a running summary of a conversation between a user and a project-management assistant.
+Merge the new turns into the existing summary.
+
+Keep:
+- facts the assistant may need later: task, project and feature IDs, names, statuses, dates, decisions
+- open questions and anything the user asked to be done
+
+Drop greetings, pleasantries and tool chatter. Write plain prose or short bullets, at most {max_words} words.
+Output only the updated summary.
+"""
+
+# Built once at import; only the model varies per call.
+PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_PROMPT),
+        (
+            "user",
+            """
+Existing summary:
+{summary}
+
+New turns:
+{turns}
+
+Updated summary:
+""".strip(),
+        ),
+    ]
+)
+_PARSER = StrOutputParser()
+
+
+def _chain(temperature: float):
+    return PROMPT | get_chat_model(temperature) | _PARSER
+
+
+def _inputs(summary: Optional[str], turns: Sequence[BaseMessage], max_words: int) -> dict:
+    lines: List[str] = []
+    for message in turns:
+        speaker = "User" if message.type == "human" else "Assistant"
+        lines.append(f"{speaker}: {message.content}")
+    return {
+        "summary": (summary or "(none yet)").strip(),
+        "turns": "\n".join(lines),
+        "max_words": max_words,
+    }
+
+
+async def asummarize_chat(
+    summary: Optional[str],
+    turns: Sequence[BaseMessage],
+    *,
+    max_words: int = 200,
+    temperature: float = 0.0,
+) -> str:
+    """Fold `turns` into `summary` and return the new rolling summary."""
+    text = await _chain(temperature).ainvoke(_inputs(summary, turns, max_words), config=llm_config("chat_summary"))
+    return text.strip()
@@ -1,15 +1,18 @@
-import functools
+import json
+import logging
+import re
 from typing import Optional, Dict, Any, List
-import os
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.agents import AgentExecutor, create_tool_calling_agent
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain.tools import Tool, tool
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 
-from app.core.config import get_settings
+from app.core.llm import get_chat_model
+from app.core.instrumentation import llm_config
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 class FeatureBreakdown(BaseModel):
     frontend_tasks: List[str] = Field(description="List of tasks related to frontend development.")
@@ -24,86 +27,161 @@ Consider frontend, backend, database, and security aspects.
 Provide a comprehensive list of tasks for each category.
 """
 
+# Built once at import; only the model varies per call.
+PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_PROMPT),
+        ("human", "Break down the following feature: {feature}"),
+    ]
+)
+
+# Other names the model uses for each field, lower-cased, without separators or a "tasks" suffix
+_FIELD_ALIASES = {
+    "frontend_tasks": ("ui", "client"),
+    "backend_tasks": ("api", "server"),
+    "database_tasks": ("db", "data", "schema"),
+    "security_tasks": ("auth", "authentication"),
+    "other_tasks": ("misc", "miscellaneous", "general", "testing", "devops"),
+}
+_ALIAS_TO_FIELD = {alias: name for name, aliases in _FIELD_ALIASES.items() for alias in aliases}
+
+
+class _ModelCallCounter(BaseCallbackHandler):
+    """Counts model round trips so calls-per-breakdown shows up on /metrics."""
+
+    def on_chat_model_start(self, serialized, messages, **kwargs) -> None:
+        metrics.incr("feature_breakdown.llm_calls")
+
+    def on_llm_start(self, serialized, prompts, **kwargs) -> None:
+        metrics.incr("feature_breakdown.llm_calls")
+
+
+_CALL_COUNTER = _ModelCallCounter()
+
+
+def _chain():
+    # One schema-constrained call; include_raw keeps the raw message for local repair
+    structured = get_chat_model(temperature=0.2).with_structured_output(FeatureBreakdown, include_raw=True)
+    return PROMPT | structured
+
+
 def breakdown_feature(
     feature_description: str,
 ) -> FeatureBreakdown:
-    settings = get_settings()
-    api_key = (settings.api_key or os.getenv("API_KEY") or os.getenv("GOOGLE_API_KEY"))
-    if not api_key:
-        raise RuntimeError(
-            "API key is not set. Please set API_KEY or GOOGLE_API_KEY in your environment/.env."
-        )
-
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
-        temperature=0.2,
-        google_api_key=api_key,
-    )
-
-    @tool
-    def get_feature_breakdown(feature: str) -> FeatureBreakdown:
-        """
-        Breaks down a given software feature into detailed tasks across different development domains: frontend, backend, database, and security.
-        """
-        # This function will be called by the LLM to structure its output.
-        # The actual breakdown logic is handled by the LLM's reasoning based on the SYSTEM_PROMPT.
-        # We return an empty FeatureBreakdown here as a placeholder; the LLM will fill it.
+    metrics.incr("feature_breakdown.requests")
+    result = _chain().invoke({"feature": feature_description}, config=llm_config("feature_breakdown", [_CALL_COUNTER]))
+    return _extract_breakdown(result)
+
+
+async def abreakdown_feature(
+    feature_description: str,
+) -> FeatureBreakdown:
+    """Async variant of breakdown_feature."""
+    metrics.incr("feature_breakdown.requests")
+    result = await _chain().ainvoke({"feature": feature_description}, config=llm_config("feature_breakdown", [_CALL_COUNTER]))
+    return _extract_breakdown(result)
+
+
+def _extract_breakdown(result: Dict[str, Any]) -> FeatureBreakdown:
+    """Use the parsed output if valid, else repair the raw message without another model call."""
+    parsed = result.get("parsed")
+    if isinstance(parsed, FeatureBreakdown):
+        return parsed
+
+    metrics.incr("feature_breakdown.repaired")
+    repaired = repair_breakdown(result.get("raw"))
+    if repaired is None:
+        logger.warning(f"Could not repair feature breakdown output: {result.get('parsing_error')}")
+        metrics.incr("feature_breakdown.failed")
         return FeatureBreakdown(frontend_tasks=[], backend_tasks=[], database_tasks=[], security_tasks=[], other_tasks=[])
+    return repaired
+
 
-    tools = [get_feature_breakdown]
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", SYSTEM_PROMPT),
-            ("human", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ]
-    )
-
-    agent = create_tool_calling_agent(llm, tools, prompt)
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
-
-    response = agent_executor.invoke(
-        {
-            "input": f"Break down the following feature: {feature_description}",
-        }
-    )
-    
-    # The response should contain the structured output from the tool call
-    # We need to extract the FeatureBreakdown object from the tool's output
-    # This part might need adjustment based on how AgentExecutor returns tool outputs
-    # For now, let's assume the output directly contains the FeatureBreakdown if the tool was called.
-    # If not, we might need to parse `response["output"]` or `response["intermediate_steps"]`
-    
-    # A more robust way to get the tool output:
-    # Check if the agent actually called the tool and extract its output
-    for step in response.get("intermediate_steps", []):
-        if isinstance(step, tuple) and len(step) == 2:
-            action, observation = step
-            if hasattr(action, 'tool') and action.tool == 'get_feature_breakdown':
-                # Assuming observation is the direct output of the tool (FeatureBreakdown object)
-                # This might need more sophisticated parsing if observation is a string representation
-                if isinstance(observation, FeatureBreakdown):
-                    return observation
-                elif isinstance(observation, str):
-                    # If observation is a string, try to parse it as JSON into FeatureBreakdown
-                    try:
-                        import json
-                        parsed_output = json.loads(observation)
-                        return FeatureBreakdown(**parsed_output)
-                    except json.JSONDecodeError:
-                        pass # Fall through if parsing fails
-
-    # Fallback if tool output is not directly captured or parsed
-    # This might happen if the LLM decides not to call the tool or if parsing fails
-    # In a real scenario, you might want to refine the prompt or agent to ensure tool usage.
-    print("Warning: Could not extract FeatureBreakdown directly from tool output. Attempting to parse final output.")
+# ---------- local repair ----------
+def repair_breakdown(raw: Optional[BaseMessage]) -> Optional[FeatureBreakdown]:
+    """Salvage a FeatureBreakdown from tool-call args or free text; None if nothing usable."""
+    if raw is None:
+        return None
+    candidates: List[Any] = [call.get("args") for call in getattr(raw, "tool_calls", None) or []]
+    content = raw.content if isinstance(raw.content, str) else json.dumps(raw.content)
+    data = _loads_lenient(content)
+    if data is not None:
+        candidates.append(data)
+
+    for candidate in candidates:
+        breakdown = _coerce(candidate)
+        if breakdown is not None:
+            return breakdown
+    return _from_markdown(content)
+
+
+def _loads_lenient(text: str) -> Optional[Any]:
+    """json.loads after stripping code fences, surrounding prose and trailing commas."""
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    body = re.sub(r",\s*([}\]])", r"\1", text[start:end + 1])
     try:
-        import json
-        # Attempt to parse the final output as JSON, assuming the LLM might just output the JSON directly
-        parsed_output = json.loads(response.get("output", "{}"))
-        return FeatureBreakdown(**parsed_output)
+        return json.loads(body)
     except json.JSONDecodeError:
-        print("Error: Could not parse final output as JSON. Returning empty breakdown.")
-        return FeatureBreakdown(frontend_tasks=[], backend_tasks=[], database_tasks=[], security_tasks=[], other_tasks=[])
+        return None
+
+
+def _as_tasks(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        # "a\n- b" or "a; b" -> ["a", "b"]
+        parts = re.split(r"\n|;", value)
+        return [p.strip(" -*\t") for p in parts if p.strip(" -*\t")]
+    if isinstance(value, dict):
+        return [task for item in value.values() for task in _as_tasks(item)]
+    if isinstance(value, (list, tuple)):
+        return [task for item in value for task in _as_tasks(item)]
+    return [str(value)]
+
+
+def _field_for(key: str) -> Optional[str]:
+    """Map "Frontend Tasks", "frontend" or "UI" to "frontend_tasks"."""
+    compact = re.sub(r"[^a-z]", "", key.lower())
+    if compact.endswith("tasks"):
+        compact = compact[: -len("tasks")]
+    if f"{compact}_tasks" in FeatureBreakdown.model_fields:
+        return f"{compact}_tasks"
+    return _ALIAS_TO_FIELD.get(compact)
+
+
+def _coerce(data: Any) -> Optional[FeatureBreakdown]:
+    if not isinstance(data, dict):
+        return None
+    if len(data) == 1 and isinstance(next(iter(data.values())), dict):
+        data = next(iter(data.values()))  # {"FeatureBreakdown": {...}}
+    fields: Dict[str, List[str]] = {name: [] for name in FeatureBreakdown.model_fields}
+    matched = False
+    for key, value in data.items():
+        name = _field_for(str(key))
+        if name is None:
+            continue
+        matched = True
+        fields[name].extend(_as_tasks(value))
+    return FeatureBreakdown(**fields) if matched else None
+
 
+def _from_markdown(text: str) -> Optional[FeatureBreakdown]:
+    """Headings ("## Frontend", "**Backend Tasks:**") followed by bullet lists."""
+    fields: Dict[str, List[str]] = {name: [] for name in FeatureBreakdown.model_fields}
+    current: Optional[str] = None
+    matched = False
+    for line in text.splitlines():
+        stripped = line.strip()
+        bullet = re.match(r"^(?:[-*•]|\d+[.)])\s+(.*)$", stripped)
+        if bullet and current is not None:
+            fields[current].append(bullet.group(1).strip())
+            continue
+        heading = re.sub(r"[#*:_`]", "", stripped).strip()
+        if heading and not bullet:
+            name = _field_for(heading)
+            if name is not None:
+                current, matched = name, True
+    return FeatureBreakdown(**fields) if matched else None
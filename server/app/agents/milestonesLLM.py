@@ -1,13 +1,12 @@
 from __future__ import annotations
 
-import os
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
-from app.core.config import get_settings
+from app.core.llm import get_chat_model
+from app.core.instrumentation import llm_config
 
 
 SYSTEM_PROMPT = """
@@ -40,6 +39,43 @@ Strictly follow this output structure in clean markdown:
 """
 
 
+# Bump when the prompt changes so cached generations (app.core.cache) are not reused.
+PROMPT_VERSION = "1"
+
+# Prompt and parser are built once at import; only the model varies per call.
+PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_PROMPT),
+        (
+            "user",
+            (
+                """
+Requirements:
+{requirements}
+
+Tech Stack (optional):
+{tech_stack}
+
+Please extract features and produce milestones now.
+"""
+            ).strip(),
+        ),
+    ]
+)
+_PARSER = StrOutputParser()
+
+
+def _chain(temperature: float):
+    return PROMPT | get_chat_model(temperature) | _PARSER
+
+
+def _inputs(requirements: str, tech_stack: Optional[str]) -> dict:
+    return {
+        "requirements": requirements.strip(),
+        "tech_stack": (tech_stack or "N/A").strip(),
+    }
+
+
 def generate_milestones(
     requirements: str,
     tech_stack: Optional[str] = None,
@@ -50,43 +86,25 @@ def generate_milestones(
 
     Uses Google Gemini via LangChain when an API key is present.
     """
-    settings = get_settings()
-    api_key = (settings.api_key or os.getenv("API_KEY") or os.getenv("GOOGLE_API_KEY"))
-    if not api_key:
-        raise RuntimeError(
-            "API key is not set. Please set API_KEY or GOOGLE_API_KEY in your environment/.env."
-        )
-
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
-        temperature=temperature,
-        google_api_key=api_key,
-    )
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", SYSTEM_PROMPT),
-            (
-                "user",
-                (
-                    """
-Requirements:
-{requirements}
+    return _chain(temperature).invoke(_inputs(requirements, tech_stack), config=llm_config("milestones"))
 
-Tech Stack (optional):
-{tech_stack}
 
-Please extract features and produce milestones now.
-"""
-                ).strip(),
-            ),
-        ]
-    )
-
-    chain = prompt | llm | StrOutputParser()
-    return chain.invoke(
-        {
-            "requirements": requirements.strip(),
-            "tech_stack": (tech_stack or "N/A").strip(),
-        }
-    )
+async def agenerate_milestones(
+    requirements: str,
+    tech_stack: Optional[str] = None,
+    *,
+    temperature: float = 0.2,
+) -> str:
+    """Async variant of generate_milestones."""
+    return await _chain(temperature).ainvoke(_inputs(requirements, tech_stack), config=llm_config("milestones"))
+
+
+async def astream_milestones(
+    requirements: str,
+    tech_stack: Optional[str] = None,
+    *,
+    temperature: float = 0.2,
+) -> AsyncIterator[str]:
+    """Yield milestones markdown chunks as the model produces them."""
+    async for chunk in _chain(temperature).astream(_inputs(requirements, tech_stack), config=llm_config("milestones")):
+        yield chunk
@@ -1,12 +1,11 @@
 from __future__ import annotations
 
-import os
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from app.core.config import get_settings
+from app.core.llm import get_chat_model
+from app.core.instrumentation import llm_config
 
 
 SYSTEM_PROMPT = """
@@ -28,6 +27,45 @@ Constraints and style:
 """
 
 
+# Bump when the prompt changes so cached generations (app.core.cache) are not reused.
+PROMPT_VERSION = "1"
+
+# Prompt and parser are built once at import; only the model varies per call.
+PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_PROMPT),
+        (
+            "user",
+            """
+Requirements:
+{requirements}
+
+Tech Stack:
+{tech_stack}
+
+Best Practices / Context (optional):
+{best_practices}
+
+Please produce the roadmap now.
+""".strip(),
+        ),
+    ]
+)
+_PARSER = StrOutputParser()
+
+
+def _chain(temperature: float):
+    return PROMPT | get_chat_model(temperature) | _PARSER
+
+
+def _inputs(requirements: str, tech_stack: str, best_practices: Optional[str]) -> dict:
+    return {
+        "requirements": requirements.strip(),
+        "tech_stack": tech_stack.strip(),
+        "best_practices": (best_practices or "N/A").strip(),
+    }
+
+
 def generate_roadmap(
     requirements: str,
     tech_stack: str,
@@ -38,47 +76,25 @@ def generate_roadmap(
 
     Uses Google Gemini when an API key is present.
     """
-    # Read from pydantic settings (.env supported) and fallback to raw env vars
-    settings = get_settings()
-    api_key = (settings.api_key or os.getenv("API_KEY") or os.getenv("GOOGLE_API_KEY"))
-    if not api_key:
-        raise RuntimeError(
-            "API key is not set. Please set API_KEY or GOOGLE_API_KEY in your environment/.env."
-        )
-
-    # Reasonable default Gemini model for planning tasks
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
-        temperature=temperature,
-        google_api_key=api_key,
-    )
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", SYSTEM_PROMPT),
-            (
-                "user",
-                """
-Requirements:
-{requirements}
+    return _chain(temperature).invoke(_inputs(requirements, tech_stack, best_practices), config=llm_config("roadmap"))
 
-Tech Stack:
-{tech_stack}
 
-Best Practices / Context (optional):
-{best_practices}
+async def agenerate_roadmap(
+    requirements: str,
+    tech_stack: str,
+    best_practices: Optional[str] = None,
+    temperature: float = 0.2,
+) -> str:
+    """Async variant of generate_roadmap; awaits the model instead of blocking the event loop."""
+    return await _chain(temperature).ainvoke(_inputs(requirements, tech_stack, best_practices), config=llm_config("roadmap"))
 
-Please produce the roadmap now.
-""".strip(),
-            ),
-        ]
-    )
-
-    chain = prompt | llm | StrOutputParser()
-    return chain.invoke(
-        {
-            "requirements": requirements.strip(),
-            "tech_stack": tech_stack.strip(),
-            "best_practices": (best_practices or "N/A").strip(),
-        }
-    )
+
+async def astream_roadmap(
+    requirements: str,
+    tech_stack: str,
+    best_practices: Optional[str] = None,
+    temperature: float = 0.2,
+) -> AsyncIterator[str]:
+    """Yield roadmap markdown chunks as the model produces them."""
+    async for chunk in _chain(temperature).astream(_inputs(requirements, tech_stack, best_practices), config=llm_config("roadmap")):
+        yield chunk
@@ -1,11 +1,12 @@
 from typing import Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
-import os
-from app.core.config import get_settings
+from app.core.llm import get_chat_model
+from app.core.instrumentation import llm_config
+from app.core.layout import layout_uml_schema
+from app.core.singleflight import coalesce
 
-from app.schema import UmlDesign
+from app.schema import UmlDesign, UmlDesignSpec
 
 
 SYSTEM_PROMPT = """
@@ -13,42 +14,22 @@ You are a principal systems architect.
 Given product features, expected users, and geography,
 produce a UML schema strictly following the Pydantic model provided.
 Ensure that node names are descriptive and meaningful (e.g., "User", "AuthenticationService", "ProductDatabase") rather than generic (e.g., "node1", "node2").
+Do not include positions or sizes; the diagram is laid out automatically from the relationships.
 
 Do not output anything except a valid JSON object.
 """
 
 
-def generate_system_design(
-    features: str,
-    expected_users: str,
-    geography: str,
-    *,
-    constraints: str | None = None,
-    tech_stack: str | None = None,
-    project_id: Optional[int] = None,
-    temperature: float = 0.2,
-) -> UmlDesign:
-    """Generate a UML schema validated by Pydantic."""
-
-    settings = get_settings()
-    api_key = settings.api_key or os.getenv("API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("API key not set in env or settings")
+# Parser and prompt are built once at import; the format instructions never change.
+# The model only emits nodes and relationships; coordinates are computed in _finalize.
+_PARSER = PydanticOutputParser(pydantic_object=UmlDesignSpec)
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
-        temperature=temperature,
-        google_api_key=api_key,
-    )
-
-    parser = PydanticOutputParser(pydantic_object=UmlDesign)
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", SYSTEM_PROMPT),
-            (
-                "user",
-                """
+PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_PROMPT),
+        (
+            "user",
+            """
 Inputs
 
 Project ID: {project_id}
@@ -71,25 +52,77 @@ Constraints (optional):
 Output must strictly conform to the UmlDesign schema:
 {format_instructions}
 """,
-            ),
-        ]
+        ),
+    ]
+).partial(format_instructions=_PARSER.get_format_instructions())
+
+
+def _chain(temperature: float):
+    return PROMPT | get_chat_model(temperature) | _PARSER
+
+
+def _inputs(
+    features: str,
+    expected_users: str,
+    geography: str,
+    constraints: str | None,
+    tech_stack: str | None,
+    project_id: Optional[int],
+) -> dict:
+    return {
+        "features": features,
+        "expected_users": expected_users,
+        "geography": geography,
+        "constraints": constraints or "N/A",
+        "tech_stack": tech_stack or "N/A",
+        "project_id": project_id,
+    }
+
+
+def _finalize(result: UmlDesignSpec, project_id: Optional[int]) -> UmlDesign:
+    # Fill project_id if LLM misses it, and place the nodes
+    return UmlDesign(
+        id=result.id,
+        project_id=project_id,
+        type=result.type,
+        uml_schema=layout_uml_schema(result.uml_schema.model_dump()),
     )
 
-    chain = prompt | llm | parser
-    result: UmlDesign = chain.invoke(
-        {
-            "features": features,
-            "expected_users": expected_users,
-            "geography": geography,
-            "constraints": constraints or "N/A",
-            "tech_stack": tech_stack or "N/A",
-            "project_id": project_id,
-            "format_instructions": parser.get_format_instructions(),
-        }
+
+def generate_system_design(
+    features: str,
+    expected_users: str,
+    geography: str,
+    *,
+    constraints: str | None = None,
+    tech_stack: str | None = None,
+    project_id: Optional[int] = None,
+    temperature: float = 0.2,
+) -> UmlDesign:
+    """Generate a UML schema validated by Pydantic."""
+
+    result: UmlDesignSpec = _chain(temperature).invoke(
+        _inputs(features, expected_users, geography, constraints, tech_stack, project_id),
+        config=llm_config("system_design"),
     )
+    return _finalize(result, project_id)
 
-    # Fill project_id if LLM misses it
-    if result.project_id != project_id:
-        result.project_id = project_id
 
-    return result
+@coalesce("system_design")  # identical concurrent requests share one model call
+async def agenerate_system_design(
+    features: str,
+    expected_users: str,
+    geography: str,
+    *,
+    constraints: str | None = None,
+    tech_stack: str | None = None,
+    project_id: Optional[int] = None,
+    temperature: float = 0.2,
+) -> UmlDesign:
+    """Async variant of generate_system_design."""
+
+    result: UmlDesignSpec = await _chain(temperature).ainvoke(
+        _inputs(features, expected_users, geography, constraints, tech_stack, project_id),
+        config=llm_config("system_design"),
+    )
+    return _finalize(result, project_id)
@@ -1,17 +1,16 @@
 from __future__ import annotations
 
-import os
-from typing import Optional
+from typing import AsyncIterator, Optional
 from datetime import datetime
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain.tools import tool
-from langchain.agents import AgentExecutor, create_tool_calling_agent
+from sqlalchemy import func
+from sqlalchemy.orm import Session
 
-from app.core.config import get_settings
-from app.core.db import SessionLocal
+from app.core.config import settings
+from app.core.llm import get_chat_model
+from app.core.instrumentation import llm_config
 from app.models.taskassignment import TaskAssignment
 
 
@@ -42,31 +41,44 @@ Guidelines:
 - Do not add prose outside the sections. Keep it concise and complete.
 """
 
-@tool
-def create_new_task_tool(
+# Bump when the prompt changes so cached generations (app.core.cache) are not reused.
+PROMPT_VERSION = "1"
+
+# Prompt and parser are built once at import; only the model varies per call.
+PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_PROMPT),
+        (
+            "user",
+            (
+                """
+Milestones:
+{milestones}
+
+Tech Stack (optional):
+{tech_stack}
+
+Please produce a day-to-day task plan per milestone now.
+"""
+            ).strip(),
+        ),
+    ]
+)
+_PARSER = StrOutputParser()
+
+
+def create_task(
+    db: Session,
+    *,
     description: str,
     project_id: int,
-    user_id: int,  # Assignee
+    user_id: int,
     assigned_by_user_id: int,
     task_type: str = "development",
     status: str = "todo",
-    eta: Optional[str] = None, # ISO 8601 format string
+    eta: Optional[str] = None,
 ) -> str:
-    """
-    Creates a new task assignment in the database.
-
-    Args:
-        description (str): A detailed description of the task.
-        project_id (int): The ID of the project the task belongs to.
-        user_id (int): The ID of the user to whom the task is assigned.
-        assigned_by_user_id (int): The ID of the user who is assigning the task (taken from current_user).
-        task_type (str, optional): The type of task (e.g., "development", "bug", "research"). Defaults to "development".
-        status (str, optional): The current status of the task (e.g., "todo", "in progress", "completed"). Defaults to "todo".
-        eta (Optional[str], optional): The estimated time of arrival/completion for the task in ISO 8601 format (e.g., "2025-12-31T23:59:59").
-    Returns:
-        str: A confirmation message indicating whether the task was created successfully.
-    """
-    db = SessionLocal()
+    """Insert one task on `db` and describe the result for the agent; errors are returned, not raised."""
     try:
         eta_datetime = datetime.fromisoformat(eta) if eta else None
         new_task = TaskAssignment(
@@ -85,8 +97,17 @@ def create_new_task_tool(
     except Exception as e:
         db.rollback()
         return f"Failed to create task: {e}"
-    finally:
-        db.close()
+
+
+def _chain(temperature: float):
+    return PROMPT | get_chat_model(temperature) | _PARSER
+
+
+def _inputs(milestones: str, tech_stack: Optional[str]) -> dict:
+    return {
+        "milestones": milestones.strip(),
+        "tech_stack": (tech_stack or "N/A").strip(),
+    }
 
 
 def generate_tasks(
@@ -99,91 +120,87 @@ def generate_tasks(
 
     Uses Google Gemini via LangChain when an API key is present.
     """
-    settings = get_settings()
-    api_key = (settings.api_key or os.getenv("API_KEY") or os.getenv("GOOGLE_API_KEY"))
-    if not api_key:
-        raise RuntimeError(
-            "API key is not set. Please set API_KEY or GOOGLE_API_KEY in your environment/.env."
-        )
+    return _chain(temperature).invoke(_inputs(milestones, tech_stack), config=llm_config("tasks"))
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
-        temperature=temperature,
-        google_api_key=api_key,
-    )
 
-    tools = [create_new_task_tool] # Register the new tool
+async def agenerate_tasks(
+    milestones: str,
+    tech_stack: Optional[str] = None,
+    *,
+    temperature: float = 0.2,
+) -> str:
+    """Async variant of generate_tasks."""
+    return await _chain(temperature).ainvoke(_inputs(milestones, tech_stack), config=llm_config("tasks"))
 
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", SYSTEM_PROMPT),
-            (
-                "user",
-                (
-                    """
-Milestones:
-{milestones}
+async def astream_tasks(
+    milestones: str,
+    tech_stack: Optional[str] = None,
+    *,
+    temperature: float = 0.2,
+) -> AsyncIterator[str]:
+    """Yield task plan markdown chunks as the model produces them."""
+    async for chunk in _chain(temperature).astream(_inputs(milestones, tech_stack), config=llm_config("tasks")):
+        yield chunk
 
-Tech Stack (optional):
-{tech_stack}
 
-Please produce a day-to-day task plan per milestone now.
-"""
-                ).strip(),
-            ),
-        ]
-    )
+# Descriptions are cut so a few long tasks can't crowd the rest of the page out of the prompt
+_DESCRIPTION_MAX_CHARS = 160
 
-    # Create an agent that can use the tools
-    agent = create_tool_calling_agent(llm, tools, prompt)
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
 
-    result = agent_executor.invoke(
-        {
-            "milestones": milestones.strip(),
-            "tech_stack": (tech_stack or "N/A").strip(),
-        }
-    )
-    return result["output"] if "output" in result else str(result)
+def _short(text: Optional[str]) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= _DESCRIPTION_MAX_CHARS else text[: _DESCRIPTION_MAX_CHARS - 3].rstrip() + "..."
 
 
-@tool
-def get_tasks_for_user_by_status_tool(
+def list_tasks_for_user(
+    db: Session,
     user_id: int,
     status: Optional[str] = None,
+    *,
+    offset: int = 0,
+    limit: Optional[int] = None,
 ) -> str:
+    """Format a user's tasks (default: "todo" and "in progress") as the chat agent lists them.
+
+    Output is bounded: per-status counts for everything that matches, then at
+    most `limit` tasks (settings.chat_tool_page_size) starting at `offset`,
+    with the offset of the next page when there is one.
     """
-    Retrieves a list of tasks assigned to a specific user, optionally filtered by status.
-
-    Args:
-        user_id (int): The ID of the user whose tasks are to be retrieved.
-        status (Optional[str], optional): The status of the tasks to filter by (e.g., "todo", "in progress", "completed").
-                                          If None, retrieves tasks with "todo" or "in progress" status.
-    Returns:
-        str: A formatted string listing the tasks, or a message if no tasks are found.
-    """
-    db = SessionLocal()
-    try:
-        query = db.query(TaskAssignment).filter(TaskAssignment.user_id == user_id)
-        if status:
-            query = query.filter(TaskAssignment.status == status)
-        else:
-            query = query.filter(TaskAssignment.status.in_(["todo", "in progress"]))
-
-        tasks = query.all()
-
-        if not tasks:
-            return f"No tasks found for user ID {user_id} with status '{status}'." if status else f"No 'todo' or 'in progress' tasks found for user ID {user_id}."
-
-        task_list = []
-        for task in tasks:
-            eta_str = task.eta.isoformat() if task.eta else "N/A"
-            task_list.append(
-                f"- Task ID: {task.id}, Description: {task.description}, Status: {task.status}, Project ID: {task.project_id}, ETA: {eta_str}"
-            )
-        return "Tasks:\n" + "\n".join(task_list)
-    except Exception as e:
-        db.rollback()
-        return f"Failed to retrieve tasks: {e}"
-    finally:
-        db.close()
\ No newline at end of file
+    limit = limit or settings.chat_tool_page_size
+    offset = max(0, offset)
+    statuses = [status] if status else ["todo", "in progress"]
+    matching = (TaskAssignment.user_id == user_id, TaskAssignment.status.in_(statuses))
+
+    counts = dict(
+        db.query(TaskAssignment.status, func.count(TaskAssignment.id))
+        .filter(*matching)
+        .group_by(TaskAssignment.status)
+        .all()
+    )
+    total = sum(counts.values())
+    if not total:
+        return f"No tasks found for user ID {user_id} with status '{status}'." if status else f"No 'todo' or 'in progress' tasks found for user ID {user_id}."
+
+    tasks = (
+        db.query(TaskAssignment)
+        .filter(*matching)
+        .order_by(TaskAssignment.id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    breakdown = ", ".join(f"{counts[s]} {s}" for s in statuses if counts.get(s))
+    lines = [f"Tasks: {total} total ({breakdown})."]
+    if not tasks:
+        lines.append(f"No tasks at offset {offset}; the last page starts at offset {(total - 1) // limit * limit}.")
+        return "\n".join(lines)
+
+    for task in tasks:
+        eta_str = task.eta.isoformat() if task.eta else "N/A"
+        lines.append(
+            f"- Task ID: {task.id}, Description: {_short(task.description)}, Status: {task.status}, Project ID: {task.project_id}, ETA: {eta_str}"
+        )
+    shown_to = offset + len(tasks)
+    if shown_to < total:
+        lines.append(f"Showing {offset + 1}-{shown_to} of {total}; call again with offset={shown_to} for more.")
+    return "\n".join(lines)
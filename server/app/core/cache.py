@@ -0,0 +1,282 @@
+"""Content-addressed cache for generated roadmap, milestone and task documents.
+
+Entries are keyed by a hash of (agent, prompt version, inputs, temperature, model),
+so a "regenerate" with identical inputs is served without calling the LLM.
+
+Two tiers:
+- memory: per-process LRU with TTL and a maximum entry count
+- persistent: the roadmaps / milestone_plans / task_plans tables, looked up by cache_key
+
+The persistent tier is best effort; database errors are logged and treated as a miss.
+The async API (alookup / astore / get_or_generate) runs it on the threadpool,
+each call in a short-lived session on the caller's engine, so async routes
+don't block the event loop and concurrent lookups never share a Session.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.milestoneplan import MilestonePlan
+from app.models.roadmap import Roadmap
+from app.models.taskplan import TaskPlan
+
+logger = logging.getLogger(__name__)
+
+# Persistent tier: which table stores which agent's output
+PERSISTENT_MODELS = {
+    "roadmap": Roadmap,
+    "milestones": MilestonePlan,
+    "tasks": TaskPlan,
+}
+
+HIT = "HIT"
+MISS = "MISS"
+BYPASS = "BYPASS"
+
+
+def make_cache_key(
+    agent: str,
+    prompt_version: str,
+    inputs: Dict[str, Any],
+    temperature: float,
+    model: Optional[str] = None,
+) -> str:
+    """Stable sha256 over everything that can change the generated output."""
+    material = {
+        "agent": agent,
+        "prompt_version": prompt_version,
+        "inputs": inputs,
+        "temperature": round(float(temperature), 2),
+        "model": model or settings.llm_model,
+    }
+    encoded = json.dumps(material, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def cache_bypassed(request: Request) -> bool:
+    """FastAPI dependency: `Cache-Control: no-cache` or `X-Cache-Bypass: 1` skips cache reads."""
+    cache_control = request.headers.get("cache-control", "").lower()
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return True
+    return request.headers.get("x-cache-bypass", "").lower() in {"1", "true", "yes"}
+
+
+def _engine_of(db: Optional[Session], bind):
+    if bind is not None:
+        return bind
+    return db.get_bind() if db is not None else None
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256, ttl_seconds: int = 24 * 60 * 60) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    # ---------- memory tier ----------
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                metrics.incr("llm_cache.expired")
+                return None
+            self._entries.move_to_end(key)  # most recently used
+            return value
+
+    def _set_memory(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)  # least recently used
+                metrics.incr("llm_cache.evictions")
+
+    # ---------- persistent tier ----------
+    def _get_persistent(self, agent: str, key: str, db: Session) -> Optional[Tuple[str, float]]:
+        model = PERSISTENT_MODELS.get(agent)
+        if model is None:
+            return None
+        try:
+            row = (
+                db.query(model)
+                .filter(model.cache_key == key)
+                .order_by(model.created_at.desc())
+                .first()
+            )
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"Response cache lookup failed for {agent}: {e}")
+            return None
+        if row is None:
+            return None
+
+        created_at = row.created_at
+        if created_at.tzinfo is None:  # SQLite hands back naive timestamps
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        age = (datetime.now(timezone.utc) - created_at).total_seconds()
+        if age >= self.ttl_seconds:
+            metrics.incr("llm_cache.expired")
+            return None
+        return row.content, self.ttl_seconds - age
+
+    def _set_persistent(
+        self,
+        agent: str,
+        key: str,
+        value: str,
+        db: Session,
+        temperature: float,
+        columns: Dict[str, Any],
+    ) -> None:
+        model = PERSISTENT_MODELS.get(agent)
+        if model is None:
+            return
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+            # Expired generations are dead weight; drop them while we're here
+            db.query(model).filter(model.cache_key.isnot(None), model.created_at < cutoff).delete(
+                synchronize_session=False
+            )
+            db.add(model(cache_key=key, content=value, temperature=temperature, **columns))
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"Response cache write failed for {agent}: {e}")
+
+    def _get_persistent_isolated(self, agent: str, key: str, bind) -> Optional[Tuple[str, float]]:
+        with Session(bind=bind, autoflush=False) as db:
+            return self._get_persistent(agent, key, db)
+
+    def _set_persistent_isolated(self, agent: str, key: str, value: str, bind, temperature: float, columns: Dict[str, Any]) -> None:
+        with Session(bind=bind, autoflush=False) as db:
+            self._set_persistent(agent, key, value, db, temperature, columns)
+
+    # ---------- public API ----------
+    async def get_or_generate(
+        self,
+        agent: str,
+        key: str,
+        generate: Callable[[], Awaitable[str]],
+        *,
+        db: Optional[Session] = None,
+        bypass: bool = False,
+        temperature: float = 0.2,
+        columns: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[str, str]:
+        """Return (text, cache status) where status is HIT, MISS or BYPASS.
+
+        `columns` are the extra table fields (requirements, tech_stack, ...) stored
+        alongside the content in the persistent tier.
+        """
+        if bypass:
+            metrics.incr("llm_cache.bypass")
+        else:
+            cached = await self.alookup(agent, key, db=db)
+            if cached is not None:
+                return cached, HIT
+
+        value = await generate()
+        await self.astore(agent, key, value, db=db, temperature=temperature, columns=columns)
+        return value, BYPASS if bypass else MISS
+
+    async def alookup(self, agent: str, key: str, *, db: Optional[Session] = None, bind=None) -> Optional[str]:
+        """`lookup` for async callers; `db` only names the engine, the query runs in a session of its own.
+
+        `bind` (the engine itself) can be given instead of `db`.
+        """
+        bind = _engine_of(db, bind)
+        value = self._get_memory(key)
+        if value is not None:
+            metrics.incr("llm_cache.hits.memory")
+            return value
+        if bind is not None and agent in PERSISTENT_MODELS:
+            found = await run_in_threadpool(self._get_persistent_isolated, agent, key, bind)
+            if found is not None:
+                value, remaining = found
+                self._set_memory(key, value, ttl_seconds=remaining)
+                metrics.incr("llm_cache.hits.persistent")
+                return value
+        metrics.incr("llm_cache.misses")
+        return None
+
+    async def astore(
+        self,
+        agent: str,
+        key: str,
+        value: str,
+        *,
+        db: Optional[Session] = None,
+        bind=None,
+        temperature: float = 0.2,
+        columns: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """`store` for async callers; the persistent write runs on the threadpool in a session of its own."""
+        bind = _engine_of(db, bind)
+        self._set_memory(key, value)
+        if bind is not None and agent in PERSISTENT_MODELS:
+            await run_in_threadpool(
+                self._set_persistent_isolated, agent, key, value, bind, temperature, columns or {}
+            )
+
+    def lookup(self, agent: str, key: str, *, db: Optional[Session] = None) -> Optional[str]:
+        value = self._get_memory(key)
+        if value is not None:
+            metrics.incr("llm_cache.hits.memory")
+            return value
+        if db is not None:
+            found = self._get_persistent(agent, key, db)
+            if found is not None:
+                value, remaining = found
+                self._set_memory(key, value, ttl_seconds=remaining)
+                metrics.incr("llm_cache.hits.persistent")
+                return value
+        metrics.incr("llm_cache.misses")
+        return None
+
+    def store(
+        self,
+        agent: str,
+        key: str,
+        value: str,
+        *,
+        db: Optional[Session] = None,
+        temperature: float = 0.2,
+        columns: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self._set_memory(key, value)
+        if db is not None:
+            self._set_persistent(agent, key, value, db, temperature, columns or {})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+response_cache = ResponseCache(
+    max_entries=settings.llm_cache_max_entries,
+    ttl_seconds=settings.llm_cache_ttl_seconds,
+)
@@ -0,0 +1,266 @@
+"""Record/replay cassettes for agent LLM traffic (BMS_LLM_BACKEND=record|replay).
+
+In record mode every chat model the registry hands out is wrapped in a
+CassetteChatModel. The wrapper forwards calls to the real backend
+(BMS_LLM_RECORD_BACKEND, default gemini) and appends each prompt/response pair
+to a JSON cassette file (BMS_LLM_CASSETTE_PATH). Each pair stores the
+normalised request, the response message, and the arrival time of every
+streamed chunk.
+
+In replay mode the same requests are answered from the cassette without
+network access. BMS_LLM_REPLAY_SPEED controls timing:
+
+- 0 replays instantly.
+- 1 reproduces the recorded time to first token and chunk pacing.
+- 10 runs ten times faster.
+
+Requests are matched on a hash of model, temperature, message types and
+contents, and bound tools. Message ids and tool call ids are left out of the
+hash because they differ per run. Identical requests recorded several times
+are replayed in recorded order and then cycle. A request missing from the
+cassette raises CassetteMissError rather than falling back to the network.
+
+Cassette files carry a format version (CASSETTE_VERSION). A file written in
+another format must be re-recorded.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache, reduce
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.messages.utils import message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMissError(RuntimeError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def normalize_messages(messages: List[BaseMessage]) -> List[Dict[str, Any]]:
+    """The parts of a prompt that decide the reply: no ids, no metadata."""
+    normalized = []
+    for message in messages:
+        item: Dict[str, Any] = {"type": message.type, "content": message.content}
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            item["tool_calls"] = [{"name": c["name"], "args": c["args"]} for c in tool_calls]
+        normalized.append(item)
+    return normalized
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """One cassette file: interactions in recorded order, indexed by request key."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._interactions: List[Dict[str, Any]] = []
+        self._by_key: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        version = data.get("version")
+        if version != CASSETTE_VERSION:
+            raise RuntimeError(
+                f"Cassette {self.path} has format version {version}, expected {CASSETTE_VERSION}; re-record it."
+            )
+        for interaction in data.get("interactions", []):
+            self._index(interaction)
+
+    def _index(self, interaction: Dict[str, Any]) -> None:
+        self._interactions.append(interaction)
+        self._by_key.setdefault(interaction["key"], []).append(interaction)
+
+    @property
+    def interactions(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._interactions)
+
+    def lookup(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            recorded = self._by_key.get(key)
+            if not recorded:
+                raise CassetteMissError(
+                    f"No recording for request {key[:12]} in {self.path}; re-record with BMS_LLM_BACKEND=record."
+                )
+            position = self._cursor.get(key, 0)
+            self._cursor[key] = position + 1
+            return recorded[position % len(recorded)]
+
+    def record(self, interaction: Dict[str, Any]) -> None:
+        with self._lock:
+            self._index(interaction)
+            self._save()
+
+    def _save(self) -> None:
+        # Write-then-rename so a crash mid-recording never leaves a truncated cassette
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        payload = {"version": CASSETTE_VERSION, "interactions": self._interactions}
+        tmp.write_text(json.dumps(payload, indent=1, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+@lru_cache(maxsize=8)
+def get_cassette(path: str) -> Cassette:
+    """Shared Cassette per file, so every model in the process appends to and replays from one index."""
+    return Cassette(path)
+
+
+class CassetteChatModel(BaseChatModel):
+    """Records calls to `inner` into a cassette, or replays them from it."""
+
+    mode: str  # "record" or "replay"
+    cassette: Cassette
+    inner: Optional[BaseChatModel] = None  # required when recording
+    model_name: str = "cassette"
+    temperature: float = 0.2
+    replay_speed: float = 0.0  # 0 = instant, 1 = recorded timing, >1 = faster
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cassette-{self.mode}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "temperature": self.temperature, "cassette": str(self.cassette.path)}
+
+    def bind_tools(self, tools, *, tool_choice: Optional[Any] = None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], tool_choice=tool_choice, **kwargs)
+
+    def _request(self, messages: List[BaseMessage], tools: Optional[List[dict]], tool_choice: Any) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "temperature": self.temperature,
+            "messages": normalize_messages(messages),
+            "tools": tools or [],
+            "tool_choice": tool_choice,
+        }
+
+    # ---------- recording ----------
+    def _target(self, tools: Optional[List[dict]], tool_choice: Any):
+        if self.inner is None:
+            raise RuntimeError("Cassette recording needs an inner chat model.")
+        return self.inner.bind_tools(tools, tool_choice=tool_choice) if tools else self.inner
+
+    @staticmethod
+    def _aggregate(chunks: List[AIMessageChunk]) -> AIMessage:
+        return message_chunk_to_message(reduce(lambda a, b: a + b, chunks)) if chunks else AIMessage(content="")
+
+    def _store(self, request: Dict[str, Any], timed: List[Tuple[float, AIMessageChunk]], started: float) -> None:
+        message = self._aggregate([chunk for _, chunk in timed])
+        offsets = [round((t - started) * 1000, 3) for t, _ in timed]
+        self.cassette.record({
+            "key": request_key(request),
+            "request": request,
+            "response": {
+                "message": message_to_dict(message),
+                "chunks": [
+                    {"t_ms": offset, "content": chunk.content}
+                    for offset, (_, chunk) in zip(offsets, timed)
+                    if chunk.content
+                ],
+                "ttft_ms": offsets[0] if offsets else 0.0,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            },
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+    def _record(self, messages, stop, tools, tool_choice) -> Iterator[AIMessageChunk]:
+        # Always streams from the backend, even for invoke(), so time to first token
+        # and chunk pacing are captured; the interaction is stored once the stream ends
+        request = self._request(messages, tools, tool_choice)
+        started = time.perf_counter()
+        timed = []
+        for chunk in self._target(tools, tool_choice).stream(messages, stop=stop):
+            timed.append((time.perf_counter(), chunk))
+            yield chunk
+        self._store(request, timed, started)
+
+    async def _arecord(self, messages, stop, tools, tool_choice) -> AsyncIterator[AIMessageChunk]:
+        request = self._request(messages, tools, tool_choice)
+        started = time.perf_counter()
+        timed = []
+        async for chunk in self._target(tools, tool_choice).astream(messages, stop=stop):
+            timed.append((time.perf_counter(), chunk))
+            yield chunk
+        self._store(request, timed, started)
+
+    # ---------- replay ----------
+    def _replay(self, messages, tools, tool_choice) -> Tuple[AIMessage, List[Tuple[float, AIMessageChunk]]]:
+        """The recorded message and its chunks as (seconds after the call, chunk) at replay speed."""
+        response = self.cassette.lookup(request_key(self._request(messages, tools, tool_choice)))["response"]
+        message = messages_from_dict([response["message"]])[0]
+        scale = 1 / (1000 * self.replay_speed) if self.replay_speed > 0 else 0.0
+        timeline = [(c["t_ms"] * scale, AIMessageChunk(content=c["content"])) for c in response["chunks"]]
+        end = response["duration_ms"] * scale
+        if message.tool_calls:
+            timeline.append((end, AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": c["name"], "args": json.dumps(c["args"]), "id": c.get("id"), "index": i}
+                    for i, c in enumerate(message.tool_calls)
+                ],
+            )))
+        elif not timeline:
+            timeline.append((end, AIMessageChunk(content=message.content)))
+        return message, timeline
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs) -> ChatResult:
+        if self.mode == "record":
+            message = self._aggregate(list(self._record(messages, stop, tools, tool_choice)))
+        else:
+            message, timeline = self._replay(messages, tools, tool_choice)
+            time.sleep(timeline[-1][0])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs) -> ChatResult:
+        if self.mode == "record":
+            message = self._aggregate([chunk async for chunk in self._arecord(messages, stop, tools, tool_choice)])
+        else:
+            message, timeline = self._replay(messages, tools, tool_choice)
+            await asyncio.sleep(timeline[-1][0])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        if self.mode == "record":
+            for chunk in self._record(messages, stop, tools, tool_choice):
+                yield ChatGenerationChunk(message=chunk)
+            return
+        _, timeline = self._replay(messages, tools, tool_choice)
+        started = time.perf_counter()
+        for at, chunk in timeline:
+            time.sleep(max(0.0, at - (time.perf_counter() - started)))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        if self.mode == "record":
+            async for chunk in self._arecord(messages, stop, tools, tool_choice):
+                yield ChatGenerationChunk(message=chunk)
+            return
+        _, timeline = self._replay(messages, tools, tool_choice)
+        started = time.perf_counter()
+        for at, chunk in timeline:
+            await asyncio.sleep(max(0.0, at - (time.perf_counter() - started)))
+            yield ChatGenerationChunk(message=chunk)
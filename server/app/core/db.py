@@ -1,5 +1,11 @@
+from typing import Any, AsyncIterator, Optional
+
+from fastapi import Depends
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
+from starlette.concurrency import run_in_threadpool
 
 from .config import settings
 
@@ -18,3 +24,86 @@ def get_db():
         yield db  # Dependency yields a session; FastAPI ensures finally runs
     finally:
         db.close()  # Always close to return connection to pool
+
+
+# ---------- async mode (BMS_DB_ASYNC) ----------
+# `async def` routes that await the database don't hold a threadpool thread
+# while Postgres works. Routes opt in by depending on `get_read_db`.
+
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    """`url` with the async driver of its backend (postgresql+psycopg2 -> postgresql+asyncpg, sqlite -> sqlite+aiosqlite)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = _ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"No async driver known for database backend {backend!r}")
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+_async_engine: Optional[AsyncEngine] = None
+_AsyncSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """Created on first use, so the async driver is only imported when async mode is used."""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        url = settings.async_database_url or async_database_url(settings.database_url)
+        options = {} if make_url(url).get_backend_name() == "sqlite" else {"pool_pre_ping": True}
+        _async_engine = create_async_engine(url, **options)
+        # expire_on_commit=False: attributes stay readable after commit without an (implicit, sync) reload
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    get_async_engine()
+    return _AsyncSessionLocal()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine, _AsyncSessionLocal = None, None
+
+
+class ThreadpoolSession:
+    """The awaitable read API of AsyncSession (execute, scalar, scalars, get) over a sync Session.
+
+    Lets `async def` routes be written once for both modes: without
+    BMS_DB_ASYNC each call runs on the threadpool against the request's
+    `get_db` session, so the thread is only held for the query itself.
+    """
+
+    def __init__(self, sync_session: Session) -> None:
+        self.sync_session = sync_session
+
+    async def execute(self, statement: Any, params: Any = None, **kw: Any):
+        return await run_in_threadpool(self.sync_session.execute, statement, params, **kw)
+
+    async def scalar(self, statement: Any, params: Any = None, **kw: Any):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params, **kw)
+
+    async def scalars(self, statement: Any, params: Any = None, **kw: Any):
+        return await run_in_threadpool(self.sync_session.scalars, statement, params, **kw)
+
+    async def get(self, entity: Any, ident: Any, **kw: Any):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kw)
+
+
+async def _get_threadpool_db(db: Session = Depends(get_db)) -> AsyncIterator[ThreadpoolSession]:
+    yield ThreadpoolSession(db)
+
+
+# Session for `async def` routes: an AsyncSession with BMS_DB_ASYNC, otherwise the sync session behind ThreadpoolSession.
+# Relationships must be eager-loaded (selectinload/joinedload); AsyncSession can't lazy-load.
+get_read_db = get_async_db if settings.db_async else _get_threadpool_db
@@ -0,0 +1,222 @@
+"""In-memory feature dependency graphs, one per project, loaded from feature_dependencies.
+
+An edge a -> b means feature a depends on feature b (b comes first). Each
+DependencyGraph keeps forward and reverse adjacency sets, so all of these
+are a BFS over the part of the graph they touch, with no database round
+trip:
+
+- transitive dependencies and dependents
+- "would this edge close a cycle"
+
+The topological order (Kahn) and the cycles (Tarjan's strongly connected
+components) are memoised until the next mutation.
+
+The GraphRegistry loads a project's graph on first use and then applies
+writes incrementally: edges added or removed and features created or
+deleted. Graphs are per process. Another worker's writes show up once the
+entry expires (BMS_DEPENDENCY_GRAPH_TTL_SECONDS) or the project is
+invalidated.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class DependencyGraph:
+    def __init__(self, nodes: Iterable[int] = (), edges: Iterable[Tuple[int, int]] = ()) -> None:
+        self._lock = threading.RLock()
+        self._deps: Dict[int, Set[int]] = {}
+        self._rdeps: Dict[int, Set[int]] = {}
+        self._order: Optional[Tuple[List[int], List[List[int]]]] = None  # memoised (order, cycles)
+        for node in nodes:
+            self.add_node(node)
+        for feature_id, depends_on_id in edges:
+            self.add_edge(feature_id, depends_on_id)
+
+    # ---------- mutation ----------
+    def add_node(self, node: int) -> None:
+        with self._lock:
+            if node not in self._deps:
+                self._deps[node] = set()
+                self._rdeps[node] = set()
+                self._order = None
+
+    def remove_node(self, node: int) -> None:
+        with self._lock:
+            for dep in self._deps.pop(node, set()):
+                self._rdeps[dep].discard(node)
+            for dependent in self._rdeps.pop(node, set()):
+                self._deps[dependent].discard(node)
+            self._order = None
+
+    def add_edge(self, feature_id: int, depends_on_id: int) -> None:
+        with self._lock:
+            self.add_node(feature_id)
+            self.add_node(depends_on_id)
+            self._deps[feature_id].add(depends_on_id)
+            self._rdeps[depends_on_id].add(feature_id)
+            self._order = None
+
+    def remove_edge(self, feature_id: int, depends_on_id: int) -> None:
+        with self._lock:
+            self._deps.get(feature_id, set()).discard(depends_on_id)
+            self._rdeps.get(depends_on_id, set()).discard(feature_id)
+            self._order = None
+
+    # ---------- queries ----------
+    def __contains__(self, node: int) -> bool:
+        return node in self._deps
+
+    def edges(self) -> List[Tuple[int, int]]:
+        with self._lock:
+            return sorted((a, b) for a, deps in self._deps.items() for b in deps)
+
+    def nodes(self) -> List[int]:
+        with self._lock:
+            return sorted(self._deps)
+
+    @staticmethod
+    def _reach(adjacency: Dict[int, Set[int]], start: int) -> List[int]:
+        """Nodes reachable from `start` (excluded), nearest first; ties by id for stable output."""
+        seen = {start}
+        order: List[int] = []
+        queue = deque([start])
+        while queue:
+            for nxt in sorted(adjacency.get(queue.popleft(), ())):
+                if nxt not in seen:
+                    seen.add(nxt)
+                    order.append(nxt)
+                    queue.append(nxt)
+        return order
+
+    def dependencies(self, node: int, transitive: bool = True) -> List[int]:
+        with self._lock:
+            if not transitive:
+                return sorted(self._deps.get(node, ()))
+            return self._reach(self._deps, node)
+
+    def dependents(self, node: int, transitive: bool = True) -> List[int]:
+        with self._lock:
+            if not transitive:
+                return sorted(self._rdeps.get(node, ()))
+            return self._reach(self._rdeps, node)
+
+    def would_create_cycle(self, feature_id: int, depends_on_id: int) -> bool:
+        """True if adding feature_id -> depends_on_id closes a cycle (depends_on_id already needs feature_id)."""
+        if feature_id == depends_on_id:
+            return True
+        with self._lock:
+            return feature_id in self._reach(self._deps, depends_on_id)
+
+    def topological_order(self) -> Tuple[List[int], List[List[int]]]:
+        """(order, cycles): dependencies before dependents; nodes on or behind a cycle are left out of `order`."""
+        with self._lock:
+            if self._order is None:
+                self._order = (self._kahn(), self._cycles())
+            order, cycles = self._order
+            return list(order), [list(c) for c in cycles]
+
+    def _kahn(self) -> List[int]:
+        remaining = {node: len(deps) for node, deps in self._deps.items()}
+        ready = sorted(node for node, n in remaining.items() if n == 0)
+        queue = deque(ready)
+        order: List[int] = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for dependent in sorted(self._rdeps[node]):
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    queue.append(dependent)
+        return order
+
+    def _cycles(self) -> List[List[int]]:
+        """Strongly connected components with more than one node (iterative Tarjan)."""
+        index: Dict[int, int] = {}
+        low: Dict[int, int] = {}
+        on_stack: Set[int] = set()
+        stack: List[int] = []
+        cycles: List[List[int]] = []
+        counter = 0
+        for root in sorted(self._deps):
+            if root in index:
+                continue
+            work = [(root, iter(sorted(self._deps[root])))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                child = next(children, None)
+                if child is not None:
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(sorted(self._deps[child]))))
+                    elif child in on_stack:
+                        low[node] = min(low[node], index[child])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1:
+                        cycles.append(sorted(component))
+        return sorted(cycles)
+
+
+# loader(project_id) -> (feature ids, edges)
+GraphLoader = Callable[[int], Tuple[Iterable[int], Iterable[Tuple[int, int]]]]
+
+
+class GraphRegistry:
+    """Per-project DependencyGraph cache (LRU + TTL) with incremental updates."""
+
+    def __init__(self, max_projects: int = 128, ttl_seconds: float = 300.0) -> None:
+        self.max_projects = max_projects
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._graphs: "OrderedDict[int, Tuple[DependencyGraph, float]]" = OrderedDict()  # project -> (graph, loaded_at)
+
+    def get(self, project_id: int, loader: GraphLoader) -> DependencyGraph:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._graphs.get(project_id)
+            if entry is not None and now - entry[1] < self.ttl_seconds:
+                self._graphs.move_to_end(project_id)
+                return entry[0]
+        nodes, edges = loader(project_id)
+        graph = DependencyGraph(nodes, edges)
+        with self._lock:
+            self._graphs[project_id] = (graph, now)
+            self._graphs.move_to_end(project_id)
+            while len(self._graphs) > self.max_projects:
+                self._graphs.popitem(last=False)
+        return graph
+
+    def loaded(self, project_id: int) -> Optional[DependencyGraph]:
+        """The cached graph if there is one; incremental updates skip projects not in memory."""
+        with self._lock:
+            entry = self._graphs.get(project_id)
+            return entry[0] if entry is not None else None
+
+    def invalidate(self, project_id: Optional[int] = None) -> None:
+        with self._lock:
+            if project_id is None:
+                self._graphs.clear()
+            else:
+                self._graphs.pop(project_id, None)
@@ -0,0 +1,285 @@
+"""Deterministic stand-in for the Gemini chat model (BMS_LLM_BACKEND=fake).
+
+Lets every agent in app.agents run offline, in CI and in benchmarks. Replies
+are templated from the prompt, so they have the shape each agent parses:
+
+- roadmap / milestones / daily task plan markdown built from the inputs
+- UmlDesign JSON for the system design agent
+- dependency JSON for backEndLLM
+- tool calls: forced calls for structured output (a sample that satisfies the
+  tool's JSON schema) and show_task_status / get_tasks_for_agent for the chat agent
+
+Latency is simulated as time-to-first-token plus tokens / tokens_per_second,
+with a token estimated as 4 characters; both default to 0 (instant).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _text(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else json.dumps(message.content)
+
+
+def _section(prompt: str, label: str) -> str:
+    """Text under `<label>:` up to the next blank-line-separated label."""
+    match = re.search(rf"{re.escape(label)}[^\n]*:\n(.*?)(?:\n\n[A-Z][^\n]*:|\Z)", prompt, re.DOTALL)
+    return match.group(1).strip() if match else ""
+
+
+def _items(text: str, limit: int = 5) -> List[str]:
+    """Up to `limit` short item names: the leading bullet list if any (e.g. a roadmap's
+    features), else the text split on lines and punctuation."""
+    bullets = []
+    for line in text.splitlines():
+        if bullets and re.match(r"^\s*#", line):
+            break
+        bullet = re.match(r"^\s*[-*]\s+(.+)", line)
+        if bullet:
+            bullets.append(bullet.group(1))
+    parts = bullets or re.split(r"\n|;|,|\.\s", text)
+    items = []
+    for part in parts:
+        item = re.sub(r"^[\s\-*#\d.)]+", "", part).strip()
+        if item and item.upper() != "N/A" and item not in items:
+            items.append(item[:60])
+    return items[:limit] or ["Core workflow"]
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "", name.title()) or "Component"
+
+
+# ---------- templated replies ----------
+def roadmap_reply(prompt: str) -> str:
+    features = _items(_section(prompt, "Requirements"))
+    lines = ["# Roadmap", "", "## 1) Features"] + [f"- {f}" for f in features]
+    lines += ["", "## 2) Milestones per Feature"]
+    for feature in features:
+        lines += [f"### {feature}", "- Schema", "- API", "- UI", "- Testing"]
+    return "\n".join(lines)
+
+
+def milestones_reply(prompt: str) -> str:
+    features = _items(_section(prompt, "Requirements"))
+    lines = ["# Features"] + [f"- {f}" for f in features] + ["", "# Milestones by Feature"]
+    for feature in features:
+        lines += [
+            f"## {feature}",
+            f"- Schema: Design tables for {feature.lower()}",
+            f"- API: Implement endpoints for {feature.lower()}",
+            f"- UI: Build screens for {feature.lower()}",
+            "",
+        ]
+    lines += ["# Notes", "- Generated by the fake LLM backend."]
+    return "\n".join(lines)
+
+
+def tasks_reply(prompt: str) -> str:
+    milestones = re.findall(r"^##\s+(.+)$", _section(prompt, "Milestones"), re.MULTILINE)
+    lines = ["# Daily Task Plan", ""]
+    for milestone in milestones or ["Milestone"]:
+        lines += [
+            f"## {milestone}",
+            f"- Day 1: Design {milestone.lower()} schema",
+            f"- Day 2: Implement {milestone.lower()} API",
+            f"- Day 3: Build and test {milestone.lower()} UI",
+            "",
+        ]
+    return "\n".join(lines).rstrip()
+
+
+def system_design_reply(prompt: str) -> str:
+    project = re.search(r"Project ID:\s*(\d+)", prompt)
+    services = [_slug(f) + "Service" for f in _items(_section(prompt, "Features"), limit=4)]
+    nodes = [
+        {"id": "lb", "name": "LoadBalancer", "type": "load_balancer", "description": "Public entry point"},
+    ]
+    nodes += [
+        {"id": f"svc{i}", "name": name, "type": "service", "description": f"Handles {name[:-7].lower()}"}
+        for i, name in enumerate(services, start=1)
+    ]
+    nodes += [
+        {"id": "cache", "name": "SessionCache", "type": "cache", "description": "Hot reads"},
+        {"id": "db", "name": "PrimaryDatabase", "type": "database", "description": "System of record"},
+    ]
+    relationships = [{"source": "lb", "to": f"svc{i}", "type": "http"} for i in range(1, len(services) + 1)]
+    relationships += [{"source": f"svc{i}", "to": "db", "type": "sql"} for i in range(1, len(services) + 1)]
+    relationships += [{"source": "svc1", "to": "cache", "type": "read"}]
+    design = {
+        "id": 1,
+        "project_id": int(project.group(1)) if project else None,
+        "type": "system",
+        "uml_schema": {"nodes": nodes, "relationships": relationships},
+    }
+    return json.dumps(design)
+
+
+def dependencies_reply(prompt: str) -> str:
+    new_feature = re.search(r'A new feature is being added:\s*"(.*?)"', prompt, re.DOTALL)
+    name = new_feature.group(1).strip() if new_feature else ""
+    words = {w for w in re.findall(r"[a-z]{4,}", name.lower())}
+    depends_on = [
+        int(fid)
+        for fid, fname in re.findall(r"ID: (\d+), Name: ([^,\n]+)", prompt)
+        if words & set(re.findall(r"[a-z]{4,}", fname.lower()))
+    ]
+    reasoning = "Shares domain terms with existing features." if depends_on else "No dependencies"
+    return json.dumps({"new_feature": name, "depends_on": depends_on, "reasoning": reasoning})
+
+
+def sample_for_schema(schema: Dict[str, Any], hint: str, defs: Optional[Dict[str, Any]] = None) -> Any:
+    """A value satisfying a JSON schema (types, enums, required fields), seeded from `hint`."""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return sample_for_schema(defs[schema["$ref"].split("/")[-1]], hint, defs)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return sample_for_schema(options[0], hint, defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "object")
+    if kind == "object":
+        props = schema.get("properties", {})
+        return {name: sample_for_schema(prop, f"{hint} {name}", defs) for name, prop in props.items()}
+    if kind == "array":
+        item = schema.get("items", {"type": "string"})
+        return [sample_for_schema(item, f"{hint} {i}", defs) for i in range(1, 3)]
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 1.0
+    if kind == "boolean":
+        return False
+    return hint.strip().replace("_", " ").capitalize()
+
+
+# prompt marker -> templated reply; first match wins
+REPLIES = [
+    ("UmlDesign", system_design_reply),
+    ('"depends_on"', dependencies_reply),
+    ("# Daily Task Plan", tasks_reply),
+    ("# Milestones by Feature", milestones_reply),
+    ("engineering roadmap", roadmap_reply),
+]
+
+
+class FakeChatModel(BaseChatModel):
+    """Offline chat model with templated replies and a simple latency model."""
+
+    model_name: str = "fake"
+    temperature: float = 0.2
+    ttft_ms: float = 0.0
+    tokens_per_second: float = 0.0  # 0 = emit everything at once
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "temperature": self.temperature}
+
+    def bind_tools(self, tools, *, tool_choice: Optional[Any] = None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], tool_choice=tool_choice, **kwargs)
+
+    # ---------- reply selection ----------
+    def reply(self, messages: List[BaseMessage], tools: Optional[List[dict]] = None, tool_choice: Any = None) -> AIMessage:
+        prompt = "\n".join(_text(m) for m in messages)
+        last = messages[-1]
+        if tools:
+            forced = tool_choice not in (None, "auto", "none")
+            if forced:  # with_structured_output: one call matching the schema
+                function = tools[0]["function"]
+                args = sample_for_schema(function.get("parameters", {}), _text(messages[-1])[:40])
+                return self._tool_call(function["name"], args)
+            if last.type != "tool":
+                call = self._choose_tool(_text(last), {t["function"]["name"] for t in tools})
+                if call is not None:
+                    return self._tool_call(*call)
+            else:
+                return AIMessage(content=f"Here is what I found:\n{_text(last)}")
+        for marker, build in REPLIES:
+            if marker in prompt:
+                return AIMessage(content=build(prompt))
+        return AIMessage(content=f"OK: {_text(last)[:200]}")
+
+    @staticmethod
+    def _choose_tool(query: str, names: set) -> Optional[tuple]:
+        task = re.search(r"task\D{0,10}(\d+)", query, re.IGNORECASE)
+        if task and "show_task_status" in names:
+            return "show_task_status", {"task_id": int(task.group(1))}
+        if re.search(r"\btasks?\b", query, re.IGNORECASE) and "get_tasks_for_agent" in names:
+            return "get_tasks_for_agent", {}
+        return None
+
+    @staticmethod
+    def _tool_call(name: str, args: Dict[str, Any]) -> AIMessage:
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{name}"}])
+
+    # ---------- latency model ----------
+    def _delays(self, message: AIMessage) -> tuple:
+        """(time to first token, time for the rest) in seconds."""
+        tokens = estimate_tokens(_text(message) + json.dumps([c["args"] for c in message.tool_calls]))
+        rest = tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return self.ttft_ms / 1000, rest
+
+    def _chunks(self, message: AIMessage) -> List[AIMessageChunk]:
+        if message.tool_calls:
+            return [
+                AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                        for i, c in enumerate(message.tool_calls)
+                    ],
+                )
+            ]
+        words = re.findall(r"\S+\s*|\s+", _text(message)) or [""]
+        return [AIMessageChunk(content=w) for w in words]
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs) -> ChatResult:
+        message = self.reply(messages, tools, tool_choice)
+        ttft, rest = self._delays(message)
+        time.sleep(ttft + rest)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs) -> ChatResult:
+        message = self.reply(messages, tools, tool_choice)
+        ttft, rest = self._delays(message)
+        await asyncio.sleep(ttft + rest)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        message = self.reply(messages, tools, tool_choice)
+        ttft, rest = self._delays(message)
+        chunks = self._chunks(message)
+        time.sleep(ttft)
+        for chunk in chunks:
+            time.sleep(rest / len(chunks))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, tools=None, tool_choice=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        message = self.reply(messages, tools, tool_choice)
+        ttft, rest = self._delays(message)
+        chunks = self._chunks(message)
+        await asyncio.sleep(ttft)
+        for chunk in chunks:
+            await asyncio.sleep(rest / len(chunks))
+            yield ChatGenerationChunk(message=chunk)
@@ -0,0 +1,326 @@
+"""Per-call LLM instrumentation: latency, tokens, retries, tool calls and cost.
+
+Every agent in app.agents passes `llm_config("<agent>")` to its chain or
+AgentExecutor. That config attaches the shared LLMInstrumentation callback
+and tags the run with the agent name, which child runs inherit. For each
+model call the handler records these histograms (see GET /metrics):
+
+- llm.latency_ms
+- llm.ttft_ms: time to the first streamed token; equal to latency for non-streamed calls
+- llm.prompt_tokens
+- llm.completion_tokens
+
+Each series is labelled with the agent and the route that triggered the call.
+Counters llm.calls / llm.errors / llm.retries / llm.tool_calls are kept per agent.
+
+Token counts come from the provider's usage metadata when the response has
+it. Otherwise they are counted with tiktoken (cl100k_base, an approximation
+for non-OpenAI models), or estimated at 4 characters per token when the
+encoding cannot be loaded, e.g. offline.
+
+LLMUsageMiddleware binds a RequestUsage to each HTTP request through a context
+variable. Every call made while serving the request adds to it, including
+calls in sync handlers run on the threadpool and in tasks the handler
+spawns. The totals go out in the X-LLM-Usage header plus a Server-Timing
+`llm` entry. Headers are sent before a streamed body, so streaming responses
+only report calls made before the first byte; /metrics has the full numbers.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+
+from app.core.config import get_settings
+from app.core.metrics import COUNT_BUCKETS, LATENCY_MS_BUCKETS, TOKEN_BUCKETS, metrics
+
+logger = logging.getLogger(__name__)
+
+USAGE_HEADER = "X-LLM-Usage"
+
+metrics.define_histogram("llm.latency_ms", LATENCY_MS_BUCKETS)
+metrics.define_histogram("llm.ttft_ms", LATENCY_MS_BUCKETS)
+metrics.define_histogram("llm.prompt_tokens", TOKEN_BUCKETS)
+metrics.define_histogram("llm.completion_tokens", TOKEN_BUCKETS)
+metrics.define_histogram("llm.request_calls", COUNT_BUCKETS)
+
+
+# ---------- token counting ----------
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:  # encoding files are downloaded on first use
+        logger.info(f"tiktoken unavailable, estimating tokens from length: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _message_text(message: BaseMessage) -> str:
+    text = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    tool_calls = getattr(message, "tool_calls", None)
+    return text + (json.dumps([c["args"] for c in tool_calls]) if tool_calls else "")
+
+
+# ---------- per-request totals ----------
+@dataclass
+class RequestUsage:
+    scope: Optional[Dict[str, Any]] = field(default=None, repr=False)  # ASGI scope of the request
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    tool_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: float = 0.0  # summed over calls; concurrent calls overlap
+    ttft_ms: Optional[float] = None  # first call's time to first token
+    agents: List[str] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def route(self) -> str:
+        """"POST /features/{feature_id}"-style template once routed, so labels stay low-cardinality."""
+        if self.scope is None:
+            return "-"
+        route = self.scope.get("route")  # set in the shared scope by the router
+        return f"{self.scope.get('method', '')} {route.path if route is not None else self.scope.get('path', '')}"
+
+    def add_call(self, agent: str, prompt_tokens: int, completion_tokens: int, latency_ms: float, ttft_ms: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.latency_ms += latency_ms
+            if self.ttft_ms is None:
+                self.ttft_ms = ttft_ms
+            if agent not in self.agents:
+                self.agents.append(agent)
+
+    def add(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def cost_usd(self) -> float:
+        settings = get_settings()
+        return (
+            self.prompt_tokens * settings.llm_input_cost_per_million
+            + self.completion_tokens * settings.llm_output_cost_per_million
+        ) / 1_000_000
+
+    def header_value(self) -> str:
+        parts = [
+            f"calls={self.calls}",
+            f"prompt_tokens={self.prompt_tokens}",
+            f"completion_tokens={self.completion_tokens}",
+            f"latency_ms={self.latency_ms:.0f}",
+            f"ttft_ms={(self.ttft_ms or 0):.0f}",
+            f"retries={self.retries}",
+            f"tool_calls={self.tool_calls}",
+            f"errors={self.errors}",
+            f"agents={','.join(self.agents)}",
+        ]
+        cost = self.cost_usd()
+        if cost:
+            parts.append(f"cost_usd={cost:.6f}")
+        return "; ".join(parts)
+
+
+_REQUEST_USAGE: ContextVar[Optional[RequestUsage]] = ContextVar("llm_request_usage", default=None)
+
+
+def current_usage() -> Optional[RequestUsage]:
+    return _REQUEST_USAGE.get()
+
+
+def count_retry(agent: str) -> None:
+    """Count one retried model call; also used by app.core.resilience for its own retries."""
+    metrics.incr(f"llm.retries.{agent}")
+    usage = current_usage()
+    if usage is not None:
+        usage.add("retries")
+
+
+# ---------- callback ----------
+@dataclass
+class _Call:
+    agent: str
+    route: str
+    started: float
+    prompt_tokens: int
+    first_token: Optional[float] = None
+
+
+class LLMInstrumentation(BaseCallbackHandler):
+    """Records one set of observations per model call; shared by every agent."""
+
+    # Cheap and lock-protected: run in the caller instead of hopping to a thread per event
+    run_inline = True
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[UUID, _Call] = {}
+        self._runs: Dict[UUID, Tuple[str, FrozenSet[str]]] = {}  # open chain runs -> (agent, tags)
+
+    @staticmethod
+    def _agent(metadata: Optional[Dict[str, Any]]) -> str:
+        return (metadata or {}).get("agent", "unknown")
+
+    @staticmethod
+    def _route() -> str:
+        usage = current_usage()
+        return usage.route if usage is not None else "-"
+
+    def _start(self, run_id: UUID, metadata: Optional[Dict[str, Any]], prompt: str) -> None:
+        call = _Call(self._agent(metadata), self._route(), time.perf_counter(), count_tokens(prompt))
+        with self._lock:
+            self._calls[run_id] = call
+
+    def on_chat_model_start(self, serialized, messages: List[List[BaseMessage]], *, run_id: UUID, parent_run_id=None, tags=None, metadata=None, **kwargs) -> None:
+        self._retried(run_id, parent_run_id, tags, self._agent(metadata))
+        self._start(run_id, metadata, "\n".join(_message_text(m) for batch in messages for m in batch))
+
+    def on_llm_start(self, serialized, prompts: List[str], *, run_id: UUID, parent_run_id=None, tags=None, metadata=None, **kwargs) -> None:
+        self._retried(run_id, parent_run_id, tags, self._agent(metadata))
+        self._start(run_id, metadata, "\n".join(prompts))
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs) -> None:
+        call = self._calls.get(run_id)
+        if call is not None and call.first_token is None:
+            call.first_token = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs) -> None:
+        with self._lock:
+            call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        ended = time.perf_counter()
+        latency_ms = (ended - call.started) * 1000
+        ttft_ms = ((call.first_token or ended) - call.started) * 1000
+
+        prompt_tokens, completion_tokens = call.prompt_tokens, 0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:  # provider-reported counts win over local estimates
+                    prompt_tokens = usage.get("input_tokens", prompt_tokens)
+                    completion_tokens += usage.get("output_tokens", 0)
+                else:
+                    completion_tokens += count_tokens(_message_text(message) if message is not None else generation.text)
+
+        labels = {"agent": call.agent, "route": call.route}
+        metrics.incr(f"llm.calls.{call.agent}")
+        metrics.incr("llm.prompt_tokens_total", prompt_tokens)
+        metrics.incr("llm.completion_tokens_total", completion_tokens)
+        metrics.observe("llm.latency_ms", latency_ms, **labels)
+        metrics.observe("llm.ttft_ms", ttft_ms, **labels)
+        metrics.observe("llm.prompt_tokens", prompt_tokens, **labels)
+        metrics.observe("llm.completion_tokens", completion_tokens, **labels)
+        request_usage = current_usage()
+        if request_usage is not None:
+            request_usage.add_call(call.agent, prompt_tokens, completion_tokens, latency_ms, ttft_ms)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        with self._lock:
+            call = self._calls.pop(run_id, None)
+        agent = call.agent if call is not None else "unknown"
+        metrics.incr(f"llm.errors.{agent}")
+        usage = current_usage()
+        if usage is not None:
+            usage.add("errors")
+
+    # RunnableRetry (Runnable.with_retry) doesn't emit on_retry; it tags each later
+    # attempt's subtree "retry:attempt:N". A retry is counted at the top of that subtree.
+    def _retried(self, run_id: UUID, parent_run_id: Optional[UUID], tags: Optional[List[str]], agent: str) -> None:
+        retry_tags = {t for t in tags or [] if t.startswith("retry:attempt:")}
+        with self._lock:
+            parent = self._runs.get(parent_run_id) if parent_run_id else None
+            if not retry_tags or (parent is not None and retry_tags <= parent[1]):
+                return
+        count_retry(agent)
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id=None, tags=None, metadata=None, **kwargs) -> None:
+        self._retried(run_id, parent_run_id, tags, self._agent(metadata))
+        with self._lock:
+            self._runs[run_id] = (self._agent(metadata), frozenset(tags or []))
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs) -> None:
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    def on_retry(self, retry_state, *, run_id: UUID, **kwargs) -> None:
+        run = self._runs.get(run_id)
+        count_retry(run[0] if run is not None else "unknown")
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, metadata=None, **kwargs) -> None:
+        metrics.incr(f"llm.tool_calls.{self._agent(metadata)}")
+        usage = current_usage()
+        if usage is not None:
+            usage.add("tool_calls")
+
+
+LLM_CALLBACKS = LLMInstrumentation()
+
+
+def llm_config(agent: str, callbacks: Optional[List[BaseCallbackHandler]] = None) -> RunnableConfig:
+    """Run config every agent passes to invoke/ainvoke/astream: instrumentation plus the agent tag."""
+    return {
+        "callbacks": [LLM_CALLBACKS, *(callbacks or [])],
+        "metadata": {"agent": agent},
+        "run_name": agent,
+    }
+
+
+# ---------- per-request header ----------
+class LLMUsageMiddleware:
+    """Pure ASGI middleware so streaming responses pass through unbuffered."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        usage = RequestUsage(scope=scope)
+        token = _REQUEST_USAGE.set(usage)
+
+        async def send_with_usage(message):
+            if message["type"] == "http.response.start":
+                if usage.calls or usage.errors:
+                    metrics.observe("llm.request_calls", usage.calls, route=usage.route)
+                    headers = list(message.get("headers", []))
+                    headers.append((USAGE_HEADER.lower().encode(), usage.header_value().encode("latin-1", "replace")))
+                    headers.append((b"server-timing", f'llm;dur={usage.latency_ms:.1f};desc="{usage.calls} calls"'.encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_usage)
+        finally:
+            _REQUEST_USAGE.reset(token)
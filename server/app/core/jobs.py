@@ -0,0 +1,399 @@
+"""Background job queue for long-running generation requests.
+
+Clients submit work, get a job id back immediately and poll or stream the
+result, so API latency does not depend on how long the LLM takes.
+
+- durable: every job is a row in the `jobs` table (app.models.job)
+- in-process worker pool: `workers` asyncio tasks pull job ids from a queue
+- retries: failed attempts are requeued with exponential backoff and jitter,
+  up to `max_attempts`; raise PermanentJobError to fail without retrying
+- cancellation: queued jobs are never picked up, running ones are interrupted
+- retention: finished jobs are deleted `retention_seconds` after they finish
+
+Claiming a job is a conditional UPDATE (queued -> running), so several server
+processes can share the table without running a job twice. A job left
+"running" by a crashed process is requeued once it is well past the timeout.
+
+Sessions are sync: the workers, followers and sweeper run their database
+calls on the threadpool. The client API (submit, get, cancel) is sync too and
+may be called from threadpool threads; it hands queue and task updates to
+the workers' event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.metrics import metrics
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL = {SUCCEEDED, FAILED, CANCELLED}
+
+# handler(payload, db) -> JSON-serialisable result
+JobHandler = Callable[[Dict[str, Any], Session], Awaitable[Any]]
+
+
+class PermanentJobError(Exception):
+    """Raise from a handler to fail the job without retrying (e.g. bad input)."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class JobQueue:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        workers: int = 2,
+        max_attempts: int = 3,
+        retry_backoff_seconds: float = 2.0,
+        timeout_seconds: float = 600,
+        retention_seconds: float = 24 * 60 * 60,
+        sweep_interval_seconds: float = 300,
+    ) -> None:
+        self.session_factory = session_factory
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        self.retention_seconds = retention_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # the loop the workers run on
+        self._tasks: List[asyncio.Task] = []  # workers + sweeper
+        self._running: Dict[str, asyncio.Task] = {}  # job id -> handler task
+        self._retries: Set[asyncio.TimerHandle] = set()
+        self._changed: Dict[str, asyncio.Event] = {}  # job id -> wakes followers
+
+    # ---------- registration / lifecycle ----------
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    @property
+    def kinds(self) -> List[str]:
+        return sorted(self._handlers)
+
+    @property
+    def started(self) -> bool:
+        return self._queue is not None
+
+    async def start(self) -> None:
+        if self.started:
+            return
+        self._queue = asyncio.Queue()
+        self._loop = asyncio.get_running_loop()
+        await run_in_threadpool(self.sweep)
+        await run_in_threadpool(self._recover)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(max(1, self.workers))]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self) -> None:
+        """Stop workers; interrupted jobs go back to `queued` for the next start."""
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._loop = None
+
+    # ---------- client API ----------
+    def submit(self, kind: str, payload: Dict[str, Any], db: Session, user_id: Optional[int] = None) -> Job:
+        if kind not in self._handlers:
+            raise KeyError(kind)
+        job = Job(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            kind=kind,
+            status=QUEUED,
+            payload=jsonable_encoder(payload),
+            attempts=0,
+            max_attempts=self.max_attempts,
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        metrics.incr("jobs.submitted")
+        self._enqueue(job.id)
+        return job
+
+    def get(self, job_id: str, db: Session) -> Optional[Job]:
+        return db.get(Job, job_id)
+
+    def cancel(self, job_id: str, db: Session) -> Optional[Job]:
+        """Cancel a queued or running job. Finished jobs are returned unchanged."""
+        job = db.get(Job, job_id)
+        if job is None or job.status in TERMINAL:
+            return job
+        finished = _now()
+        job.status = CANCELLED
+        job.finished_at = finished
+        job.expires_at = finished + timedelta(seconds=self.retention_seconds)
+        db.commit()
+        db.refresh(job)
+
+        task = self._running.get(job_id)
+        if task is not None:
+            self._call_soon(task.cancel)
+        metrics.incr("jobs.cancelled")
+        self._notify(job_id)
+        return job
+
+    async def follow(self, job_id: str, poll_interval: float = 1.0) -> AsyncIterator[Job]:
+        """Yield the job each time its status or attempt count changes, until it finishes.
+
+        Changes made by this process wake followers immediately; `poll_interval`
+        covers jobs run by another process.
+        """
+        last = None
+        while True:
+            changed = self._changed.setdefault(job_id, asyncio.Event())
+            job = await run_in_threadpool(self._load, job_id)
+            if job is None:
+                return
+            state = (job.status, job.attempts)
+            if state != last:
+                last = state
+                yield job
+            if job.status in TERMINAL:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _load(self, job_id: str) -> Optional[Job]:
+        db = self.session_factory()
+        try:
+            return db.get(Job, job_id)
+        finally:
+            db.close()
+
+    # ---------- maintenance ----------
+    def sweep(self) -> int:
+        """Delete expired jobs and requeue stale `running` ones. Returns rows deleted."""
+        db = self.session_factory()
+        try:
+            now = _now()
+            deleted = (
+                db.query(Job)
+                .filter(Job.expires_at.isnot(None), Job.expires_at < now)
+                .delete(synchronize_session=False)
+            )
+            stale = (
+                db.query(Job)
+                .filter(Job.status == RUNNING, Job.started_at < now - timedelta(seconds=self.timeout_seconds * 2))
+                .update({Job.status: QUEUED}, synchronize_session=False)
+            )
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"Job sweep failed: {e}")
+            return 0
+        finally:
+            db.close()
+        if deleted:
+            metrics.incr("jobs.expired", deleted)
+        if stale:
+            logger.warning(f"Requeued {stale} stale running job(s)")
+            self._recover()
+        return deleted
+
+    def _recover(self) -> None:
+        """Enqueue every queued row, e.g. after a restart."""
+        db = self.session_factory()
+        try:
+            ids = [row.id for row in db.query(Job.id).filter(Job.status == QUEUED).order_by(Job.created_at)]
+        except SQLAlchemyError as e:
+            logger.warning(f"Job recovery failed: {e}")
+            return
+        finally:
+            db.close()
+        for job_id in ids:
+            self._enqueue(job_id)
+
+    async def _sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            await run_in_threadpool(self.sweep)
+
+    # ---------- workers ----------
+    def _call_soon(self, callback: Callable[..., Any], *args: Any) -> None:
+        """Run `callback` on the workers' loop: asyncio queues, events and tasks aren't thread-safe."""
+        if self._loop is None or _running_loop() is self._loop:
+            callback(*args)
+        else:  # called from a threadpool thread
+            self._loop.call_soon_threadsafe(callback, *args)
+
+    def _enqueue(self, job_id: str) -> None:
+        # Not started (e.g. scripts): the row stays queued and is recovered on start
+        if self._queue is not None:
+            self._call_soon(self._queue.put_nowait, job_id)
+
+    def _notify(self, job_id: str) -> None:
+        self._call_soon(self._set_changed, job_id)
+
+    def _set_changed(self, job_id: str) -> None:
+        event = self._changed.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    def _retry_later(self, job_id: str, attempt: int) -> None:
+        delay = self.retry_backoff_seconds * (2 ** (attempt - 1))
+        delay *= random.uniform(0.5, 1.5)  # jitter: don't retry a failed provider in lockstep
+        loop = asyncio.get_running_loop()
+
+        def fire() -> None:
+            self._retries.discard(handle)
+            self._enqueue(job_id)
+
+        handle = loop.call_later(delay, fire)
+        self._retries.add(handle)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Job {job_id} crashed the worker loop")
+            finally:
+                self._queue.task_done()
+
+    def _update_running(self, db: Session, job_id: str, values: Dict[Any, Any]) -> bool:
+        updated = (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.status == RUNNING)
+            .update(values, synchronize_session=False)
+        )
+        db.commit()
+        return bool(updated)
+
+    async def _finish(self, db: Session, job_id: str, values: Dict[Any, Any]) -> bool:
+        """Move a running job to its next state unless it was cancelled meanwhile."""
+        updated = await run_in_threadpool(self._update_running, db, job_id, values)
+        self._notify(job_id)
+        return updated
+
+    def _claim(self, db: Session, job_id: str) -> Optional[Job]:
+        """queued -> running; None if the job was cancelled or picked up by another process."""
+        claimed = (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.status == QUEUED)
+            .update(
+                {Job.status: RUNNING, Job.started_at: _now(), Job.attempts: Job.attempts + 1},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return db.get(Job, job_id) if claimed else None
+
+    def _status_after_rollback(self, db: Session, job_id: str) -> Optional[str]:
+        db.rollback()
+        job = db.get(Job, job_id)
+        return job.status if job is not None else None
+
+    async def _run(self, job_id: str) -> None:
+        db = self.session_factory()
+        try:
+            job = await run_in_threadpool(self._claim, db, job_id)
+            if job is None:
+                return  # cancelled, or picked up by another process
+            self._notify(job_id)
+            kind, payload, attempt, max_attempts = job.kind, dict(job.payload), job.attempts, job.max_attempts
+
+            handler = self._handlers.get(kind)
+            task = asyncio.ensure_future(
+                asyncio.wait_for(self._call(handler, kind, payload, db), timeout=self.timeout_seconds)
+            )
+            self._running[job_id] = task
+            try:
+                result = await task
+            except asyncio.CancelledError:
+                if await run_in_threadpool(self._status_after_rollback, db, job_id) == CANCELLED:
+                    return  # cancelled by the client
+                # Shutting down: hand the job back for the next start
+                await self._finish(db, job_id, {Job.status: QUEUED, Job.attempts: Job.attempts - 1})
+                raise
+            except Exception as e:
+                await run_in_threadpool(db.rollback)
+                error = str(e) or type(e).__name__
+                if isinstance(e, asyncio.TimeoutError):
+                    error = f"Timed out after {self.timeout_seconds}s"
+                if not isinstance(e, PermanentJobError) and attempt < max_attempts:
+                    if await self._finish(db, job_id, {Job.status: QUEUED, Job.error: error}):
+                        metrics.incr("jobs.retried")
+                        self._retry_later(job_id, attempt)
+                    return
+                logger.warning(f"Job {job_id} ({kind}) failed after {attempt} attempt(s): {error}")
+                finished = _now()
+                if await self._finish(db, job_id, {
+                    Job.status: FAILED,
+                    Job.error: error,
+                    Job.finished_at: finished,
+                    Job.expires_at: finished + timedelta(seconds=self.retention_seconds),
+                }):
+                    metrics.incr("jobs.failed")
+                return
+            finally:
+                self._running.pop(job_id, None)
+
+            finished = _now()
+            if await self._finish(db, job_id, {
+                Job.status: SUCCEEDED,
+                Job.result: jsonable_encoder(result),
+                Job.error: None,
+                Job.finished_at: finished,
+                Job.expires_at: finished + timedelta(seconds=self.retention_seconds),
+            }):
+                metrics.incr("jobs.succeeded")
+        finally:
+            await run_in_threadpool(db.close)
+
+    async def _call(self, handler: Optional[JobHandler], kind: str, payload: Dict[str, Any], db: Session) -> Any:
+        if handler is None:
+            raise PermanentJobError(f"No handler registered for job kind '{kind}'")
+        return await handler(payload, db)
+
+
+job_queue = JobQueue(
+    SessionLocal,
+    workers=settings.jobs_workers,
+    max_attempts=settings.jobs_max_attempts,
+    retry_backoff_seconds=settings.jobs_retry_backoff_seconds,
+    timeout_seconds=settings.jobs_timeout_seconds,
+    retention_seconds=settings.jobs_result_ttl_seconds,
+)
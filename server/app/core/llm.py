@@ -0,0 +1,114 @@
+"""Process-wide registry of chat model clients shared by every agent in app.agents.
+
+Building a ChatGoogleGenerativeAI instance sets up a fresh API client (and its
+HTTP/gRPC transport) each time. Agents ask this registry instead, so a client is
+created once per (model, temperature) and its connections stay warm across requests.
+
+With BMS_LLM_BACKEND=fake the registry hands out app.core.fake_llm.FakeChatModel
+instead, so agents run offline with a configurable latency model. With
+BMS_LLM_BACKEND=record or replay, each model is wrapped in an
+app.core.cassette.CassetteChatModel. Record mode captures real traffic to a
+cassette file; replay mode answers from that file without network access.
+
+Gemini clients are handed out wrapped in an
+app.core.resilience.ResilientChatModel. The wrapper adds per-request
+deadlines, retries with backoff, optional hedging and a circuit breaker. The
+offline backends are left unwrapped so their timing stays deterministic.
+"""
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from typing import Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from app.core.cassette import CassetteChatModel, get_cassette
+from app.core.config import get_settings
+from app.core.fake_llm import FakeChatModel
+from app.core.resilience import resilient
+
+
+def get_api_key() -> str:
+    """Resolve the Gemini API key from settings (.env supported) or raw env vars."""
+    settings = get_settings()
+    api_key = settings.api_key or os.getenv("API_KEY") or os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise RuntimeError(
+            "API key is not set. Please set API_KEY or GOOGLE_API_KEY in your environment/.env."
+        )
+    return api_key
+
+
+@lru_cache(maxsize=32)
+def _build_chat_model(model: str, temperature: float, api_key: str) -> BaseChatModel:
+    client = ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
+        google_api_key=api_key,
+    )
+    return resilient(client, name=f"gemini:{model}")
+
+
+@lru_cache(maxsize=32)
+def _build_fake_chat_model(model: str, temperature: float, ttft_ms: float, tokens_per_second: float) -> BaseChatModel:
+    return FakeChatModel(
+        model_name=model,
+        temperature=temperature,
+        ttft_ms=ttft_ms,
+        tokens_per_second=tokens_per_second,
+    )
+
+
+@lru_cache(maxsize=32)
+def _build_cassette_chat_model(mode: str, path: str, model: str, temperature: float, replay_speed: float) -> BaseChatModel:
+    # Recording wraps the real backend; replay never touches it (or needs its API key)
+    inner = _backend_chat_model(get_settings().llm_record_backend, model, temperature) if mode == "record" else None
+    return CassetteChatModel(
+        mode=mode,
+        cassette=get_cassette(path),
+        inner=inner,
+        model_name=model,
+        temperature=temperature,
+        replay_speed=replay_speed,
+    )
+
+
+def _backend_chat_model(backend: str, model: str, temperature: float) -> BaseChatModel:
+    settings = get_settings()
+    if backend == "fake":
+        return _build_fake_chat_model(
+            model,
+            temperature,
+            settings.fake_llm_ttft_ms,
+            settings.fake_llm_tokens_per_second,
+        )
+    if backend != "gemini":
+        raise RuntimeError(f"Unknown LLM backend '{backend}' (expected 'gemini' or 'fake').")
+    return _build_chat_model(model, temperature, get_api_key())
+
+
+def get_chat_model(temperature: float = 0.2, model: Optional[str] = None) -> BaseChatModel:
+    """Return the shared chat model for (model, temperature), creating it on first use."""
+    settings = get_settings()
+    # Round so 0.2 and 0.20000001 from different callers share one client
+    temperature = round(float(temperature), 2)
+    model = model or settings.llm_model
+    if settings.llm_backend in ("record", "replay"):
+        return _build_cassette_chat_model(
+            settings.llm_backend,
+            settings.llm_cassette_path,
+            model,
+            temperature,
+            settings.llm_replay_speed,
+        )
+    return _backend_chat_model(settings.llm_backend, model, temperature)
+
+
+def clear_chat_models() -> None:
+    """Drop all cached clients (e.g. after rotating the API key) and loaded cassettes."""
+    _build_chat_model.cache_clear()
+    _build_fake_chat_model.cache_clear()
+    _build_cassette_chat_model.cache_clear()
+    get_cassette.cache_clear()
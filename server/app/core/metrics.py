@@ -0,0 +1,127 @@
+"""In-process counters and histograms exposed on GET /metrics.
+
+Deliberately tiny: a dict of named integers behind a lock. Each worker
+process reports its own numbers. Hit rates are derived from pairs of
+counters declared with `define_rate`. Histograms are declared with
+`define_histogram` and have fixed buckets. Each set of labels passed to
+`observe` gets its own series.
+"""
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_MS_BUCKETS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13)
+
+
+class Histogram:
+    """Bucketed observations; quantiles are interpolated within a bucket."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return round(lower + (upper - lower) * (rank - seen) / n, 3)
+            seen += n
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative, buckets = 0, {}
+        for bound, n in zip(self.bounds, self.counts):
+            cumulative += n
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 3),
+            "buckets": buckets,
+        }
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._rates: Dict[str, Tuple[str, str]] = {}  # name -> (hits counter, misses counter)
+        self._bucket_defs: Dict[str, Tuple[float, ...]] = {}
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def define_rate(self, name: str, hits: str, misses: str) -> None:
+        self._rates[name] = (hits, misses)
+
+    def rates(self) -> Dict[str, Optional[float]]:
+        """hits / (hits + misses) for every defined rate; None before the first event."""
+        with self._lock:
+            result = {}
+            for name, (hits, misses) in self._rates.items():
+                h, m = self._counters.get(hits, 0), self._counters.get(misses, 0)
+                result[name] = round(h / (h + m), 4) if h + m else None
+            return result
+
+    def define_histogram(self, name: str, buckets: Sequence[float]) -> None:
+        self._bucket_defs[name] = tuple(buckets)
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self._bucket_defs.get(name, LATENCY_MS_BUCKETS))
+            histogram.observe(value)
+
+    def histogram(self, name: str, **labels: Any) -> Optional[Histogram]:
+        with self._lock:
+            return self._histograms.get((name, tuple(sorted((k, str(v)) for k, v in labels.items()))))
+
+    def histograms(self) -> Dict[str, List[Dict[str, Any]]]:
+        """name -> one entry per label set: {"labels": {...}, "count", "sum", "p50", "p95", "max", "buckets"}."""
+        with self._lock:
+            result: Dict[str, List[Dict[str, Any]]] = {}
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                result.setdefault(name, []).append({"labels": dict(labels), **histogram.to_dict()})
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+metrics = MetricsRegistry()
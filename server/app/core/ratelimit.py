@@ -0,0 +1,314 @@
+"""Token-bucket rate limiting per user and per company.
+
+Every request spends one token from its user's bucket and, when the user
+belongs to a company, one from the company's bucket. Each bucket holds up
+to `capacity` tokens and refills at `capacity` per `period` seconds, so a
+client can burst up to the full quota and is then held to the average rate.
+
+There are two scopes, each with its own buckets and limits:
+- "crud": cheap database-backed routes
+- "llm": routes that call the model (/plan, /roadmap, chat, generation jobs)
+
+An LLM request therefore never eats into the CRUD quota and the other way
+round. Requests without a valid token are limited per client address.
+
+Backends:
+- MemoryBackend: per process; fine for a single worker
+- SQLBackend: the rate_limit_buckets table (SQLite or Postgres); shared by
+  every worker. Spending a token is one conditional UPDATE, so concurrent
+  workers cannot spend the same token twice.
+
+A denied request gets 429 with Retry-After set to the seconds until enough
+tokens are back.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.metrics import metrics
+from app.core.security import decode_access_token
+from app.models.ratelimitbucket import RateLimitBucket
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+CRUD = "crud"
+LLM = "llm"
+
+
+@dataclass(frozen=True)
+class Limit:
+    capacity: float  # burst size, in requests
+    period: float = 60.0  # seconds to refill from empty
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period  # tokens per second
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    remaining: float
+    retry_after: float  # seconds; 0 when allowed
+
+
+def _refill(tokens: float, updated_at: float, now: float, limit: Limit) -> float:
+    return min(limit.capacity, tokens + max(0.0, now - updated_at) * limit.rate)
+
+
+def _wait(tokens: float, cost: float, limit: Limit) -> float:
+    return max(0.0, (cost - tokens) / limit.rate) if limit.rate > 0 else math.inf
+
+
+class MemoryBackend:
+    """Buckets in a dict; per process."""
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def spend(self, key: str, limit: Limit, cost: float = 1.0, now: Optional[float] = None) -> Decision:
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (limit.capacity, now))
+            tokens = _refill(tokens, updated_at, now, limit)
+            if tokens < cost:
+                self._buckets[key] = (tokens, now)
+                return Decision(False, tokens, _wait(tokens, cost, limit))
+            self._buckets[key] = (tokens - cost, now)
+            if len(self._buckets) > self.max_keys:
+                self._sweep(now)
+            return Decision(True, tokens - cost, 0.0)
+
+    def refund(self, key: str, limit: Limit, cost: float = 1.0) -> None:
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated_at = self._buckets[key]
+                self._buckets[key] = (min(limit.capacity, tokens + cost), updated_at)
+
+    def _sweep(self, now: float) -> None:
+        # Buckets idle long enough to be full again are indistinguishable from missing ones
+        stale = [key for key, (_, updated_at) in self._buckets.items() if now - updated_at > 3600]
+        for key in stale:
+            del self._buckets[key]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLBackend:
+    """Buckets in the rate_limit_buckets table, shared by every worker on the same database."""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal) -> None:
+        self.session_factory = session_factory
+
+    def spend(self, key: str, limit: Limit, cost: float = 1.0, now: Optional[float] = None) -> Decision:
+        now = time.time() if now is None else now
+        table = RateLimitBucket.__table__
+        refilled = table.c.tokens + (now - table.c.updated_at) * limit.rate
+        refilled = case((refilled > limit.capacity, limit.capacity), else_=refilled)
+        with self.session_factory() as db:
+            for _ in range(2):  # second pass only after losing a race to create the row
+                spent = db.execute(
+                    update(table)
+                    .where(table.c.key == key, refilled >= cost)
+                    .values(tokens=refilled - cost, updated_at=now)
+                    .returning(table.c.tokens)
+                ).first()
+                if spent is not None:
+                    db.commit()
+                    return Decision(True, spent[0], 0.0)
+
+                row = db.execute(select(table.c.tokens, table.c.updated_at).where(table.c.key == key)).first()
+                if row is not None:
+                    db.rollback()
+                    tokens = _refill(row.tokens, row.updated_at, now, limit)
+                    return Decision(False, tokens, _wait(tokens, cost, limit))
+                if limit.capacity < cost:
+                    db.rollback()
+                    return Decision(False, limit.capacity, math.inf)
+                try:
+                    db.execute(insert(table).values(key=key, tokens=limit.capacity - cost, updated_at=now))
+                    db.commit()
+                    return Decision(True, limit.capacity - cost, 0.0)
+                except IntegrityError:
+                    db.rollback()
+            raise RuntimeError(f"could not spend from rate limit bucket {key}")
+
+    def refund(self, key: str, limit: Limit, cost: float = 1.0) -> None:
+        table = RateLimitBucket.__table__
+        restored = case((table.c.tokens + cost > limit.capacity, limit.capacity), else_=table.c.tokens + cost)
+        with self.session_factory() as db:
+            db.execute(update(table).where(table.c.key == key).values(tokens=restored))
+            db.commit()
+
+    def sweep(self, idle_seconds: float = 3600) -> int:
+        """Delete buckets untouched for `idle_seconds`; returns how many went."""
+        table = RateLimitBucket.__table__
+        with self.session_factory() as db:
+            deleted = db.execute(delete(table).where(table.c.updated_at < time.time() - idle_seconds)).rowcount
+            db.commit()
+        return deleted
+
+    def reset(self) -> None:
+        with self.session_factory() as db:
+            db.execute(delete(RateLimitBucket.__table__))
+            db.commit()
+
+
+@dataclass(frozen=True)
+class Identity:
+    user_id: Optional[int] = None
+    company: Optional[str] = None
+    client: str = "unknown"  # remote address, for anonymous requests
+
+    def keys(self, scope: str) -> List[Tuple[str, str]]:
+        """(level, bucket key) pairs this identity spends from in `scope`."""
+        keys = [("user", f"{scope}:user:{self.user_id}" if self.user_id is not None else f"{scope}:ip:{self.client}")]
+        if self.company:
+            keys.append(("company", f"{scope}:company:{self.company.strip().lower()}"))
+        return keys
+
+
+def default_limits() -> Dict[str, Dict[str, Limit]]:
+    return {
+        CRUD: {
+            "user": Limit(settings.rate_limit_crud_per_user),
+            "company": Limit(settings.rate_limit_crud_per_company),
+        },
+        LLM: {
+            "user": Limit(settings.rate_limit_llm_per_user),
+            "company": Limit(settings.rate_limit_llm_per_company),
+        },
+    }
+
+
+class RateLimiter:
+    def __init__(self, backend, limits: Optional[Dict[str, Dict[str, Limit]]] = None, enabled: bool = True) -> None:
+        self.backend = backend
+        self.limits = limits if limits is not None else default_limits()
+        self.enabled = enabled
+
+    def hit(self, scope: str, identity: Identity, cost: float = 1.0) -> Tuple[Decision, str]:
+        """Spend `cost` from every bucket of `identity` in `scope`, or from none of them.
+
+        Returns the decision and the level ("user"/"company") that decided it:
+        the denying bucket, or the one with the fewest tokens left.
+        """
+        spent: List[Tuple[str, Limit]] = []
+        tightest: Tuple[Decision, str] = (Decision(True, math.inf, 0.0), "user")
+        for level, key in identity.keys(scope):
+            limit = self.limits[scope][level]
+            decision = self.backend.spend(key, limit, cost)
+            if not decision.allowed:
+                for spent_key, spent_limit in spent:
+                    self.backend.refund(spent_key, spent_limit, cost)  # all or nothing
+                metrics.incr(f"ratelimit.{scope}.limited")
+                return decision, level
+            spent.append((key, limit))
+            if decision.remaining < tightest[0].remaining:
+                tightest = (decision, level)
+        metrics.incr(f"ratelimit.{scope}.allowed")
+        return tightest
+
+    def reset(self) -> None:
+        self.backend.reset()
+
+
+def _build_backend():
+    if settings.rate_limit_backend == "sql":
+        return SQLBackend()
+    if settings.rate_limit_backend != "memory":
+        logger.warning(f"Unknown BMS_RATE_LIMIT_BACKEND {settings.rate_limit_backend!r}; using memory")
+    return MemoryBackend()
+
+
+rate_limiter = RateLimiter(_build_backend(), enabled=settings.rate_limit_enabled)
+
+
+# ---------- FastAPI integration ----------
+_bearer = HTTPBearer(auto_error=False)
+_companies: Dict[int, Tuple[Optional[str], float]] = {}  # user id -> (company, cached_at)
+_COMPANY_TTL_SECONDS = 300.0
+
+
+def _company_of(user_id: int) -> Optional[str]:
+    cached = _companies.get(user_id)
+    if cached is not None and time.monotonic() - cached[1] < _COMPANY_TTL_SECONDS:
+        return cached[0]
+    try:
+        with SessionLocal() as db:
+            company = db.execute(select(User.company).where(User.id == user_id)).scalar_one_or_none()
+    except Exception as e:
+        logger.warning(f"Rate limiter could not look up the company of user {user_id}: {e}")
+        return None
+    _companies[user_id] = (company, time.monotonic())
+    return company
+
+
+async def rate_limit_identity(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+) -> Identity:
+    """Who a request is billed to: the token's user and company, else the client address.
+
+    Only the token signature is checked here; the route's own auth still
+    decides whether the request is allowed at all.
+    """
+    client = request.client.host if request.client else "unknown"
+    payload = decode_access_token(credentials.credentials) if credentials else None
+    if not payload or not str(payload.get("sub", "")).isdigit():
+        return Identity(client=client)
+    user_id = int(payload["sub"])
+    company = await run_in_threadpool(_company_of, user_id)
+    return Identity(user_id=user_id, company=company, client=client)
+
+
+def rate_limit(scope: str):
+    """Dependency factory; routes use crud_rate_limit / llm_rate_limit below."""
+
+    async def check(response: Response, identity: Identity = Depends(rate_limit_identity)) -> None:
+        if not rate_limiter.enabled:
+            return
+        if isinstance(rate_limiter.backend, MemoryBackend):
+            decision, level = rate_limiter.hit(scope, identity)
+        else:
+            decision, level = await run_in_threadpool(rate_limiter.hit, scope, identity)
+        limit = rate_limiter.limits[scope][level]
+        headers = {
+            "X-RateLimit-Limit": str(int(limit.capacity)),
+            "X-RateLimit-Remaining": str(int(max(0.0, decision.remaining))),
+            "X-RateLimit-Scope": f"{scope}:{level}",
+        }
+        if not decision.allowed:
+            retry_after = decision.retry_after if math.isfinite(decision.retry_after) else limit.period
+            headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded for {level} ({scope} requests)",
+                headers=headers,
+            )
+        response.headers.update(headers)
+
+    return check
+
+
+crud_rate_limit = rate_limit(CRUD)
+llm_rate_limit = rate_limit(LLM)
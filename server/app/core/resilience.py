@@ -0,0 +1,410 @@
+"""Timeouts, retries, hedging and a circuit breaker for upstream model calls.
+
+The registry (app.core.llm) wraps every Gemini client in a
+ResilientChatModel, so all agents get the same policy without code of their
+own:
+
+- deadline budget: LLM routes set a per-request deadline (llm_deadline,
+  BMS_LLM_DEADLINE_SECONDS / BMS_LLM_ROUTE_DEADLINES). Every attempt is cut
+  short at whichever comes first, the attempt timeout
+  (BMS_LLM_ATTEMPT_TIMEOUT_SECONDS) or the request's remaining budget.
+  When the budget runs out the call fails with DeadlineExceededError.
+- retries: timeouts, 429s and 5xx from the provider are retried up to
+  BMS_LLM_MAX_ATTEMPTS times, with exponential backoff and jitter. A retry
+  is never started if it couldn't finish inside the budget. Other errors
+  (bad request, parsing) are raised immediately.
+- hedging (BMS_LLM_HEDGE_ENABLED, off by default): if a call is still
+  running after the p95 latency observed for its agent and route, a
+  duplicate is sent and the first answer wins. The p95 comes from the
+  llm.latency_ms histogram (app.core.instrumentation). There is no hedging
+  until BMS_LLM_HEDGE_MIN_SAMPLES calls have been seen, and streams are
+  never hedged.
+- circuit breaker: after BMS_LLM_BREAKER_FAILURE_THRESHOLD consecutive
+  retryable failures the breaker opens, and calls fail fast with
+  CircuitOpenError for BMS_LLM_BREAKER_RESET_SECONDS. After that one probe
+  call is let through; success closes the breaker, failure opens it again.
+
+Synchronous calls (invoke/stream) get retries and the breaker but no
+timeouts, since a blocking client call can't be interrupted. The async
+paths used by the routes get everything.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator, NoReturn, Optional
+
+from fastapi import Request
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from app.core.config import get_settings, settings
+from app.core.instrumentation import count_retry, current_usage
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+try:  # Provider errors worth retrying; google-api-core ships with langchain-google-genai
+    from google.api_core import exceptions as google_exceptions  # type: ignore
+
+    _PROVIDER_RETRYABLE: tuple = (
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.InternalServerError,
+        google_exceptions.BadGateway,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.GatewayTimeout,
+        google_exceptions.DeadlineExceeded,
+    )
+except Exception:  # pragma: no cover - provider SDK not installed
+    _PROVIDER_RETRYABLE = ()
+
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class LLMUnavailableError(RuntimeError):
+    """The model could not answer in time or is failing; `retry_after` is a hint in seconds."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float = 1.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+class DeadlineExceededError(LLMUnavailableError):
+    status_code = 504
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, LLMUnavailableError):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError) + _PROVIDER_RETRYABLE):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return isinstance(status, int) and status in _RETRYABLE_STATUS
+
+
+# ---------- deadline budget ----------
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)  # time.monotonic() value
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left for the current request's model calls; None when there is no deadline."""
+    deadline = _DEADLINE.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def set_deadline(seconds: Optional[float]):
+    """Start a budget of `seconds` for model calls in this context; returns a token for _DEADLINE.reset."""
+    return _DEADLINE.set(None if seconds is None else time.monotonic() + seconds)
+
+
+def route_budget(path: str) -> float:
+    return settings.llm_route_deadlines.get(path, settings.llm_deadline_seconds)
+
+
+async def llm_deadline(request: Request) -> None:
+    """Route dependency: start the request's deadline budget for model calls.
+
+    Async on purpose: FastAPI awaits it in the endpoint's own context, so the
+    budget is visible to the handler (and to any stream it returns).
+    """
+    route = request.scope.get("route")
+    set_deadline(route_budget(getattr(route, "path", request.url.path)))
+
+
+# ---------- circuit breaker ----------
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        return self.OPEN if now - self._opened_at < self.reset_seconds else self.HALF_OPEN
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go ahead now."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(now)
+            if state == self.CLOSED:
+                return
+            # One probe at a time while half open; a probe that never reported back expires
+            if state == self.HALF_OPEN and (self._probe_started is None or now - self._probe_started > self.reset_seconds):
+                self._probe_started = now
+                return
+            retry_after = max(0.0, self.reset_seconds - (now - self._opened_at)) if state == self.OPEN else 1.0
+        metrics.incr(f"llm.circuit.{self.name}.rejected")
+        raise CircuitOpenError(f"LLM provider '{self.name}' is failing; not calling it for now", retry_after)
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"Circuit for {self.name} closed")
+            self._failures, self._opened_at, self._probe_started = 0, None, None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            reopen = self._probe_started is not None or (
+                self._opened_at is None and self._failures >= self.failure_threshold
+            )
+            self._probe_started = None
+            if reopen:
+                self._opened_at = time.monotonic()
+        if reopen:
+            metrics.incr(f"llm.circuit.{self.name}.opened")
+            logger.warning(f"Circuit for {self.name} opened after {self._failures} failures")
+
+    def reset(self) -> None:
+        self.record_success()
+
+
+_breakers: dict = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """One breaker per upstream model, shared by every temperature's client."""
+    with _breakers_lock:
+        if name not in _breakers:
+            config = get_settings()
+            _breakers[name] = CircuitBreaker(
+                name, config.llm_breaker_failure_threshold, config.llm_breaker_reset_seconds
+            )
+        return _breakers[name]
+
+
+# ---------- wrapper model ----------
+class ResilientChatModel(BaseChatModel):
+    """Applies the module's policies around every call to `inner`."""
+
+    inner: BaseChatModel
+    breaker: CircuitBreaker
+    max_attempts: int = 3
+    attempt_timeout: float = 60.0
+    backoff_seconds: float = 0.5
+    hedge: bool = False
+    hedge_min_samples: int = 20
+
+    @property
+    def _llm_type(self) -> str:
+        return f"resilient-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"inner": self.inner._identifying_params}
+
+    def bind_tools(self, tools, **kwargs):
+        # The inner model formats tools its own way; keep its kwargs and hand them back on each call
+        return self.bind(**self.inner.bind_tools(tools, **kwargs).kwargs)
+
+    # ---------- policy helpers ----------
+    @staticmethod
+    def _agent(run_manager) -> str:
+        return (getattr(run_manager, "metadata", None) or {}).get("agent", "unknown")
+
+    def _timeout(self) -> float:
+        remaining = remaining_budget()
+        if remaining is not None and remaining <= 0:
+            metrics.incr("llm.deadline_exceeded")
+            raise DeadlineExceededError("LLM deadline budget exhausted", retry_after=1.0)
+        return self.attempt_timeout if remaining is None else min(self.attempt_timeout, remaining)
+
+    def _backoff(self, attempt: int) -> float:
+        delay = self.backoff_seconds * (2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.5)  # jitter: don't retry a failed provider in lockstep
+
+    def _should_retry(self, error: BaseException, attempt: int, agent: str) -> Optional[float]:
+        """Backoff before the next attempt, or None to give up and raise `error`."""
+        if not is_retryable(error):
+            self.breaker.record_success()  # the provider answered; the request itself was bad
+            return None
+        remaining = remaining_budget()
+        if isinstance(error, asyncio.TimeoutError) and remaining is not None and remaining <= 0:
+            return None  # the caller's budget ran out, which says nothing about the provider
+        self.breaker.record_failure()
+        if attempt >= self.max_attempts:
+            return None
+        delay = self._backoff(attempt)
+        if remaining is not None and remaining <= delay:
+            return None  # the next attempt couldn't finish in time
+        count_retry(agent)
+        logger.info(f"Retrying {agent} LLM call in {delay:.2f}s after {type(error).__name__}: {error}")
+        return delay
+
+    @staticmethod
+    def _give_up(error: BaseException, agent: str, attempts: int) -> NoReturn:
+        """Re-raise `error`; a timeout becomes DeadlineExceededError so routes can answer 504."""
+        if isinstance(error, asyncio.TimeoutError):
+            metrics.incr(f"llm.timeouts.{agent}")
+            raise DeadlineExceededError(f"{agent} LLM call timed out after {attempts} attempt(s)") from error
+        raise error
+
+    def _hedge_delay(self, agent: str) -> Optional[float]:
+        if not self.hedge:
+            return None
+        usage = current_usage()
+        histogram = metrics.histogram("llm.latency_ms", agent=agent, route=usage.route if usage is not None else "-")
+        if histogram is None or histogram.count < self.hedge_min_samples:
+            return None
+        return histogram.quantile(0.95) / 1000
+
+    async def _hedged(self, call, delay: float) -> ChatResult:
+        """Run `call`; if it is still going after `delay`, race a duplicate against it."""
+        primary = asyncio.ensure_future(call())
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        metrics.incr("llm.hedges.sent")
+        hedge = asyncio.ensure_future(call())
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            metrics.incr("llm.hedges.won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()  # the loser (or both, if we were cancelled)
+
+    # ---------- LangChain hooks ----------
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        agent = self._agent(run_manager)
+        attempt = 0
+        while True:
+            attempt += 1
+            self._timeout()  # only checks the budget; blocking calls can't be interrupted
+            self.breaker.before_call()
+            try:
+                result = self.inner._generate(messages, stop=stop, **kwargs)
+            except Exception as e:
+                delay = self._should_retry(e, attempt, agent)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        agent = self._agent(run_manager)
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._timeout()
+            self.breaker.before_call()
+            hedge_delay = self._hedge_delay(agent)
+            call = lambda: self.inner._agenerate(messages, stop=stop, **kwargs)  # noqa: E731
+            try:
+                pending = call() if hedge_delay is None or hedge_delay >= timeout else self._hedged(call, hedge_delay)
+                result = await asyncio.wait_for(pending, timeout)
+            except Exception as e:
+                delay = self._should_retry(e, attempt, agent)
+                if delay is None:
+                    self._give_up(e, agent, attempt)
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        agent = self._agent(run_manager)
+        attempt = 0
+        while True:
+            attempt += 1
+            self._timeout()
+            self.breaker.before_call()
+            chunks = self.inner._stream(messages, stop=stop, **kwargs)
+            try:
+                first = next(chunks, None)
+            except Exception as e:
+                delay = self._should_retry(e, attempt, agent)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            break
+        if first is not None:
+            yield first
+        yield from chunks  # once text has been sent there is no retrying
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        agent = self._agent(run_manager)
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._timeout()
+            self.breaker.before_call()
+            chunks = self.inner._astream(messages, stop=stop, **kwargs).__aiter__()
+            try:
+                first: Optional[ChatGenerationChunk] = await asyncio.wait_for(chunks.__anext__(), timeout)
+            except StopAsyncIteration:
+                first = None
+            except Exception as e:
+                delay = self._should_retry(e, attempt, agent)
+                if delay is None:
+                    self._give_up(e, agent, attempt)
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            break
+        if first is None:
+            return
+        yield first
+        # Once text has been sent there is no retrying; a stalled stream still can't outlive the budget
+        while True:
+            remaining = remaining_budget()
+            timeout = self.attempt_timeout if remaining is None else min(self.attempt_timeout, max(remaining, 0.0))
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError as e:
+                metrics.incr(f"llm.timeouts.{agent}")
+                raise DeadlineExceededError("LLM stream stalled past its deadline") from e
+            yield chunk
+
+
+def resilient(inner: BaseChatModel, name: str) -> ResilientChatModel:
+    """Wrap `inner` with the configured policies; `name` picks the circuit breaker."""
+    config = get_settings()
+    return ResilientChatModel(
+        inner=inner,
+        breaker=get_breaker(name),
+        max_attempts=max(1, config.llm_max_attempts),
+        attempt_timeout=config.llm_attempt_timeout_seconds,
+        backoff_seconds=config.llm_retry_backoff_seconds,
+        hedge=config.llm_hedge_enabled,
+        hedge_min_samples=config.llm_hedge_min_samples,
+    )
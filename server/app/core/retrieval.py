@@ -0,0 +1,96 @@
+"""Small in-process TF-IDF index for ranking short texts (feature names) against a query.
+
+The vocabulary is built from the indexed documents, so there are no hash
+collisions, and query terms outside it simply don't contribute. Documents
+are L2-normalised sublinear TF-IDF vectors stored as per-term posting lists
+(NumPy arrays of rows and weights). A query only touches the postings of its
+own terms, and memory grows with the number of tokens rather than
+documents x vocabulary. That fits per-project corpora of a few thousand
+short documents. It is not meant for large text collections.
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or the to with via per "
+    "new add adding allow allows support feature features".split()
+)
+
+
+def _stem(word: str) -> str:
+    # Crude suffix stripping so "invoices"/"invoice" and "reporting"/"report" share a term
+    for suffix in ("ing", "ed", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    words = [_stem(w) for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+    # Adjacent-word bigrams reward phrase matches ("password reset") over scattered words
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class TfidfIndex:
+    """Cosine-similarity search over `docs`; `keys[i]` identifies `docs[i]`."""
+
+    def __init__(self, keys: Sequence, docs: Sequence[str]) -> None:
+        self.keys = list(keys)
+        counted = [Counter(tokenize(doc)) for doc in docs]
+        document_frequency: Counter = Counter()
+        for counts in counted:
+            document_frequency.update(counts.keys())
+        n = len(counted)
+        # Smoothed idf as in scikit-learn: terms in every document still weigh 1
+        self.idf: Dict[str, float] = {
+            term: math.log((1 + n) / (1 + df)) + 1 for term, df in document_frequency.items()
+        }
+
+        # Inverted index: term -> (document rows, L2-normalised sublinear tf-idf weights)
+        rows: Dict[str, List[int]] = {}
+        weights: Dict[str, List[float]] = {}
+        for row, counts in enumerate(counted):
+            weighted = {term: (1 + math.log(tf)) * self.idf[term] for term, tf in counts.items()}
+            norm = math.sqrt(sum(w * w for w in weighted.values())) or 1.0
+            for term, w in weighted.items():
+                rows.setdefault(term, []).append(row)
+                weights.setdefault(term, []).append(w / norm)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            term: (np.asarray(rows[term], dtype=np.int32), np.asarray(weights[term], dtype=np.float32))
+            for term in rows
+        }
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def vectorize(self, text: str) -> Dict[str, float]:
+        """Normalised query weights for the terms that occur in the index."""
+        counts = Counter(t for t in tokenize(text) if t in self.idf)
+        weighted = {term: (1 + math.log(tf)) * self.idf[term] for term, tf in counts.items()}
+        norm = math.sqrt(sum(w * w for w in weighted.values())) or 1.0
+        return {term: w / norm for term, w in weighted.items()}
+
+    def scores(self, query: str) -> np.ndarray:
+        """Cosine similarity of `query` to every document, in index order."""
+        scores = np.zeros(len(self.keys), dtype=np.float32)
+        for term, weight in self.vectorize(query).items():
+            rows, values = self.postings[term]
+            scores[rows] += weight * values  # a term occurs at most once per row
+        return scores
+
+    def search(self, query: str, k: int, min_score: float = 0.0) -> List[Tuple[object, float]]:
+        """Top `k` (key, score) pairs with score > `min_score`, best first."""
+        scores = self.scores(query)
+        if k <= 0 or not len(scores):
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.keys[i], float(scores[i])) for i in top if scores[i] > min_score]
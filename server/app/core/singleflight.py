@@ -0,0 +1,104 @@
+"""Single-flight coalescing for identical in-flight async calls.
+
+When several requests ask for the same thing at once, for example a team
+opening the same project and each client firing /system-design with the
+same payload, only the first caller (the leader) starts the upstream call.
+The others join it while it is in flight and get the same result, or the
+same exception. Nothing is cached: once the call finishes the next
+identical request starts a fresh one. Pair this with app.core.cache for
+results that stay valid.
+
+The shared call runs in its own task, so a caller that gives up (client
+disconnect, timeout) doesn't cancel it for the rest. It is only cancelled
+when every caller has gone. Followers get a deep copy of the result, so
+one request mutating its answer can't leak into another.
+
+Metrics, per group name:
+- singleflight.<name>.leaders: upstream calls made
+- singleflight.<name>.coalesced: calls saved
+- rate singleflight.<name>.coalesced_rate
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import functools
+import hashlib
+import inspect
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call:
+    task: asyncio.Task
+    loop: asyncio.AbstractEventLoop
+    waiters: int = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        metrics.define_rate(
+            f"singleflight.{name}.coalesced_rate", f"singleflight.{name}.coalesced", f"singleflight.{name}.leaders"
+        )
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await `fn()`, or the identical call already in flight under `key`."""
+        loop = asyncio.get_running_loop()
+        call = self._calls.get(key)
+        leader = call is None or call.loop is not loop  # never join a task from another event loop
+        if leader:
+            call = _Call(asyncio.ensure_future(fn()), loop)
+            self._calls[key] = call
+            call.task.add_done_callback(functools.partial(self._forget, key, call))
+            metrics.incr(f"singleflight.{self.name}.leaders")
+        else:
+            metrics.incr(f"singleflight.{self.name}.coalesced")
+
+        call.waiters += 1
+        try:
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()  # every caller was cancelled; nobody is left to use the answer
+        return result if leader else copy.deepcopy(result)
+
+    def _forget(self, key: str, call: _Call, _task: asyncio.Task) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+def call_key(fn: Callable, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> str:
+    """sha256 of the call's arguments, with defaults filled in so f(x) and f(x, y=default) match."""
+    bound = inspect.signature(fn).bind(*args, **kwargs)
+    bound.apply_defaults()
+    encoded = json.dumps(
+        [fn.__module__, fn.__qualname__, bound.arguments], sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def coalesce(name: str, group: Optional[SingleFlight] = None):
+    """Decorator for async agent functions: identical concurrent calls share one upstream call."""
+    flight = group or SingleFlight(name)
+
+    def decorate(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            return await flight.do(call_key(fn, args, kwargs), lambda: fn(*args, **kwargs))
+
+        wrapper.singleflight = flight  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorate
@@ -0,0 +1,111 @@
+"""Uniform grid index for axis-aligned boxes (diagram nodes).
+
+Space is cut into square cells of `cell_size`; every box is listed in each
+cell it overlaps. A viewport query only visits the cells the viewport
+covers, then checks the candidates exactly, so its cost follows what is on
+screen rather than the size of the diagram. Moving a box re-files only that
+box. The grid suits the roughly uniform node sizes of a diagram. A box that
+would cover more than `max_cells_per_box` cells is kept in an overflow set
+instead, which every query checks directly, so one oversized box can't make
+inserts or queries walk millions of cells.
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, Hashable, Iterator, List, Set, Tuple
+
+Box = Tuple[float, float, float, float]  # x, y, w, h (top-left corner)
+Cell = Tuple[int, int]
+
+MAX_CELLS_PER_BOX = 1024
+
+
+class GridIndex:
+    def __init__(self, cell_size: float = 256.0, max_cells_per_box: int = MAX_CELLS_PER_BOX) -> None:
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = float(cell_size)
+        self.max_cells_per_box = max_cells_per_box
+        self._boxes: Dict[Hashable, Box] = {}
+        self._cells: Dict[Cell, Set[Hashable]] = {}
+        self._overflow: Set[Hashable] = set()  # boxes too big to file cell by cell
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._boxes
+
+    def _span(self, x0: float, y0: float, x1: float, y1: float) -> Tuple[range, range]:
+        size = self.cell_size
+        return (
+            range(math.floor(x0 / size), math.floor(x1 / size) + 1),
+            range(math.floor(y0 / size), math.floor(y1 / size) + 1),
+        )
+
+    def _box_span(self, box: Box) -> Tuple[range, range]:
+        x, y, w, h = box
+        return self._span(x, y, x + max(0.0, w), y + max(0.0, h))
+
+    def _oversized(self, columns: range, rows: range) -> bool:
+        return len(columns) * len(rows) > self.max_cells_per_box
+
+    def _cells_of(self, box: Box) -> Iterator[Cell]:
+        columns, rows = self._box_span(box)
+        for cx in columns:
+            for cy in rows:
+                yield cx, cy
+
+    def insert(self, key: Hashable, box: Box) -> None:
+        """Add `key`, or move it if it is already indexed."""
+        if not all(math.isfinite(v) for v in box):
+            raise ValueError(f"Box coordinates must be finite: {box!r}")
+        if key in self._boxes:
+            if self._boxes[key] == box:
+                return
+            self.remove(key)
+        self._boxes[key] = box
+        if self._oversized(*self._box_span(box)):
+            self._overflow.add(key)
+            return
+        for cell in self._cells_of(box):
+            self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key: Hashable) -> None:
+        box = self._boxes.pop(key, None)
+        if box is None:
+            return
+        if key in self._overflow:
+            self._overflow.discard(key)
+            return
+        for cell in self._cells_of(box):
+            members = self._cells.get(cell)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._cells[cell]
+
+    def box(self, key: Hashable) -> Box:
+        return self._boxes[key]
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> List[Hashable]:
+        """Keys whose boxes intersect the rectangle (x0, y0)-(x1, y1), edges included."""
+        if not all(math.isfinite(v) for v in (x0, y0, x1, y1)):
+            raise ValueError("Query coordinates must be finite")
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        columns, rows = self._span(x0, y0, x1, y1)
+        if len(columns) * len(rows) > len(self._cells):
+            candidates = self._boxes.keys()  # zoomed far out: scanning every box is cheaper
+        else:
+            seen: Set[Hashable] = set(self._overflow)
+            for cx in columns:
+                for cy in rows:
+                    seen.update(self._cells.get((cx, cy), ()))
+            candidates = seen
+        hits = []
+        for key in candidates:
+            x, y, w, h = self._boxes[key]
+            if x <= x1 and x + w >= x0 and y <= y1 and y + h >= y0:
+                hits.append(key)
+        return hits
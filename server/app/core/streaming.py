@@ -0,0 +1,165 @@
+"""Server-Sent Events helpers for streaming LLM output to the client.
+
+Routes opt in when the client sends `Accept: text/event-stream`. The stream is:
+
+    event: token    data: {"text": "<chunk>"}        (repeated)
+    event: summary  data: {"chars": ..., "chunks": ..., "ttft_ms": ..., "duration_ms": ..., "cache": ...}
+
+or a single `event: error` if generation fails midway. If the client disconnects,
+Starlette cancels the response task; the upstream model stream is closed and the
+partial output is not cached.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.core.cache import response_cache, HIT, MISS, BYPASS
+from app.core.metrics import metrics
+
+EVENT_STREAM = "text/event-stream"
+
+
+def wants_event_stream(request: Request) -> bool:
+    return EVENT_STREAM in request.headers.get("accept", "").lower()
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _replay(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def stream_events(
+    chunks: AsyncIterator[str],
+    *,
+    on_complete: Optional[Callable[[str], Union[None, Awaitable[None]]]] = None,
+    summary: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[str]:
+    """Forward model chunks as `token` events, then emit one `summary` event.
+
+    `on_complete` (sync or async) receives the full text only if the stream ran to the end.
+    """
+    started = time.perf_counter()
+    first_token_at: Optional[float] = None
+    parts = []
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            parts.append(chunk)
+            yield sse_event("token", {"text": chunk})
+
+        text = "".join(parts)
+        if on_complete is not None:
+            completed = on_complete(text)
+            if inspect.isawaitable(completed):
+                await completed
+        finished = time.perf_counter()
+        yield sse_event(
+            "summary",
+            {
+                "chars": len(text),
+                "chunks": len(parts),
+                "ttft_ms": round(((first_token_at or finished) - started) * 1000, 1),
+                "duration_ms": round((finished - started) * 1000, 1),
+                **(summary or {}),
+            },
+        )
+    except asyncio.CancelledError:
+        # Client went away; don't cache a truncated document
+        metrics.incr("sse.disconnects")
+        raise
+    except Exception as e:
+        metrics.incr("sse.errors")
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()  # stop pulling from the model
+
+
+async def stream_stages(
+    stages: AsyncIterator[Tuple[str, Dict[str, Any]]],
+    *,
+    summary: Optional[Callable[[], Dict[str, Any]]] = None,
+) -> AsyncIterator[str]:
+    """Forward (event, data) pairs from a multi-stage pipeline, then one `summary` event."""
+    started = time.perf_counter()
+    count = 0
+    try:
+        async for name, data in stages:
+            count += 1
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            yield sse_event(name, {**data, "elapsed_ms": elapsed_ms})
+        yield sse_event(
+            "summary",
+            {
+                "events": count,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                **(summary() if summary else {}),
+            },
+        )
+    except asyncio.CancelledError:
+        metrics.incr("sse.disconnects")
+        raise
+    except Exception as e:
+        metrics.incr("sse.errors")
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        await stages.aclose()
+
+
+async def cached_event_stream(
+    agent: str,
+    key: str,
+    open_stream: Callable[[], AsyncIterator[str]],
+    *,
+    db: Optional[Session] = None,
+    bypass: bool = False,
+    temperature: float = 0.2,
+    columns: Optional[Dict[str, Any]] = None,
+) -> StreamingResponse:
+    """SSE counterpart of ResponseCache.get_or_generate.
+
+    A cache hit is replayed as a single token event; a miss streams from the
+    model and stores the finished document.
+
+    The document is finished after the route has returned and `get_db` may
+    have closed `db`, so only its engine is kept: the final write runs in a
+    short-lived session of its own (ResponseCache.astore).
+    """
+    bind = db.get_bind() if db is not None else None
+    cached = None
+    if bypass:
+        metrics.incr("llm_cache.bypass")
+    else:
+        cached = await response_cache.alookup(agent, key, bind=bind)
+
+    if cached is not None:
+        status = HIT
+        events = stream_events(_replay(cached), summary={"cache": status})
+    else:
+        status = BYPASS if bypass else MISS
+
+        async def store(text: str) -> None:
+            await response_cache.astore(agent, key, text, bind=bind, temperature=temperature, columns=columns)
+
+        events = stream_events(open_stream(), on_complete=store, summary={"cache": status})
+
+    return StreamingResponse(
+        events,
+        media_type=EVENT_STREAM,
+        headers={"Cache-Control": "no-cache", "X-Cache": status, "X-Accel-Buffering": "no"},
+    )
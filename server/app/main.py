@@ -1,8 +1,14 @@
-from fastapi import FastAPI
-from fastapi.responses import PlainTextResponse
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import load_env
+from app.core.db import dispose_async_engine
+from app.core.instrumentation import LLMUsageMiddleware
+from app.core.jobs import job_queue
+from app.core.resilience import LLMUnavailableError
 from app.routes.health import router as health_router
 from app.routes.root import router as root_router
 from app.routes.roadmap import router as roadmap_router
@@ -20,12 +26,24 @@ from app.routes.chat import router as chat_router
 from app.routes.project_milestones import router as project_milestones_router
 from app.routes.tech_stack import router as tech_stack_router
 from app.routes.features import router as features_router
+from app.routes.metrics import router as metrics_router
+from app.routes.jobs import router as jobs_router
 
 
 # Ensure environment variables from .env are loaded at startup
 load_env()
 
-app = FastAPI(title="ProductManager", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background workers for /jobs live as long as the server process
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    await dispose_async_engine()
+
+
+app = FastAPI(title="ProductManager", version="0.1.0", lifespan=lifespan)
 
 # Enable CORS for Vite dev server
 app.add_middleware(
@@ -36,6 +54,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request LLM usage header (X-LLM-Usage) and route labels for LLM metrics
+app.add_middleware(LLMUsageMiddleware)
+
+# Provider timeouts and an open circuit are the provider's state, not a server bug
+@app.exception_handler(LLMUnavailableError)
+async def llm_unavailable_handler(request: Request, exc: LLMUnavailableError):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
 # Include routers
 app.include_router(health_router)
 app.include_router(root_router)
@@ -53,4 +83,6 @@ app.include_router(user_project_router)
 app.include_router(chat_router)
 app.include_router(project_milestones_router)
 app.include_router(tech_stack_router)
-app.include_router(features_router)
\ No newline at end of file
+app.include_router(features_router)
+app.include_router(metrics_router)
+app.include_router(jobs_router)
\ No newline at end of file
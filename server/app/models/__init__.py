@@ -1,7 +1,13 @@
 from .roadmap import Roadmap
 from .milestoneplan import MilestonePlan
+from .taskplan import TaskPlan
 from .user import User
 from .project import Project
 from .projectuml import ProjectUML
 from .taskassignment import TaskAssignment
 from .userproject import UserProject
+from .job import Job
+from .featuredependency import FeatureDependency
+from .chatsession import ChatSession, ChatMessage
+from .ratelimitbucket import RateLimitBucket
+from .projectumlrevision import ProjectUMLRevision
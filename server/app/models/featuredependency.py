@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from sqlalchemy import CheckConstraint, Column, DateTime, ForeignKey, Integer, String, func
+from app.core.db import Base
+
+
+class FeatureDependency(Base):
+    """Edge `feature_id` -> `depends_on_id`: the feature needs the other one first."""
+
+    __tablename__ = "feature_dependencies"
+    __table_args__ = (CheckConstraint("feature_id <> depends_on_id", name="ck_feature_dependencies_not_self"),)
+
+    feature_id = Column(Integer, ForeignKey("features.id", ondelete="CASCADE"), primary_key=True)
+    depends_on_id = Column(Integer, ForeignKey("features.id", ondelete="CASCADE"), primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    source = Column(String(20), nullable=False, default="manual")  # manual | llm (analyze-dependencies)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
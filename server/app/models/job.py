@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, func
+from app.core.db import Base
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String(36), primary_key=True)  # uuid4 hex, handed to the client
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)  # owner; only they can read or cancel it
+    kind = Column(String(50), nullable=False)  # plan | system-design | analyze-dependencies
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    payload = Column(JSON, nullable=False)  # validated request body
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)  # result retention
@@ -12,4 +12,5 @@ class MilestonePlan(Base):
     tech_stack = Column(String(255), nullable=True)
     temperature = Column(Float, nullable=False, default=0.2)
     content = Column(Text, nullable=False)  # generated milestones markdown/text
+    cache_key = Column(String(64), nullable=True, index=True)  # response cache lookup (app.core.cache)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
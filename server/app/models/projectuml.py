@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, JSON
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.core.db import Base
@@ -12,7 +12,9 @@ class ProjectUML(Base):
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=True)
     type = Column(String(20), nullable=False)
-    uml_schema = Column(JSONB, nullable=False)
+    uml_schema = Column(JSON().with_variant(JSONB, "postgresql"), nullable=False)  # JSONB on Postgres
+    # Bumped by every PATCH/PUT; clients send the revision they edited (optimistic concurrency)
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationship to project
     project = relationship("Project", back_populates="umls")
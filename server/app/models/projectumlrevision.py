@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, Integer, DateTime, JSON, ForeignKey, UniqueConstraint, func
+from app.core.db import Base
+
+
+class ProjectUMLRevision(Base):
+    """One step in a diagram's history: the JSON Patch that produced it, plus periodic full snapshots."""
+
+    __tablename__ = "project_uml_revisions"
+    __table_args__ = (UniqueConstraint("uml_id", "revision", name="uq_project_uml_revisions_uml_revision"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    uml_id = Column(Integer, ForeignKey("project_uml.id", ondelete="CASCADE"), nullable=False, index=True)
+    revision = Column(Integer, nullable=False)
+    patch = Column(JSON(none_as_null=True), nullable=True)  # RFC 6902 operations from revision - 1; null for full replacements
+    snapshot = Column(JSON(none_as_null=True), nullable=True)  # the whole document at this revision, every few revisions
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, Float, String
+from app.core.db import Base
+
+
+class RateLimitBucket(Base):
+    """Shared token-bucket state for app.core.ratelimit's SQL backend."""
+
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(255), primary_key=True)  # e.g. "llm:user:42", "crud:company:acme"
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)  # unix time of the last refill, in seconds
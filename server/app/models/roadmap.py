@@ -13,4 +13,5 @@ class Roadmap(Base):
     best_practices = Column(Text, nullable=True)
     temperature = Column(Float, nullable=False, default=0.2)
     content = Column(Text, nullable=False)  # generated roadmap markdown/text
+    cache_key = Column(String(64), nullable=True, index=True)  # response cache lookup (app.core.cache)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
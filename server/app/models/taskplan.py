@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, func
+from app.core.db import Base
+
+
+class TaskPlan(Base):
+    __tablename__ = "task_plans"
+
+    id = Column(Integer, primary_key=True, index=True)
+    milestones = Column(Text, nullable=False)  # the milestones the plan was generated from
+    tech_stack = Column(String(255), nullable=True)
+    temperature = Column(Float, nullable=False, default=0.2)
+    content = Column(Text, nullable=False)  # generated daily task plan markdown
+    cache_key = Column(String(64), nullable=True, index=True)  # response cache lookup (app.core.cache)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
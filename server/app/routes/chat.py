@@ -1,17 +1,86 @@
-from fastapi import APIRouter, Depends
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.agents.chatAgentLLM import chat_with_agent
+from app import schema as schemas
+from app.agents import chatAgentLLM, chatIntents
+from app.core.db import get_db
 from app.core.security import get_current_user
+from app.core.ratelimit import crud_rate_limit, llm_rate_limit
+from app.core.resilience import llm_deadline
 from app.models.user import User
+from app.useage import chat_service
 
 router = APIRouter()
 
 class ChatQuery(BaseModel):
     query: str
+    session_id: Optional[int] = None  # continue a server-side session (see /chat/sessions)
+
+def _get_session_or_404(db: Session, session_id: int, user_id: int):
+    try:
+        return chat_service.get_session(db, session_id, user_id)
+    except chat_service.ChatSessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.post("/chat/agent_query", dependencies=[Depends(llm_rate_limit), Depends(llm_deadline)])
+async def agent_query(
+    chat_query: ChatQuery,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    if chat_query.session_id is not None:
+        session = await run_in_threadpool(_get_session_or_404, db, chat_query.session_id, current_user.id)
+        result = await chat_service.chat(db, session, chat_query.query)
+        return {
+            "response": result.get("output", ""),
+            "tool_action": result.get("tool_action"),
+            "session_id": chat_query.session_id,  # session.id was expired by the commit
+        }
 
-@router.post("/chat/agent_query")
-async def agent_query(chat_query: ChatQuery, current_user: User = Depends(get_current_user)):
-    result = chat_with_agent(chat_query.query, current_user.id)
+    # Simple commands are answered from the DB (on the threadpool: the session is sync); only the rest pays for the LLM
+    result = await run_in_threadpool(chatIntents.try_fast_path, chat_query.query, current_user.id, db)
+    if result is None:
+        result = await chatAgentLLM.achat_with_agent(chat_query.query, current_user.id)
     # result is a dict with keys: output, tool_action
     return {"response": result.get("output", ""), "tool_action": result.get("tool_action")}
+
+
+@router.post("/chat/sessions", response_model=schemas.ChatSessionRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(crud_rate_limit)])
+def create_chat_session(
+    body: schemas.ChatSessionCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    return chat_service.create_session(db, current_user.id, body.title)
+
+
+@router.get("/chat/sessions", response_model=List[schemas.ChatSessionRead], dependencies=[Depends(crud_rate_limit)])
+def list_chat_sessions(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    return chat_service.list_sessions(db, current_user.id)
+
+
+@router.get("/chat/sessions/{session_id}", response_model=schemas.ChatSessionDetail, dependencies=[Depends(crud_rate_limit)])
+def get_chat_session(
+    session_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    session = _get_session_or_404(db, session_id, current_user.id)
+    detail = schemas.ChatSessionRead.model_validate(session).model_dump()
+    detail["messages"] = chat_service.recent_messages(db, session, limit)
+    return detail
+
+
+@router.delete("/chat/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(crud_rate_limit)])
+def delete_chat_session(
+    session_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    session = _get_session_or_404(db, session_id, current_user.id)
+    chat_service.delete_session(db, session)
@@ -5,9 +5,10 @@ from typing import List
 
 from app import schema as schemas
 from app.core.db import get_db
+from app.core.ratelimit import crud_rate_limit
 from app.models.user import User
 
-router = APIRouter(prefix="/company", tags=["company"])
+router = APIRouter(prefix="/company", tags=["company"], dependencies=[Depends(crud_rate_limit)])
 logger = logging.getLogger(__name__)
 
 # Search employees by name within a company
@@ -1,41 +1,76 @@
+import json
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
 
 from app import schema as schemas
-from app.core.db import get_db
+from app.core.config import settings
+from app.core.db import get_db, get_read_db
+from app.core.ratelimit import crud_rate_limit, llm_rate_limit
+from app.core.resilience import LLMUnavailableError, llm_deadline
 from app.models.feature import Feature
 from app.models.taskassignment import TaskAssignment
 from app.models.user import User
-from app.models.project import Project
-from app.models.milestone import Milestone
-from app.models.tech_stack import TechStack
 from app.routes.user import get_current_user
-from app.agents.backEndLLM import get_feature_dependencies, DependencyAnalysisOutput
-from app.agents.featureBreakdownLLM import breakdown_feature, FeatureBreakdown
+from app.useage import dependency_service, generation_service
+from app.agents import featureBreakdownLLM
+from app.agents.backEndLLM import DependencyAnalysisOutput
+from app.agents.featureBreakdownLLM import FeatureBreakdown
 
 router = APIRouter(prefix="/features", tags=["features"])
 
 class DependencyAnalysisRequest(BaseModel):
     project_id: int
     new_feature_description: str = Field(alias="new_feature")
+    # When the feature already exists, its dependencies are stored in the dependency graph
+    feature_id: Optional[int] = None
 
 class FeatureBreakdownRequest(BaseModel):
     feature_description: str
 
-@router.post("/breakdown", response_model=FeatureBreakdown)
+class FeatureBreakdownBatchRequest(BaseModel):
+    feature_descriptions: List[str] = Field(..., min_length=1, max_length=settings.feature_breakdown_batch_max_items)
+
+@router.post("/breakdown", response_model=FeatureBreakdown, dependencies=[Depends(llm_rate_limit), Depends(llm_deadline)])
 async def get_feature_breakdown_endpoint(
     request: FeatureBreakdownRequest,
 ):
     try:
-        breakdown = breakdown_feature(request.feature_description)
+        breakdown = await featureBreakdownLLM.abreakdown_feature(request.feature_description)
         return breakdown
+    except LLMUnavailableError:
+        raise  # 503/504 with Retry-After, see app.main
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-@router.post("/", response_model=schemas.FeatureRead, status_code=status.HTTP_201_CREATED)
+@router.post("/breakdown/batch", dependencies=[Depends(llm_rate_limit), Depends(llm_deadline)])
+async def get_feature_breakdown_batch_endpoint(
+    request: FeatureBreakdownBatchRequest,
+):
+    """
+    Break down many features concurrently (at most BMS_FEATURE_BREAKDOWN_MAX_CONCURRENCY
+    at a time). Streams NDJSON: one line per distinct description as soon as it is ready,
+    {"indices", "feature_description", "breakdown" | "error"}, then a final
+    {"done": true, "total", "unique", "failed"} line.
+    """
+    async def lines():
+        unique = failed = 0
+        async for result in generation_service.breakdown_features(request.feature_descriptions):
+            unique += 1
+            failed += "error" in result
+            yield json.dumps(result) + "\n"
+        summary = {"done": True, "total": len(request.feature_descriptions), "unique": unique, "failed": failed}
+        yield json.dumps(summary) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.post("/", response_model=schemas.FeatureRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(crud_rate_limit)])
 def create_feature(
     feature: schemas.FeatureCreate,
     db: Session = Depends(get_db),
@@ -45,86 +80,46 @@ def create_feature(
     db.add(db_feature)
     db.commit()
     db.refresh(db_feature)
+    dependency_service.feature_created(db_feature)
     return db_feature
 
-@router.post("/analyze-dependencies", response_model=DependencyAnalysisOutput)
+@router.post("/analyze-dependencies", response_model=DependencyAnalysisOutput, dependencies=[Depends(llm_rate_limit), Depends(llm_deadline)])
 async def analyze_feature_dependencies_endpoint(
     request: DependencyAnalysisRequest,
     db: Session = Depends(get_db)
 ):
     try:
-        # Fetch project details
-        project = db.query(Project).filter(Project.id == request.project_id).first()
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-
-        project_name = project.name
-
-        # Fetch tech stack
-        tech_stacks = db.query(TechStack).filter(TechStack.project_id == request.project_id).all()
-        tech_stack_str = ""
-        if tech_stacks:
-            tech_stack_str = ", ".join([f"{ts.tech} (Level: {ts.level})" for ts in tech_stacks])
-        else:
-            tech_stack_str = "No specific tech stack defined."
-
-
-        # Fetch existing features
-        all_features = db.query(Feature).filter(Feature.project_id == request.project_id).all()
-        features_str = ""
-        if all_features:
-            features_str = "\n".join([
-                f"ID: {f.id}, Name: {f.name}, Milestone ID: {f.milestone_id}, Description: {f.description or 'N/A'}"
-                for f in all_features
-            ])
-        else:
-            features_str = "No existing features."
-
-        # Fetch milestones
-        all_milestones = db.query(Milestone).filter(Milestone.project_id == request.project_id).all()
-        milestones_str = ""
-        if all_milestones:
-            milestones_str = "\n".join([
-                f"ID: {m.id}, Name: {m.name}, Done: {m.done}, Progress: {m.progress}%"
-                for m in all_milestones
-            ])
-        else:
-            milestones_str = "No existing milestones."
-
-        result = get_feature_dependencies(
-            project_name=project_name,
-            features=features_str,
-            milestones=milestones_str,
-            tech_stack=tech_stack_str,
-            new_feature=request.new_feature_description,
+        return await generation_service.analyze_dependencies(
+            request.project_id, request.new_feature_description, db, feature_id=request.feature_id
         )
-        return result
-    except HTTPException:
-        raise
+    except (generation_service.ProjectNotFoundError, dependency_service.FeatureNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except LLMUnavailableError:
+        raise  # 503/504 with Retry-After, see app.main
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-@router.get("/project/{project_id}", response_model=List[schemas.FeatureRead])
-def get_features_for_project(
+@router.get("/project/{project_id}", response_model=List[schemas.FeatureRead], dependencies=[Depends(crud_rate_limit)])
+async def get_features_for_project(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
-    features = db.query(Feature).filter(Feature.project_id == project_id).all()
-    return features
+    features = await db.scalars(select(Feature).where(Feature.project_id == project_id))
+    return features.all()
 
-@router.get("/milestone/{milestone_id}", response_model=List[schemas.FeatureRead])
-def get_features_for_milestone(
+@router.get("/milestone/{milestone_id}", response_model=List[schemas.FeatureRead], dependencies=[Depends(crud_rate_limit)])
+async def get_features_for_milestone(
     milestone_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
-    features_with_assignments = (
-        db.query(Feature)
-        .filter(Feature.milestone_id == milestone_id)
+    result = await db.scalars(
+        select(Feature)
+        .where(Feature.milestone_id == milestone_id)
         .options(joinedload(Feature.task_assignments).joinedload(TaskAssignment.assignee))
-        .all()
     )
+    features_with_assignments = result.unique().all()  # joined collection: one row per assignment
 
     result_features = []
     for feature in features_with_assignments:
@@ -157,18 +152,46 @@ def get_features_for_milestone(
         )
     return result_features
 
-@router.get("/{feature_id}", response_model=schemas.FeatureRead)
-def get_feature(
-    feature_id: int,
+@router.get("/project/{project_id}/dependency-graph", response_model=schemas.DependencyGraphRead, dependencies=[Depends(crud_rate_limit)])
+def get_dependency_graph(
+    project_id: int,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    feature = db.query(Feature).filter(Feature.id == feature_id).first()
+    graph = dependency_service.get_graph(db, project_id)
+    return schemas.DependencyGraphRead(project_id=project_id, nodes=graph.nodes(), edges=graph.edges())
+
+@router.get("/project/{project_id}/dependency-order", response_model=schemas.DependencyOrderRead, dependencies=[Depends(crud_rate_limit)])
+def get_dependency_order(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Features in build order (dependencies first). Features on or behind a cycle are listed under `cycles` instead."""
+    order, cycles = dependency_service.get_graph(db, project_id).topological_order()
+    return schemas.DependencyOrderRead(project_id=project_id, order=order, cycles=cycles)
+
+@router.get("/project/{project_id}/dependency-cycles", response_model=List[List[int]], dependencies=[Depends(crud_rate_limit)])
+def get_dependency_cycles(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    _, cycles = dependency_service.get_graph(db, project_id).topological_order()
+    return cycles
+
+@router.get("/{feature_id}", response_model=schemas.FeatureRead, dependencies=[Depends(crud_rate_limit)])
+async def get_feature(
+    feature_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    feature = await db.get(Feature, feature_id)
     if not feature:
         raise HTTPException(status_code=404, detail="Feature not found")
     return feature
 
-@router.put("/{feature_id}", response_model=schemas.FeatureRead)
+@router.put("/{feature_id}", response_model=schemas.FeatureRead, dependencies=[Depends(crud_rate_limit)])
 def update_feature(
     feature_id: int,
     feature: schemas.FeatureUpdate,
@@ -184,7 +207,7 @@ def update_feature(
     db.refresh(db_feature)
     return db_feature
 
-@router.delete("/{feature_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{feature_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(crud_rate_limit)])
 def delete_feature(
     feature_id: int,
     db: Session = Depends(get_db),
@@ -193,6 +216,71 @@ def delete_feature(
     db_feature = db.query(Feature).filter(Feature.id == feature_id).first()
     if not db_feature:
         raise HTTPException(status_code=404, detail="Feature not found")
+    dependency_service.feature_deleted(db, db_feature)
     db.delete(db_feature)
     db.commit()
-    return
\ No newline at end of file
+    return
+
+# ---------- dependency graph ----------
+def _feature_or_404(feature_id: int, db: Session) -> Feature:
+    try:
+        return dependency_service.get_feature(db, feature_id)
+    except dependency_service.FeatureNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/{feature_id}/dependencies", response_model=schemas.FeatureDependencyList, dependencies=[Depends(crud_rate_limit)])
+def get_feature_dependencies(
+    feature_id: int,
+    transitive: bool = True,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Features this one needs first; with `transitive` (default) their dependencies too, nearest first."""
+    feature = _feature_or_404(feature_id, db)
+    graph = dependency_service.get_graph(db, feature.project_id)
+    return schemas.FeatureDependencyList(
+        feature_id=feature_id, transitive=transitive, feature_ids=graph.dependencies(feature_id, transitive)
+    )
+
+@router.get("/{feature_id}/dependents", response_model=schemas.FeatureDependencyList, dependencies=[Depends(crud_rate_limit)])
+def get_feature_dependents(
+    feature_id: int,
+    transitive: bool = True,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Features that need this one; with `transitive` (default) everything downstream, nearest first."""
+    feature = _feature_or_404(feature_id, db)
+    graph = dependency_service.get_graph(db, feature.project_id)
+    return schemas.FeatureDependencyList(
+        feature_id=feature_id, transitive=transitive, feature_ids=graph.dependents(feature_id, transitive)
+    )
+
+@router.put("/{feature_id}/dependencies/{depends_on_id}", response_model=schemas.FeatureDependencyRead, dependencies=[Depends(crud_rate_limit)])
+def add_feature_dependency(
+    feature_id: int,
+    depends_on_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        return dependency_service.add_dependency(db, feature_id, depends_on_id)
+    except dependency_service.FeatureNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except dependency_service.InvalidDependencyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except dependency_service.DependencyCycleError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.delete("/{feature_id}/dependencies/{depends_on_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(crud_rate_limit)])
+def remove_feature_dependency(
+    feature_id: int,
+    depends_on_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        dependency_service.remove_dependency(db, feature_id, depends_on_id)
+    except dependency_service.DependencyNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return
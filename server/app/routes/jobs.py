@@ -0,0 +1,124 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import schema as schemas
+from app.core.db import get_db
+from app.core.jobs import job_queue, PermanentJobError, TERMINAL
+from app.core.streaming import sse_event, EVENT_STREAM
+from app.core.ratelimit import llm_rate_limit
+from app.models.user import User
+from app.routes.user import get_current_user
+from app.routes.features import DependencyAnalysisRequest
+from app.useage import dependency_service, generation_service
+from app.useage.plan_pipeline import PlanPipeline
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+# ---------- job handlers: payload (validated at submit) -> JSON result ----------
+async def run_plan(payload: Dict[str, Any], db: Session) -> Dict[str, str]:
+    request = schemas.RoadmapCreate.model_validate(payload)
+    pipeline = PlanPipeline(tech_stack=request.tech_stack, temperature=request.temperature or 0.2, db=db)
+    return await pipeline.collect(request.requirements, request.best_practices)
+
+
+async def run_system_design(payload: Dict[str, Any], db: Session) -> Dict[str, Any]:
+    request = schemas.SystemDesignRequest.model_validate(payload)
+    db_item = await generation_service.create_system_design(request, db)
+    return schemas.ProjectUMLRead.model_validate(db_item).model_dump(mode="json")
+
+
+async def run_analyze_dependencies(payload: Dict[str, Any], db: Session) -> Dict[str, Any]:
+    request = DependencyAnalysisRequest.model_validate(payload)
+    try:
+        result = await generation_service.analyze_dependencies(
+            request.project_id, request.new_feature_description, db, feature_id=request.feature_id
+        )
+    except (generation_service.ProjectNotFoundError, dependency_service.FeatureNotFoundError) as e:
+        raise PermanentJobError(str(e))  # retrying won't create the project
+    return result.model_dump(mode="json")
+
+
+# kind -> (request schema, handler)
+JOB_KINDS = {
+    "plan": (schemas.RoadmapCreate, run_plan),
+    "system-design": (schemas.SystemDesignRequest, run_system_design),
+    "analyze-dependencies": (DependencyAnalysisRequest, run_analyze_dependencies),
+}
+
+for _kind, (_, _handler) in JOB_KINDS.items():
+    job_queue.register(_kind, _handler)
+
+
+def _get_job_or_404(job_id: str, db: Session, current_user: User):
+    job = job_queue.get(job_id, db)
+    # Other users' jobs are reported as missing, not forbidden, so ids can't be probed
+    if job is None or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/{kind}", response_model=schemas.JobRead, status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(llm_rate_limit)])
+async def submit_job(
+    kind: str,
+    response: Response,
+    payload: Dict[str, Any] = Body(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Queue a long-running generation and return immediately with the job id.
+    The body is the same as the synchronous endpoint for that kind
+    (`/plan`, `/system-design`, `/features/analyze-dependencies`).
+    """
+    if kind not in JOB_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown job kind '{kind}'")
+    request_schema, _ = JOB_KINDS[kind]
+    try:
+        request = request_schema.model_validate(payload)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+    payload = request.model_dump(mode="json", by_alias=True)
+    job = await run_in_threadpool(job_queue.submit, kind, payload, db, user_id=current_user.id)
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job
+
+
+@router.get("/{job_id}", response_model=schemas.JobRead)
+async def get_job(job_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await run_in_threadpool(_get_job_or_404, job_id, db, current_user)
+
+
+@router.get("/{job_id}/stream")
+async def stream_job(job_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Server-Sent Events: one event per status change, named after the status
+    (queued, running, succeeded, failed, cancelled). The stream ends once the
+    job finishes; the final event carries the result or error.
+    """
+    await run_in_threadpool(_get_job_or_404, job_id, db, current_user)
+
+    async def events():
+        async for job in job_queue.follow(job_id):
+            yield sse_event(job.status, schemas.JobRead.model_validate(job).model_dump(mode="json"))
+
+    return StreamingResponse(
+        events(),
+        media_type=EVENT_STREAM,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.delete("/{job_id}", response_model=schemas.JobRead)
+async def cancel_job(job_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    job = await run_in_threadpool(_get_job_or_404, job_id, db, current_user)
+    if job.status in TERMINAL:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return await run_in_threadpool(job_queue.cancel, job_id, db)
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from app.core.metrics import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+def get_metrics():
+    return {"counters": metrics.snapshot(), "rates": metrics.rates(), "histograms": metrics.histograms()}
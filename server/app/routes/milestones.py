@@ -1,17 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.agents.milestonesLLM import generate_milestones
+from app.agents import milestonesLLM
 from app.schema import MilestonePlanCreate, MilestoneCreate, MilestoneRead
 from app.core.db import get_db
+from app.core.cache import response_cache, make_cache_key, cache_bypassed
+from app.core.streaming import wants_event_stream, cached_event_stream
+from app.core.ratelimit import crud_rate_limit, llm_rate_limit
+from app.core.resilience import LLMUnavailableError, llm_deadline
 from app.models.milestone import Milestone
 
 router = APIRouter()
 
 
-@router.post("/milestones")
-def create_milestones(payload: MilestonePlanCreate):
+@router.post("/milestones", dependencies=[Depends(llm_rate_limit), Depends(llm_deadline)])
+async def create_milestones(
+    payload: MilestonePlanCreate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    bypass_cache: bool = Depends(cache_bypassed),
+):
     try:
         # Build schema object for the LLM call context
         milestone_input = MilestonePlanCreate(
@@ -21,19 +31,43 @@ def create_milestones(payload: MilestonePlanCreate):
             content="",  # will be set after generation
         )
 
-        milestones_text = generate_milestones(
-            requirements=milestone_input.requirements,
-            tech_stack=milestone_input.tech_stack,
+        inputs = {
+            "requirements": milestone_input.requirements,
+            "tech_stack": milestone_input.tech_stack,
+        }
+        key = make_cache_key("milestones", milestonesLLM.PROMPT_VERSION, inputs, milestone_input.temperature)
+        if wants_event_stream(request):
+            # Opt-in SSE: forward tokens as they arrive instead of buffering the document
+            return await cached_event_stream(
+                "milestones",
+                key,
+                lambda: milestonesLLM.astream_milestones(temperature=milestone_input.temperature, **inputs),
+                db=db,
+                bypass=bypass_cache,
+                temperature=milestone_input.temperature,
+                columns=inputs,
+            )
+
+        milestones_text, cache_status = await response_cache.get_or_generate(
+            "milestones",
+            key,
+            lambda: milestonesLLM.agenerate_milestones(temperature=milestone_input.temperature, **inputs),
+            db=db,
+            bypass=bypass_cache,
             temperature=milestone_input.temperature,
+            columns=inputs,
         )
         milestone_input.content = milestones_text
+        response.headers["X-Cache"] = cache_status
 
         return {"milestones": milestone_input.content}
+    except LLMUnavailableError:
+        raise  # 503/504 with Retry-After, see app.main
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # New endpoint to create a milestone in the database
-@router.post("/milestones/db", response_model=MilestoneRead)
+@router.post("/milestones/db", response_model=MilestoneRead, dependencies=[Depends(crud_rate_limit)])
 def create_milestone_db(milestone: MilestoneCreate, db: Session = Depends(get_db)):
     db_milestone = Milestone(
         project_id=milestone.project_id,
@@ -47,7 +81,7 @@ def create_milestone_db(milestone: MilestoneCreate, db: Session = Depends(get_db
     return db_milestone
 
 # New endpoint to get milestones by project_id
-@router.get("/milestones/project/{project_id}", response_model=List[MilestoneRead])
+@router.get("/milestones/project/{project_id}", response_model=List[MilestoneRead], dependencies=[Depends(crud_rate_limit)])
 def get_milestones_by_project(project_id: int, db: Session = Depends(get_db)):
     milestones = db.query(Milestone).filter(Milestone.project_id == project_id).all()
     return milestones
\ No newline at end of file
@@ -1,45 +1,54 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
 
 from app.schema import RoadmapCreate
-from app.agents.roadmapLLM import generate_roadmap
-from app.agents.milestonesLLM import generate_milestones
-from app.agents.tasksLLM import generate_tasks
+from app.core.db import get_db
+from app.core.cache import cache_bypassed
+from app.core.streaming import wants_event_stream, stream_stages, EVENT_STREAM
+from app.core.ratelimit import llm_rate_limit
+from app.core.resilience import LLMUnavailableError, llm_deadline
+from app.useage.plan_pipeline import PlanPipeline
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(llm_rate_limit), Depends(llm_deadline)])
 
 @router.post("/plan")
-def roadmap_to_milestones_and_tasks(payload: RoadmapCreate):
+async def roadmap_to_milestones_and_tasks(
+    payload: RoadmapCreate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    bypass_cache: bool = Depends(cache_bypassed),
+):
     """
     Temporary API: generate a roadmap, then feed its output to milestones generator,
     then produce day-to-day tasks from the milestones. Returns all three.
+
+    Tasks are planned per `## feature` section of the milestones, concurrently.
+    With `Accept: text/event-stream` each stage is streamed as soon as it finishes.
     """
-    try:
-        # 1) Generate roadmap text
-        roadmap_text = generate_roadmap(
-            requirements=payload.requirements,
-            tech_stack=payload.tech_stack,
-            best_practices=payload.best_practices,
-            temperature=payload.temperature or 0.2,
+    pipeline = PlanPipeline(
+        tech_stack=payload.tech_stack,
+        temperature=payload.temperature or 0.2,
+        db=db,
+        bypass_cache=bypass_cache,
+    )
+    if wants_event_stream(request):
+        stages = pipeline.run(payload.requirements, payload.best_practices)
+        return StreamingResponse(
+            stream_stages(stages, summary=lambda: {"cache": pipeline.cache_statuses}),
+            media_type=EVENT_STREAM,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
 
-        # 2) Use the roadmap as input 'requirements' for milestones generation
-        milestones_text = generate_milestones(
-            requirements=roadmap_text,
-            tech_stack=payload.tech_stack,
-            temperature=payload.temperature or 0.2,
-        )
+    try:
+        result = await pipeline.collect(payload.requirements, payload.best_practices)
 
-        # 3) Use the milestones as input for tasks generation
-        tasks_text = generate_tasks(
-            milestones=milestones_text,
-            tech_stack=payload.tech_stack,
-            temperature=payload.temperature or 0.2,
-        )
+        # One status per LLM stage/section, e.g. "HIT, HIT, MISS"
+        response.headers["X-Cache"] = ", ".join(pipeline.cache_statuses)
 
-        return {
-            "roadmap": roadmap_text,
-            "milestones": milestones_text,
-            "tasks": tasks_text,
-        }
+        return result
+    except LLMUnavailableError:
+        raise  # 503/504 with Retry-After, see app.main
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -4,10 +4,11 @@ from typing import List
 
 from app import schema as schemas
 from app.core.db import get_db
+from app.core.ratelimit import crud_rate_limit
 from app.models.milestone import Milestone
 from app.routes.user import get_current_user
 
-router = APIRouter(prefix="/milestones", tags=["milestones"])
+router = APIRouter(prefix="/milestones", tags=["milestones"], dependencies=[Depends(crud_rate_limit)])
 
 @router.post("/", response_model=schemas.MilestonePlanRead, status_code=status.HTTP_201_CREATED)
 def create_milestone(
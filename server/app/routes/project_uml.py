@@ -1,21 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
+from app.core.config import settings
 from app.core.db import get_db
+from app.core.ratelimit import crud_rate_limit
 from app import schema as schemas
 from app.models.projectuml import ProjectUML
+from app.useage import uml_service
+
+_MAX_COORDINATE = settings.uml_max_coordinate
 
-router = APIRouter(prefix="/project-uml", tags=["project_uml"]) 
+router = APIRouter(prefix="/project-uml", tags=["project_uml"], dependencies=[Depends(crud_rate_limit)])
 
 
 @router.post("/add", response_model=schemas.ProjectUMLRead, status_code=status.HTTP_201_CREATED)
 def create_project_uml(payload: schemas.ProjectUMLCreate, db: Session = Depends(get_db)):
+    try:
+        uml_service.check_geometry(payload.uml_schema)
+    except uml_service.InvalidPatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     try:
         db_item = ProjectUML(
             project_id=payload.project_id,
             type=payload.type,
             uml_schema=payload.uml_schema,
+            revision=0,
         )
         db.add(db_item)
         db.commit()
@@ -34,42 +46,108 @@ def get_project_uml(uml_id: int, db: Session = Depends(get_db)):
     return item
 
 
+@router.get("/{uml_id}/viewport", response_model=schemas.UmlViewportRead)
+def get_project_uml_viewport(
+    uml_id: int,
+    x: float = Query(..., ge=-_MAX_COORDINATE, le=_MAX_COORDINATE, description="Left edge of the visible area, in diagram units"),
+    y: float = Query(..., ge=-_MAX_COORDINATE, le=_MAX_COORDINATE, description="Top edge of the visible area"),
+    w: float = Query(..., gt=0, le=2 * _MAX_COORDINATE),
+    h: float = Query(..., gt=0, le=2 * _MAX_COORDINATE),
+    db: Session = Depends(get_db),
+):
+    """Nodes inside the box and the relationships touching them, from a cached per-diagram grid index."""
+    if not all(math.isfinite(v) for v in (x, y, w, h)):
+        raise HTTPException(status_code=422, detail="x, y, w and h must be finite numbers")
+    try:
+        revision, nodes, relationships = uml_service.viewport(db, uml_id, x, y, w, h)
+    except uml_service.UmlNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return schemas.UmlViewportRead(id=uml_id, revision=revision, nodes=nodes, relationships=relationships)
+
+
 @router.get("/project/{project_id}", response_model=List[schemas.ProjectUMLRead])
 def list_project_umls(project_id: int, db: Session = Depends(get_db)):
     items = db.query(ProjectUML).filter(ProjectUML.project_id == project_id).all()
     return items
 
 
+def _revision_conflict(e: uml_service.RevisionConflictError) -> HTTPException:
+    return HTTPException(status_code=409, detail=str(e), headers={"X-UML-Revision": str(e.current)})
+
+
 @router.put("/{uml_id}", response_model=schemas.ProjectUMLRead)
-def update_project_uml(uml_id: int, payload: schemas.ProjectUMLCreate, db: Session = Depends(get_db)):
+def update_project_uml(uml_id: int, payload: schemas.ProjectUMLUpdate, db: Session = Depends(get_db)):
     try:
-        item = db.query(ProjectUML).filter(ProjectUML.id == uml_id).first()
-        if not item:
-            raise HTTPException(status_code=404, detail="UML not found")
-        item.project_id = payload.project_id
-        item.type = payload.type
-        item.uml_schema = payload.uml_schema
-        db.commit()
-        db.refresh(item)
-        return item
-    except HTTPException:
-        raise
+        return uml_service.replace_uml(
+            db,
+            uml_id,
+            project_id=payload.project_id,
+            type=payload.type,
+            uml_schema=payload.uml_schema,
+            base_revision=payload.revision,
+        )
+    except uml_service.UmlNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except uml_service.RevisionConflictError as e:
+        raise _revision_conflict(e)
+    except uml_service.InvalidPatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to update UML: {str(e)}")
 
 
+@router.patch("/{uml_id}", response_model=schemas.ProjectUMLRevisionRead)
+def patch_project_uml(uml_id: int, payload: schemas.ProjectUMLPatch, db: Session = Depends(get_db)):
+    """
+    Apply RFC 6902 operations (e.g. one node's x/y after a drag) to the revision the
+    client edited. Returns the new revision only; 409 if someone else saved first.
+    """
+    operations = [op.model_dump(by_alias=True, exclude_unset=True) for op in payload.operations]
+    try:
+        return uml_service.patch_uml(db, uml_id, operations, payload.revision)
+    except uml_service.UmlNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except uml_service.RevisionConflictError as e:
+        raise _revision_conflict(e)
+    except uml_service.InvalidPatchError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid patch: {str(e)}")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to patch UML: {str(e)}")
+
+
+@router.get("/{uml_id}/revisions/{revision}", response_model=schemas.ProjectUMLRead)
+def get_project_uml_revision(uml_id: int, revision: int, db: Session = Depends(get_db)):
+    try:
+        item = uml_service.get_uml(db, uml_id)
+        document = uml_service.document_at(db, uml_id, revision)
+    except (uml_service.UmlNotFoundError, uml_service.RevisionNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return schemas.ProjectUMLRead(
+        id=item.id, project_id=item.project_id, type=item.type, uml_schema=document, revision=revision
+    )
+
+
+@router.post("/{uml_id}/layout", response_model=schemas.ProjectUMLRead)
+def relayout_project_uml(uml_id: int, db: Session = Depends(get_db)):
+    """Recompute every node's position and size from the relationships (deterministic)."""
+    try:
+        return uml_service.relayout(db, uml_id)
+    except uml_service.UmlNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to lay out UML: {str(e)}")
+
+
 @router.delete("/{uml_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_project_uml(uml_id: int, db: Session = Depends(get_db)):
     try:
-        item = db.query(ProjectUML).filter(ProjectUML.id == uml_id).first()
-        if not item:
-            raise HTTPException(status_code=404, detail="UML not found")
-        db.delete(item)
-        db.commit()
+        uml_service.delete_uml(db, uml_id)
         return None
-    except HTTPException:
-        raise
+    except uml_service.UmlNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete UML: {str(e)}")
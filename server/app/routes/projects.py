@@ -1,18 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from fastapi import Path
 
 from app import schema as schemas
-from app.core.db import get_db
+from app.core.db import get_db, get_read_db
+from app.core.ratelimit import crud_rate_limit
 from app.models.project import Project
 from app.models.user import User
 from app.models.userproject import UserProject
 from app.routes.user import get_current_user
 from app.useage.auth_service import get_current_user_from_token, InvalidTokenError, UserNotFoundError
 
-router = APIRouter(prefix="/projects", tags=["projects"])
+router = APIRouter(prefix="/projects", tags=["projects"], dependencies=[Depends(crud_rate_limit)])
 
 
 # OAuth2 scheme that doesn't auto-redirect to login
@@ -65,8 +68,8 @@ def create_project(
 
 
 @router.get("/get", response_model=List[schemas.ProjectRead])
-def get_projects(
-    db: Session = Depends(get_db),
+async def get_projects(
+    db: AsyncSession = Depends(get_read_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """Get all projects for the current user"""
@@ -75,8 +78,8 @@ def get_projects(
         owner_id = current_user.id if current_user else 1
         
         # Get projects owned by the user
-        projects = db.query(Project).filter(Project.owner_id == owner_id).all()
-        return projects
+        projects = await db.scalars(select(Project).where(Project.owner_id == owner_id))
+        return projects.all()
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -85,14 +88,14 @@ def get_projects(
 
 
 @router.get("/{project_id}", response_model=schemas.ProjectRead)
-def get_project(
+async def get_project(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """Get a specific project by ID"""
     try:
-        project = db.query(Project).filter(Project.id == project_id).first()
+        project = await db.get(Project, project_id)
 
         if not project:
             raise HTTPException(
@@ -102,10 +105,12 @@ def get_project(
 
         # If there's a current user, check if they are associated with the project
         if current_user:
-            user_project_association = db.query(UserProject).filter(
-                UserProject.user_id == current_user.id,
-                UserProject.project_id == project_id
-            ).first()
+            user_project_association = await db.scalar(
+                select(UserProject.id).where(
+                    UserProject.user_id == current_user.id,
+                    UserProject.project_id == project_id
+                ).limit(1)
+            )
 
             if not user_project_association and project.owner_id != current_user.id:
                 raise HTTPException(
@@ -209,11 +214,11 @@ def delete_project(
 
 
 @router.get("/all/public", response_model=List[schemas.ProjectRead])
-def get_all_projects(db: Session = Depends(get_db)):
+async def get_all_projects(db: AsyncSession = Depends(get_read_db)):
     """Get all projects (admin/public endpoint)"""
     try:
-        projects = db.query(Project).all()
-        return projects
+        projects = await db.scalars(select(Project))
+        return projects.all()
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
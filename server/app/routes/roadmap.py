@@ -1,13 +1,26 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from sqlalchemy.orm import Session
+
 from app.schema import RoadmapCreate
+from app.core.db import get_db
+from app.core.cache import response_cache, make_cache_key, cache_bypassed
+from app.core.streaming import wants_event_stream, cached_event_stream
+from app.core.ratelimit import llm_rate_limit
+from app.core.resilience import LLMUnavailableError, llm_deadline
 
-from app.agents.roadmapLLM import generate_roadmap
+from app.agents import roadmapLLM
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(llm_rate_limit), Depends(llm_deadline)])
 
 
 @router.post("/roadmap")
-def create_roadmap(payload: RoadmapCreate):
+async def create_roadmap(
+    payload: RoadmapCreate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    bypass_cache: bool = Depends(cache_bypassed),
+):
     try:
         # Build schema object for the LLM call context
         roadmap_input = RoadmapCreate(
@@ -18,14 +31,38 @@ def create_roadmap(payload: RoadmapCreate):
             content="",  # will be set after generation
         )
 
-        roadmap_text = generate_roadmap(
-            requirements=roadmap_input.requirements,
-            tech_stack=roadmap_input.tech_stack,
-            best_practices=roadmap_input.best_practices,
+        inputs = {
+            "requirements": roadmap_input.requirements,
+            "tech_stack": roadmap_input.tech_stack,
+            "best_practices": roadmap_input.best_practices,
+        }
+        key = make_cache_key("roadmap", roadmapLLM.PROMPT_VERSION, inputs, roadmap_input.temperature)
+        if wants_event_stream(request):
+            # Opt-in SSE: forward tokens as they arrive instead of buffering the document
+            return await cached_event_stream(
+                "roadmap",
+                key,
+                lambda: roadmapLLM.astream_roadmap(temperature=roadmap_input.temperature, **inputs),
+                db=db,
+                bypass=bypass_cache,
+                temperature=roadmap_input.temperature,
+                columns=inputs,
+            )
+
+        roadmap_text, cache_status = await response_cache.get_or_generate(
+            "roadmap",
+            key,
+            lambda: roadmapLLM.agenerate_roadmap(temperature=roadmap_input.temperature, **inputs),
+            db=db,
+            bypass=bypass_cache,
             temperature=roadmap_input.temperature,
+            columns=inputs,
         )
         roadmap_input.content = roadmap_text
+        response.headers["X-Cache"] = cache_status
 
         return {"roadmap": roadmap_input.content}
+    except LLMUnavailableError:
+        raise  # 503/504 with Retry-After, see app.main
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
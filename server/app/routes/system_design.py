@@ -1,40 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.agents.systemDesignLLM import generate_system_design
 from app.schema import SystemDesignRequest, ProjectUMLRead
 from app.core.db import get_db
-from app.models.projectuml import ProjectUML
+from app.core.ratelimit import llm_rate_limit
+from app.core.resilience import LLMUnavailableError, llm_deadline
+from app.useage import generation_service
 
-router = APIRouter(tags=["system_design"])
+router = APIRouter(tags=["system_design"], dependencies=[Depends(llm_rate_limit), Depends(llm_deadline)])
 
 
 @router.post("/system-design", response_model=ProjectUMLRead, status_code=status.HTTP_201_CREATED)
-def create_system_design(payload: SystemDesignRequest, db: Session = Depends(get_db)):
+async def create_system_design(payload: SystemDesignRequest, db: Session = Depends(get_db)):
     try:
-        # Generate UML design via LLM, validated by Pydantic
-        uml_design = generate_system_design(
-            features=payload.features,
-            expected_users=payload.expected_users,
-            geography=payload.geography,
-            tech_stack=payload.tech_stack,
-            constraints=payload.constraints,
-            project_id=payload.project_id,
-            temperature=payload.temperature,
-        )
-
-        # Persist to ProjectUML
-        db_item = ProjectUML(
-            project_id=payload.project_id,
-            type=uml_design.type,
-            uml_schema=uml_design.uml_schema.model_dump() if hasattr(uml_design.uml_schema, "model_dump") else uml_design.uml_schema,
-        )
-        db.add(db_item)
-        db.commit()
-        db.refresh(db_item)
-        return db_item
-    except HTTPException:
-        raise
+        return await generation_service.create_system_design(payload, db)
+    except (HTTPException, LLMUnavailableError):
+        raise  # LLMUnavailableError: 503/504 with Retry-After, see app.main
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -1,20 +1,49 @@
+from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field, model_validator
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.core.db import get_db
+from app.core.db import get_db, get_read_db
+from app.core.ratelimit import crud_rate_limit
 from app.routes.user import get_current_user
 from app.models.taskassignment import TaskAssignment
 from app.models.user import User
 from app import schema as schemas
+from app.agents.featureBreakdownLLM import FeatureBreakdown
+from app.useage import plan_materializer
 
 
-router = APIRouter(prefix="/task-assignments", tags=["tasks"])
+router = APIRouter(prefix="/task-assignments", tags=["tasks"], dependencies=[Depends(crud_rate_limit)])
 
 
 ALLOWED_STATUS = {"assigned", "todo", "in progress", "sent for approval", "approved", "done"}
 
 
+class BreakdownItem(BaseModel):
+    feature: str = Field(..., min_length=1)
+    breakdown: FeatureBreakdown
+
+
+class PlanMaterializeRequest(BaseModel):
+    project_id: int
+    user_id: int  # assignee of every created task
+    # Either or both: "Daily Task Plan" markdown (/tasks, /plan) and /features/breakdown results
+    plan: Optional[str] = None
+    breakdowns: List[BreakdownItem] = Field(default_factory=list)
+    start_date: Optional[date] = None  # Day 1 of the plan; defaults to today
+    milestone_id: Optional[int] = None  # for features the plan creates
+    status: str = "todo"
+
+    @model_validator(mode="after")
+    def _has_input(self):
+        if not (self.plan and self.plan.strip()) and not self.breakdowns:
+            raise ValueError("Provide a plan, breakdowns, or both")
+        return self
+
+
 @router.post("/", response_model=schemas.TaskAssignmentRead, status_code=status.HTTP_201_CREATED)
 def create_task_assignment(
     payload: schemas.TaskAssignmentCreate,
@@ -47,6 +76,40 @@ def create_task_assignment(
         raise HTTPException(status_code=500, detail=f"Failed to create task assignment: {str(e)}")
 
 
+@router.post("/from-plan", response_model=schemas.PlanMaterializeRead, status_code=status.HTTP_201_CREATED)
+def materialize_plan(
+    payload: PlanMaterializeRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Turn a generated plan into features and task assignments in one transaction.
+    Day offsets become eta and duration_days; features already in the project
+    are matched by name and reused.
+    """
+    if payload.status not in ALLOWED_STATUS:
+        raise HTTPException(status_code=400, detail="Invalid status value")
+
+    features = plan_materializer.parse_task_plan(payload.plan or "")
+    features += [plan_materializer.breakdown_to_plan(item.feature, item.breakdown) for item in payload.breakdowns]
+    try:
+        result = plan_materializer.materialize(
+            db,
+            features,
+            project_id=payload.project_id,
+            user_id=payload.user_id,
+            assigned_by=current_user.id,
+            start_date=payload.start_date,
+            milestone_id=payload.milestone_id,
+            status=payload.status,
+        )
+    except plan_materializer.EmptyPlanError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create task assignments: {str(e)}")
+    return schemas.PlanMaterializeRead(**vars(result))
+
+
 @router.patch("/{task_id}", response_model=schemas.TaskAssignmentRead)
 def update_task_assignment(
     task_id: int,
@@ -77,12 +140,14 @@ def update_task_assignment(
 
 
 @router.get("/my", response_model=List[schemas.TaskAssignmentRead])
-def list_my_task_assignments(
-    db: Session = Depends(get_db),
+async def list_my_task_assignments(
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     try:
-        items = db.query(TaskAssignment).filter(TaskAssignment.user_id == current_user.id).order_by(TaskAssignment.created_at.desc()).all()
-        return items
+        items = await db.scalars(
+            select(TaskAssignment).where(TaskAssignment.user_id == current_user.id).order_by(TaskAssignment.created_at.desc())
+        )
+        return items.all()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch task assignments: {str(e)}")
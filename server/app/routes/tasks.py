@@ -1,13 +1,25 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from sqlalchemy.orm import Session
 
-from app.agents.tasksLLM import generate_tasks
+from app.agents import tasksLLM
 from app.schema import TaskPlanCreate
+from app.core.db import get_db
+from app.core.cache import response_cache, make_cache_key, cache_bypassed
+from app.core.streaming import wants_event_stream, cached_event_stream
+from app.core.ratelimit import llm_rate_limit
+from app.core.resilience import LLMUnavailableError, llm_deadline
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(llm_rate_limit), Depends(llm_deadline)])
 
 
 @router.post("/tasks")
-def create_tasks(payload: TaskPlanCreate):
+async def create_tasks(
+    payload: TaskPlanCreate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    bypass_cache: bool = Depends(cache_bypassed),
+):
     try:
         # Build schema object for the LLM call context
         task_input = TaskPlanCreate(
@@ -17,13 +29,37 @@ def create_tasks(payload: TaskPlanCreate):
             content="",  # will be set after generation
         )
 
-        tasks_text = generate_tasks(
-            milestones=task_input.milestones,
-            tech_stack=task_input.tech_stack,
+        inputs = {
+            "milestones": task_input.milestones,
+            "tech_stack": task_input.tech_stack,
+        }
+        key = make_cache_key("tasks", tasksLLM.PROMPT_VERSION, inputs, task_input.temperature)
+        if wants_event_stream(request):
+            # Opt-in SSE: forward tokens as they arrive instead of buffering the document
+            return await cached_event_stream(
+                "tasks",
+                key,
+                lambda: tasksLLM.astream_tasks(temperature=task_input.temperature, **inputs),
+                db=db,
+                bypass=bypass_cache,
+                temperature=task_input.temperature,
+                columns={"milestones": task_input.milestones, "tech_stack": task_input.tech_stack},
+            )
+
+        tasks_text, cache_status = await response_cache.get_or_generate(
+            "tasks",
+            key,
+            lambda: tasksLLM.agenerate_tasks(temperature=task_input.temperature, **inputs),
+            db=db,
+            bypass=bypass_cache,
             temperature=task_input.temperature,
+            columns={"milestones": task_input.milestones, "tech_stack": task_input.tech_stack},
         )
         task_input.content = tasks_text
+        response.headers["X-Cache"] = cache_status
 
         return {"tasks": task_input.content}
+    except LLMUnavailableError:
+        raise  # 503/504 with Retry-After, see app.main
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
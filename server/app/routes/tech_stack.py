@@ -4,10 +4,11 @@ from typing import List
 
 from app import schema as schemas
 from app.core.db import get_db
+from app.core.ratelimit import crud_rate_limit
 from app.models.tech_stack import TechStack
 from app.routes.user import get_current_user
 
-router = APIRouter(prefix="/tech_stack", tags=["tech_stack"])
+router = APIRouter(prefix="/tech_stack", tags=["tech_stack"], dependencies=[Depends(crud_rate_limit)])
 
 @router.post("/", response_model=schemas.TechStackRead, status_code=status.HTTP_201_CREATED)
 def create_tech_stack(
@@ -6,6 +6,7 @@ from typing import List, Dict, Any
 
 from app import schema as schemas
 from app.core.db import get_db
+from app.core.ratelimit import crud_rate_limit
 from app.models.user import User
 from app.useage.auth_service import (
     login_user,
@@ -18,7 +19,7 @@ from app.useage.auth_service import (
 )
 
 # Define the router for authentication-related endpoints
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], dependencies=[Depends(crud_rate_limit)])
 logger = logging.getLogger(__name__)
 
 # Define the OAuth2 scheme, expecting a Bearer token in the Authorization header
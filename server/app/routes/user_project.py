@@ -3,13 +3,14 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from app.core.db import get_db
+from app.core.ratelimit import crud_rate_limit
 from app.models.userproject import UserProject
 from app.models.user import User
 from app.models.project import Project
 from app.schema import UserProjectCreate, UserProjectRead, UserProjectUpdate
 from app.routes.user import get_current_user
 
-router = APIRouter(prefix="/user-projects", tags=["user-projects"])
+router = APIRouter(prefix="/user-projects", tags=["user-projects"], dependencies=[Depends(crud_rate_limit)])
 
 
 @router.post("/", response_model=UserProjectRead, status_code=status.HTTP_201_CREATED)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Optional, Dict, Any, List, Literal
+from typing import Optional, Dict, Any, List, Literal, Tuple
 from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict
 from pydantic.networks import EmailStr
@@ -175,6 +175,39 @@ class ProjectUMLCreate(BaseModel):
     uml_schema: Dict[str, Any] = Field(..., description="UML JSON schema payload")
 
 
+class ProjectUMLUpdate(ProjectUMLCreate):
+    revision: Optional[int] = Field(None, description="Revision the replacement is based on; omit to overwrite unconditionally")
+
+
+class JsonPatchOperation(BaseModel):
+    """One RFC 6902 operation."""
+    model_config = ConfigDict(populate_by_name=True)
+
+    op: Literal["add", "remove", "replace", "move", "copy", "test"]
+    path: str
+    value: Any = None
+    from_: Optional[str] = Field(None, alias="from")
+
+
+class ProjectUMLPatch(BaseModel):
+    revision: int = Field(..., ge=0, description="Revision the operations were made against")
+    operations: List[JsonPatchOperation] = Field(..., min_length=1)
+
+
+class ProjectUMLRevisionRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    revision: int
+
+
+class UmlViewportRead(BaseModel):
+    id: int
+    revision: int
+    nodes: List[Dict[str, Any]]
+    relationships: List[Dict[str, Any]]  # every relationship with at least one end in `nodes`
+
+
 class ProjectUMLRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -182,22 +215,26 @@ class ProjectUMLRead(BaseModel):
     project_id: Optional[int] = None
     type: str
     uml_schema: Dict[str, Any]
+    revision: int = 0
 
 class ProjectUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
 
-class Node(BaseModel):
-    h: int
-    w: int
-    x: int
-    y: int
+class NodeSpec(BaseModel):
     id: str
     name: str
     type: Literal["database", "service", "load_balancer", "queue", "cache"]
     description: str
 
 
+class Node(NodeSpec):
+    h: int
+    w: int
+    x: int
+    y: int
+
+
 class Relationship(BaseModel):
     to: str
     source: str  # previously named "from_" ("from" is reserved in Python)
@@ -215,8 +252,22 @@ class UmlDesign(BaseModel):
     type: str
     uml_schema: UmlSchema
 
+
+# What the model is asked for: nodes without coordinates (app.core.layout places them)
+class UmlSchemaSpec(BaseModel):
+    nodes: List[NodeSpec]
+    relationships: List[Relationship]
+
+
+class UmlDesignSpec(BaseModel):
+    id: int
+    project_id: Optional[int] = None
+    type: str
+    uml_schema: UmlSchemaSpec
+
 # Ensure forward references (if any) are resolved
 UmlDesign.model_rebuild()
+UmlDesignSpec.model_rebuild()
 
 
 # ---------- Task Assignment Schemas ----------
@@ -258,6 +309,13 @@ class TaskAssignmentRead(BaseModel):
     feature_id: int
 
 
+class PlanMaterializeRead(BaseModel):
+    project_id: int
+    features_created: List[int]
+    features_reused: List[int]
+    tasks_created: int
+
+
 # ---------- UserProject Schemas ----------
 class UserProjectCreate(BaseModel):
     user_id: int
@@ -296,7 +354,7 @@ class FeatureRead(BaseModel):
     project_id: int
     name: str
     status: str
-    milestone_id: int
+    milestone_id: Optional[int] = None  # NULL for features created without one (e.g. from a plan)
     assigned_to: Optional[AssignedUser] = None
     eta: Optional[datetime] = None
 
@@ -305,6 +363,30 @@ class FeatureUpdate(BaseModel):
     status: Optional[str] = None
     milestone_id: int
 
+class FeatureDependencyRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    feature_id: int
+    depends_on_id: int
+    project_id: int
+    source: str
+    created_at: Optional[datetime] = None
+
+class FeatureDependencyList(BaseModel):
+    feature_id: int
+    transitive: bool
+    feature_ids: List[int]  # nearest first
+
+class DependencyGraphRead(BaseModel):
+    project_id: int
+    nodes: List[int]
+    edges: List[Tuple[int, int]]  # (feature_id, depends_on_id)
+
+class DependencyOrderRead(BaseModel):
+    project_id: int
+    order: List[int]  # dependencies before dependents; features on or behind a cycle are omitted
+    cycles: List[List[int]]
+
 class TechStackCreate(BaseModel):
     project_id: int
     tech: str
@@ -321,3 +403,46 @@ class TechStackRead(BaseModel):
 class TechStackUpdate(BaseModel):
     tech: Optional[str] = None
     level: Optional[int] = None
+
+
+# ---------- Job Schemas ----------
+class JobRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    attempts: int
+    max_attempts: int
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+
+# ---------- Chat Session Schemas ----------
+class ChatSessionCreate(BaseModel):
+    title: Optional[str] = None
+
+class ChatSessionRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: Optional[str] = None
+    summary: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class ChatMessageRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    role: Literal["user", "assistant"]
+    content: str
+    tool_action: Optional[Any] = None
+    created_at: Optional[datetime] = None
+
+class ChatSessionDetail(ChatSessionRead):
+    messages: List[ChatMessageRead]  # most recent page, oldest first
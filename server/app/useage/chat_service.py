@@ -0,0 +1,176 @@
+"""Server-side chat sessions with windowed history and a rolling summary.
+
+Each agent call gets at most:
+- the session's rolling summary, as one system message
+- the messages not yet folded into it, capped at the last
+  BMS_CHAT_HISTORY_TURNS + BMS_CHAT_SUMMARY_BATCH_TURNS turns
+
+Once BMS_CHAT_SUMMARY_BATCH_TURNS turns have fallen out of the verbatim
+window of the last BMS_CHAT_HISTORY_TURNS turns, a "chat-summary" job is
+queued on app.core.jobs. It folds them into the summary off the request
+path. Prompt size stays bounded however long the conversation runs, and a
+reply never waits for summarisation.
+
+Sessions are sync, so `chat` and the summary job run their database steps
+on the threadpool and only await the LLM calls on the event loop.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.agents import chatAgentLLM, chatIntents, chatSummaryLLM
+from app.core.config import settings
+from app.core.jobs import TERMINAL, job_queue
+from app.core.metrics import metrics
+from app.models.chatsession import ChatMessage, ChatSession
+
+SUMMARY_JOB_KIND = "chat-summary"
+
+
+# Domain-level exceptions (service layer should not depend on FastAPI)
+class ChatSessionNotFoundError(Exception):
+    pass
+
+
+def create_session(db: Session, user_id: int, title: Optional[str] = None) -> ChatSession:
+    session = ChatSession(user_id=user_id, title=title)
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return session
+
+
+def get_session(db: Session, session_id: int, user_id: int) -> ChatSession:
+    session = db.query(ChatSession).filter(ChatSession.id == session_id, ChatSession.user_id == user_id).first()
+    if session is None:
+        raise ChatSessionNotFoundError("Chat session not found")
+    return session
+
+
+def list_sessions(db: Session, user_id: int) -> List[ChatSession]:
+    return db.query(ChatSession).filter(ChatSession.user_id == user_id).order_by(ChatSession.id.desc()).all()
+
+
+def recent_messages(db: Session, session: ChatSession, limit: int) -> List[ChatMessage]:
+    rows = (
+        db.query(ChatMessage)
+        .filter(ChatMessage.session_id == session.id)
+        .order_by(ChatMessage.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return rows[::-1]
+
+
+def delete_session(db: Session, session: ChatSession) -> None:
+    db.query(ChatMessage).filter(ChatMessage.session_id == session.id).delete(synchronize_session=False)
+    db.delete(session)
+    db.commit()
+
+
+def _as_message(row: ChatMessage) -> BaseMessage:
+    return HumanMessage(content=row.content) if row.role == "user" else AIMessage(content=row.content)
+
+
+def _unsummarized(db: Session, session: ChatSession):
+    query = db.query(ChatMessage).filter(ChatMessage.session_id == session.id)
+    if session.summarized_through is not None:
+        query = query.filter(ChatMessage.id > session.summarized_through)
+    return query
+
+
+def build_history(db: Session, session: ChatSession) -> List[BaseMessage]:
+    """Summary + the messages it doesn't cover yet, never more than the configured cap."""
+    cap = 2 * (settings.chat_history_turns + settings.chat_summary_batch_turns)
+    rows = _unsummarized(db, session).order_by(ChatMessage.id.desc()).limit(cap).all()[::-1]
+    history: List[BaseMessage] = []
+    if session.summary:
+        history.append(SystemMessage(content=f"Summary of the earlier conversation:\n{session.summary}"))
+    history.extend(_as_message(row) for row in rows)
+    return history
+
+
+def schedule_summary(db: Session, session: ChatSession) -> Optional[str]:
+    """Queue a summary refresh once enough turns have left the verbatim window; returns the job id."""
+    window = 2 * settings.chat_history_turns
+    pending = _unsummarized(db, session).count() - window
+    if pending < 2 * settings.chat_summary_batch_turns:
+        return None
+    if session.summary_job_id is not None:
+        job = job_queue.get(session.summary_job_id, db)
+        if job is not None and job.status not in TERMINAL:
+            return None  # a refresh is already queued or running
+    job = job_queue.submit(SUMMARY_JOB_KIND, {"session_id": session.id}, db, user_id=session.user_id)
+    session.summary_job_id = job.id
+    db.commit()
+    metrics.incr("chat.summary.scheduled")
+    return job.id
+
+
+def _prepare_turn(db: Session, session: ChatSession, query: str) -> Tuple[Optional[Dict[str, Any]], List[BaseMessage]]:
+    """The fast-path answer if there is one, otherwise the history to send to the agent."""
+    result = chatIntents.try_fast_path(query, session.user_id, db)
+    if result is not None:
+        return result, []
+    return None, build_history(db, session)
+
+
+def _record_turn(db: Session, session: ChatSession, query: str, result: Dict[str, Any]) -> None:
+    if session.title is None:
+        session.title = query.strip()[:80]
+    db.add_all([
+        ChatMessage(session_id=session.id, role="user", content=query),
+        ChatMessage(
+            session_id=session.id,
+            role="assistant",
+            content=result.get("output", ""),
+            tool_action=result.get("tool_action"),
+        ),
+    ])
+    db.commit()
+    schedule_summary(db, session)
+
+
+async def chat(db: Session, session: ChatSession, query: str) -> Dict[str, Any]:
+    """Answer `query` in the context of `session` and store both sides of the turn."""
+    result, history = await run_in_threadpool(_prepare_turn, db, session, query)
+    if result is None:
+        metrics.incr("chat.history.messages", len(history))
+        result = await chatAgentLLM.achat_with_agent(query, session.user_id, history)
+    await run_in_threadpool(_record_turn, db, session, query, result)
+    return result
+
+
+def _rows_to_fold(db: Session, session_id: int) -> Tuple[Optional[ChatSession], List[ChatMessage]]:
+    session = db.get(ChatSession, session_id)
+    if session is None:
+        return None, []
+    rows = _unsummarized(db, session).order_by(ChatMessage.id).all()
+    return session, rows[: max(0, len(rows) - 2 * settings.chat_history_turns)]
+
+
+async def run_chat_summary(payload: Dict[str, Any], db: Session) -> Dict[str, Any]:
+    """Job handler: fold everything older than the verbatim window into the session summary."""
+    session, fold = await run_in_threadpool(_rows_to_fold, db, payload["session_id"])
+    if session is None:
+        return {"session_id": payload["session_id"], "summarized_through": None}
+
+    if fold:
+        session.summary = await chatSummaryLLM.asummarize_chat(
+            session.summary,
+            [_as_message(row) for row in fold],
+            max_words=settings.chat_summary_max_words,
+        )
+        session.summarized_through = fold[-1].id
+        metrics.incr("chat.summary.folded_messages", len(fold))
+    session.summary_job_id = None
+    outcome = {"session_id": session.id, "summarized_through": session.summarized_through}  # read before commit expires them
+    await run_in_threadpool(db.commit)
+    return outcome
+
+
+job_queue.register(SUMMARY_JOB_KIND, run_chat_summary)
@@ -0,0 +1,143 @@
+"""Relevance-pruned project context for the dependency-analysis prompt.
+
+Large projects have hundreds of features, and sending all of them makes the
+prompt slow and expensive. Instead the project's features are ranked against
+the new feature description with a TF-IDF index (app.core.retrieval). Only
+the top-k hits go to backEndLLM, added best first while they fit the token
+budget, plus the milestones those features belong to. A project that fits
+the limits as-is is sent unchanged.
+
+Indexes are cached per project in a small LRU. Each entry is keyed by a
+fingerprint of the indexed text (feature ids and names, milestone names), so
+adding, renaming or moving a feature rebuilds the index on the next request.
+Status changes don't, because status isn't part of the indexed text.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.instrumentation import count_tokens
+from app.core.metrics import metrics
+from app.core.retrieval import TfidfIndex
+from app.models.feature import Feature
+from app.models.milestone import Milestone
+
+metrics.define_rate("dependency_context.index_hit_rate", "dependency_context.index_hits", "dependency_context.index_builds")
+
+
+def feature_line(feature: Feature) -> str:
+    return f"ID: {feature.id}, Name: {feature.name}, Milestone ID: {feature.milestone_id}, Status: {feature.status}"
+
+
+def milestone_line(milestone: Milestone) -> str:
+    return f"ID: {milestone.id}, Name: {milestone.name}, Done: {milestone.done}, Progress: {milestone.progress}%"
+
+
+def _document(feature: Feature, milestone_names: Dict[int, str]) -> str:
+    # The milestone name adds context a bare feature name lacks ("Export" under "Billing")
+    return f"{feature.name} {milestone_names.get(feature.milestone_id, '')}".strip()
+
+
+def _fingerprint(features: Sequence[Feature], milestone_names: Dict[int, str]) -> str:
+    digest = hashlib.sha1()
+    for feature in features:
+        digest.update(f"{feature.id}\x1f{_document(feature, milestone_names)}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class FeatureIndexCache:
+    """Per-project TF-IDF indexes, rebuilt when the project's feature texts change."""
+
+    def __init__(self, max_projects: int = 64) -> None:
+        self.max_projects = max_projects
+        self._entries: "OrderedDict[int, Tuple[str, TfidfIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, project_id: int, features: Sequence[Feature], milestone_names: Dict[int, str]) -> TfidfIndex:
+        fingerprint = _fingerprint(features, milestone_names)
+        with self._lock:
+            entry = self._entries.get(project_id)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(project_id)
+                metrics.incr("dependency_context.index_hits")
+                return entry[1]
+
+        # Build outside the lock; a concurrent duplicate build is harmless
+        index = TfidfIndex([f.id for f in features], [_document(f, milestone_names) for f in features])
+        metrics.incr("dependency_context.index_builds")
+        with self._lock:
+            self._entries[project_id] = (fingerprint, index)
+            self._entries.move_to_end(project_id)
+            while len(self._entries) > self.max_projects:
+                self._entries.popitem(last=False)
+        return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+feature_index_cache = FeatureIndexCache(max_projects=settings.dependency_index_max_projects)
+
+
+@dataclass
+class DependencyContext:
+    features: str
+    milestones: str
+    features_total: int
+    features_selected: int
+
+
+def build_dependency_context(
+    project_id: int,
+    new_feature: str,
+    features: Sequence[Feature],
+    milestones: Sequence[Milestone],
+    *,
+    top_k: Optional[int] = None,
+    token_budget: Optional[int] = None,
+) -> DependencyContext:
+    """Prompt text for the features most relevant to `new_feature` and their milestones."""
+    top_k = settings.dependency_context_top_k if top_k is None else top_k
+    token_budget = settings.dependency_context_token_budget if token_budget is None else token_budget
+    metrics.incr("dependency_context.requests")
+
+    lines = {f.id: feature_line(f) for f in features}
+    if len(features) <= top_k and count_tokens("\n".join(lines.values())) <= token_budget:
+        selected: List[Feature] = list(features)  # small project: send everything, as before
+        kept_milestones = list(milestones)
+    else:
+        by_id = {f.id: f for f in features}
+        milestone_names = {m.id: m.name for m in milestones}
+        hits = feature_index_cache.get(project_id, features, milestone_names).search(new_feature, top_k)
+        selected, used = [], 0
+        for feature_id, _ in hits:
+            cost = count_tokens(lines[feature_id]) + 1  # +1 for the newline
+            if used + cost > token_budget:
+                break
+            selected.append(by_id[feature_id])
+            used += cost
+        referenced = {f.milestone_id for f in selected}
+        kept_milestones = [m for m in milestones if m.id in referenced]
+
+    metrics.incr("dependency_context.features_total", len(features))
+    metrics.incr("dependency_context.features_selected", len(selected))
+
+    if not features:
+        features_str = "No existing features."
+    elif not selected:
+        features_str = f"None of the project's {len(features)} features look related to the new feature."
+    else:
+        features_str = "\n".join(lines[f.id] for f in selected)
+        if len(selected) < len(features):
+            features_str = (
+                f"(The {len(selected)} of {len(features)} project features most relevant to the new feature.)\n"
+                + features_str
+            )
+    milestones_str = "\n".join(milestone_line(m) for m in kept_milestones) or "No existing milestones."
+    return DependencyContext(features_str, milestones_str, len(features), len(selected))
@@ -0,0 +1,149 @@
+"""Feature dependency edges: persisted in feature_dependencies, queried through app.core.dependency_graph."""
+from __future__ import annotations
+
+import logging
+from typing import Iterable, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.dependency_graph import DependencyGraph, GraphRegistry
+from app.models.feature import Feature
+from app.models.featuredependency import FeatureDependency
+
+logger = logging.getLogger(__name__)
+
+graph_registry = GraphRegistry(
+    max_projects=settings.dependency_graph_max_projects,
+    ttl_seconds=settings.dependency_graph_ttl_seconds,
+)
+
+
+# Domain-level exceptions (service layer should not depend on FastAPI)
+class FeatureNotFoundError(Exception):
+    pass
+
+
+class DependencyNotFoundError(Exception):
+    pass
+
+
+class InvalidDependencyError(Exception):
+    pass
+
+
+class DependencyCycleError(Exception):
+    pass
+
+
+def get_graph(db: Session, project_id: int) -> DependencyGraph:
+    def load(pid: int) -> Tuple[Iterable[int], Iterable[Tuple[int, int]]]:
+        nodes = [row.id for row in db.query(Feature.id).filter(Feature.project_id == pid)]
+        edges = db.query(FeatureDependency.feature_id, FeatureDependency.depends_on_id).filter(
+            FeatureDependency.project_id == pid
+        )
+        return nodes, [(a, b) for a, b in edges]
+
+    return graph_registry.get(project_id, load)
+
+
+def get_feature(db: Session, feature_id: int) -> Feature:
+    feature = db.query(Feature).filter(Feature.id == feature_id).first()
+    if feature is None:
+        raise FeatureNotFoundError(f"Feature {feature_id} not found")
+    return feature
+
+
+def add_dependency(db: Session, feature_id: int, depends_on_id: int, source: str = "manual") -> FeatureDependency:
+    """Store feature_id -> depends_on_id; idempotent, and refuses edges that would close a cycle."""
+    feature = get_feature(db, feature_id)
+    depends_on = get_feature(db, depends_on_id)
+    if feature.project_id != depends_on.project_id:
+        raise InvalidDependencyError("Features belong to different projects")
+    if feature_id == depends_on_id:
+        raise InvalidDependencyError("A feature cannot depend on itself")
+
+    existing = db.get(FeatureDependency, (feature_id, depends_on_id))
+    if existing is not None:
+        return existing
+    graph = get_graph(db, feature.project_id)
+    if graph.would_create_cycle(feature_id, depends_on_id):
+        raise DependencyCycleError(
+            f"Feature {depends_on_id} already depends on feature {feature_id}; the edge would create a cycle"
+        )
+
+    edge = FeatureDependency(
+        feature_id=feature_id, depends_on_id=depends_on_id, project_id=feature.project_id, source=source
+    )
+    db.add(edge)
+    db.commit()
+    db.refresh(edge)
+    graph.add_edge(feature_id, depends_on_id)
+    return edge
+
+
+def remove_dependency(db: Session, feature_id: int, depends_on_id: int) -> None:
+    edge = db.get(FeatureDependency, (feature_id, depends_on_id))
+    if edge is None:
+        raise DependencyNotFoundError("Dependency not found")
+    project_id = edge.project_id
+    db.delete(edge)
+    db.commit()
+    graph = graph_registry.loaded(project_id)
+    if graph is not None:
+        graph.remove_edge(feature_id, depends_on_id)
+
+
+def record_analysis(db: Session, feature: Feature, depends_on: List[int]) -> List[int]:
+    """Replace the LLM-derived edges of `feature` with `depends_on`; manual edges are kept.
+
+    Ids outside the project and edges that would close a cycle are dropped.
+    Returns the ids actually stored.
+    """
+    graph = get_graph(db, feature.project_id)
+    previous = db.query(FeatureDependency).filter(
+        FeatureDependency.feature_id == feature.id, FeatureDependency.source == "llm"
+    ).all()
+    for edge in previous:
+        db.delete(edge)
+        graph.remove_edge(edge.feature_id, edge.depends_on_id)
+
+    stored: List[int] = []
+    for depends_on_id in dict.fromkeys(depends_on):
+        if depends_on_id not in graph or depends_on_id == feature.id:
+            logger.info(f"Ignoring dependency {feature.id} -> {depends_on_id}: not a feature of project {feature.project_id}")
+            continue
+        if depends_on_id in graph.dependencies(feature.id, transitive=False):
+            continue  # already there as a manual edge
+        if graph.would_create_cycle(feature.id, depends_on_id):
+            logger.warning(f"Ignoring dependency {feature.id} -> {depends_on_id}: it would create a cycle")
+            continue
+        db.add(FeatureDependency(
+            feature_id=feature.id, depends_on_id=depends_on_id, project_id=feature.project_id, source="llm"
+        ))
+        graph.add_edge(feature.id, depends_on_id)
+        stored.append(depends_on_id)
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        graph_registry.invalidate(feature.project_id)  # memory is ahead of the database now
+        raise
+    return stored
+
+
+# ---------- incremental updates from the feature routes ----------
+def feature_created(feature: Feature) -> None:
+    graph = graph_registry.loaded(feature.project_id)
+    if graph is not None:
+        graph.add_node(feature.id)
+
+
+def feature_deleted(db: Session, feature: Feature) -> None:
+    """Drop the feature's edges (explicitly, so it also works without FK cascades) before the row goes."""
+    db.query(FeatureDependency).filter(
+        (FeatureDependency.feature_id == feature.id) | (FeatureDependency.depends_on_id == feature.id)
+    ).delete(synchronize_session=False)
+    graph = graph_registry.loaded(feature.project_id)
+    if graph is not None:
+        graph.remove_node(feature.id)
@@ -0,0 +1,133 @@
+"""LLM generation use cases shared by the synchronous routes and the job queue."""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app import schema as schemas
+from app.agents import backEndLLM, featureBreakdownLLM, systemDesignLLM
+from app.agents.backEndLLM import DependencyAnalysisOutput
+from app.core.config import settings
+from app.models.feature import Feature
+from app.models.milestone import Milestone
+from app.models.project import Project
+from app.models.projectuml import ProjectUML
+from app.models.tech_stack import TechStack
+from app.useage import dependency_service
+from app.useage.dependency_context import build_dependency_context
+
+
+# Domain-level exceptions (service layer should not depend on FastAPI)
+class ProjectNotFoundError(Exception):
+    pass
+
+
+async def create_system_design(payload: schemas.SystemDesignRequest, db: Session) -> ProjectUML:
+    """Generate a UML design via the LLM and persist it as a ProjectUML row."""
+    # Generate UML design via LLM, validated by Pydantic
+    uml_design = await systemDesignLLM.agenerate_system_design(
+        features=payload.features,
+        expected_users=payload.expected_users,
+        geography=payload.geography,
+        tech_stack=payload.tech_stack,
+        constraints=payload.constraints,
+        project_id=payload.project_id,
+        temperature=payload.temperature,
+    )
+
+    # Persist to ProjectUML
+    db_item = ProjectUML(
+        project_id=payload.project_id,
+        type=uml_design.type,
+        uml_schema=uml_design.uml_schema.model_dump() if hasattr(uml_design.uml_schema, "model_dump") else uml_design.uml_schema,
+        revision=0,
+    )
+    db.add(db_item)
+    db.commit()
+    db.refresh(db_item)
+    return db_item
+
+
+async def analyze_dependencies(
+    project_id: int,
+    new_feature: str,
+    db: Session,
+    feature_id: Optional[int] = None,
+) -> DependencyAnalysisOutput:
+    """Ask the LLM which existing features of the project `new_feature` depends on.
+
+    With `feature_id` (the feature already exists) the answer is also stored as
+    its dependency edges, so later ordering questions need no LLM call.
+    """
+    # Fetch project details
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise ProjectNotFoundError("Project not found")
+
+    # Fetch tech stack
+    tech_stacks = db.query(TechStack).filter(TechStack.project_id == project_id).all()
+    if tech_stacks:
+        tech_stack_str = ", ".join([f"{ts.tech} (Level: {ts.level})" for ts in tech_stacks])
+    else:
+        tech_stack_str = "No specific tech stack defined."
+
+    feature = None
+    if feature_id is not None:
+        feature = dependency_service.get_feature(db, feature_id)
+        if feature.project_id != project_id:
+            raise dependency_service.FeatureNotFoundError(f"Feature {feature_id} not found in project {project_id}")
+
+    # Only the features most relevant to the new one (and their milestones) go into the prompt
+    all_features = db.query(Feature).filter(Feature.project_id == project_id).order_by(Feature.id).all()
+    all_features = [f for f in all_features if f.id != feature_id]
+    all_milestones = db.query(Milestone).filter(Milestone.project_id == project_id).all()
+    context = build_dependency_context(project_id, new_feature, all_features, all_milestones)
+
+    result = await backEndLLM.aget_feature_dependencies(
+        project_name=project.name,
+        features=context.features,
+        milestones=context.milestones,
+        tech_stack=tech_stack_str,
+        new_feature=new_feature,
+    )
+    if feature is not None:
+        dependency_service.record_analysis(db, feature, result.depends_on)
+    return result
+
+
+async def breakdown_features(
+    descriptions: List[str],
+    max_concurrency: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Break down many features concurrently, yielding each result as soon as it is ready.
+
+    Identical descriptions (after trimming) are broken down once; each result lists
+    every input position it answers in `indices`. A failure is reported in its own
+    result and does not stop the batch.
+    """
+    positions: Dict[str, List[int]] = {}
+    for index, description in enumerate(descriptions):
+        positions.setdefault(description.strip(), []).append(index)
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or settings.feature_breakdown_max_concurrency))
+
+    async def breakdown(description: str) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"indices": positions[description], "feature_description": description}
+        async with semaphore:
+            try:
+                breakdown = await featureBreakdownLLM.abreakdown_feature(description)
+                result["breakdown"] = breakdown.model_dump()
+            except Exception as e:
+                result["error"] = str(e)
+        return result
+
+    pending = [asyncio.ensure_future(breakdown(description)) for description in positions]
+    try:
+        for finished in asyncio.as_completed(pending):
+            yield await finished
+    finally:
+        # Client disconnects must not leave calls running
+        for task in pending:
+            task.cancel()
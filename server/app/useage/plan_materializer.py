@@ -0,0 +1,234 @@
+"""Plan materializer: generated plans -> Feature and TaskAssignment rows.
+
+Two inputs are understood:
+- the "Daily Task Plan" markdown of tasksLLM / the /plan pipeline: every
+  `## <milestone>` section becomes a feature and every `- Day N: <task>`
+  line a task, with its indented bullets kept as subtasks in the description
+- FeatureBreakdown outputs: one feature per breakdown, one task per item,
+  typed by category ("frontend", "backend", ...)
+
+Day offsets count from `start_date` (Day 1 is the start date). A task on
+days a..b gets duration_days = b - a + 1 and an eta on day b.
+
+Everything is written in one transaction with two executemany INSERTs (new
+features, then tasks), so a 300-task plan is a couple of batched statements
+instead of a session and commit per task. Features that already exist in
+the project under the same name are reused instead of duplicated.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.agents.featureBreakdownLLM import FeatureBreakdown
+from app.core.metrics import metrics
+from app.models.feature import Feature
+from app.models.taskassignment import TaskAssignment
+from app.useage import dependency_service
+
+
+# Domain-level exceptions (service layer should not depend on FastAPI)
+class EmptyPlanError(Exception):
+    pass
+
+
+@dataclass
+class PlannedTask:
+    description: str
+    type: Optional[str] = None
+    first_day: Optional[int] = None  # 1-based day offsets; None when the plan has no schedule
+    last_day: Optional[int] = None
+    subtasks: List[str] = field(default_factory=list)
+
+    @property
+    def duration_days(self) -> Optional[int]:
+        if self.first_day is None or self.last_day is None:
+            return None
+        return self.last_day - self.first_day + 1
+
+    def full_description(self) -> str:
+        return "\n".join([self.description] + [f"- {s}" for s in self.subtasks])
+
+
+@dataclass
+class PlannedFeature:
+    name: str
+    tasks: List[PlannedTask] = field(default_factory=list)
+
+
+@dataclass
+class MaterializedPlan:
+    project_id: int
+    features_created: List[int]
+    features_reused: List[int]
+    tasks_created: int
+
+
+# ---------- parsing ----------
+_SECTION = re.compile(r"^##\s+(.+?)\s*$")
+_DAY = re.compile(
+    r"^[-*]\s+(?:\*\*)?days?\s+(\d+)(?:\s*(?:-|–|to)\s*(\d+))?(?:\*\*)?\s*[:.)\-–]?\s*(?:\*\*)?\s*(.*)$",
+    re.IGNORECASE,
+)
+_BULLET = re.compile(r"^[-*]\s+(.*)$")
+_SUBTASKS_LABEL = re.compile(r"^(?:\*\*)?subtasks?(?:\*\*)?\s*:\s*(?:\*\*)?\s*", re.IGNORECASE)
+
+
+def _clean(text: str) -> str:
+    return text.replace("**", "").strip().rstrip(":").strip()
+
+
+def parse_task_plan(markdown: str) -> List[PlannedFeature]:
+    """Features and scheduled tasks from "Daily Task Plan" markdown, in document order.
+
+    Top-level bullets without a day run on the previous task's days (Day 1
+    before any); indented bullets are subtasks of the task above them.
+    """
+    features: List[PlannedFeature] = []
+    current: Optional[PlannedFeature] = None
+    last: Optional[PlannedTask] = None
+    for raw in markdown.splitlines():
+        line = raw.rstrip()
+        if not line.strip():
+            continue
+        section = _SECTION.match(line)
+        if section:
+            current, last = PlannedFeature(_clean(section.group(1))), None
+            features.append(current)
+            continue
+        if current is None:
+            continue  # title or prose before the first section
+
+        indented = raw[: len(raw) - len(raw.lstrip())] != ""
+        stripped = line.strip()
+        day = _DAY.match(stripped)
+        if day and not indented:
+            first = int(day.group(1))
+            end = int(day.group(2)) if day.group(2) else first
+            last = PlannedTask(_clean(day.group(3)), first_day=first, last_day=max(first, end))
+            current.tasks.append(last)
+            continue
+        bullet = _BULLET.match(stripped)
+        if bullet is None:
+            continue
+        text = _clean(_SUBTASKS_LABEL.sub("", bullet.group(1)))
+        if not text:
+            continue
+        if indented and last is not None:
+            last.subtasks.append(text)
+        else:
+            first, end = (last.first_day, last.last_day) if last is not None else (1, 1)
+            last = PlannedTask(text, first_day=first, last_day=end)
+            current.tasks.append(last)
+
+    for feature in features:
+        for task in feature.tasks:
+            if not task.description and task.subtasks:
+                task.description = task.subtasks.pop(0)  # "- Day 1:" followed only by bullets
+        feature.tasks = [t for t in feature.tasks if t.description]
+    return [f for f in features if f.tasks]
+
+
+def breakdown_to_plan(feature_name: str, breakdown: FeatureBreakdown) -> PlannedFeature:
+    """One unscheduled task per breakdown item, typed by its category."""
+    tasks = [
+        PlannedTask(item.strip(), type=category[: -len("_tasks")])
+        for category, items in breakdown.model_dump().items()
+        for item in items
+        if item and item.strip()
+    ]
+    return PlannedFeature(feature_name.strip(), tasks)
+
+
+# ---------- persistence ----------
+def _existing_features(db: Session, project_id: int, names: Iterable[str]) -> Dict[str, int]:
+    keys = {name.lower() for name in names}
+    rows = (
+        db.query(Feature.id, func.lower(Feature.name))
+        .filter(Feature.project_id == project_id, func.lower(Feature.name).in_(keys))
+        .order_by(Feature.id)
+        .all()
+    )
+    found: Dict[str, int] = {}
+    for feature_id, key in rows:
+        found.setdefault(key, feature_id)  # oldest wins if names were already duplicated
+    return found
+
+
+def _eta(start: date, task: PlannedTask) -> Optional[datetime]:
+    if task.last_day is None:
+        return None
+    return datetime.combine(start + timedelta(days=task.last_day - 1), time())
+
+
+def materialize(
+    db: Session,
+    features: Sequence[PlannedFeature],
+    *,
+    project_id: int,
+    user_id: int,
+    assigned_by: Optional[int] = None,
+    start_date: Optional[date] = None,
+    milestone_id: Optional[int] = None,
+    status: str = "todo",
+) -> MaterializedPlan:
+    """Insert the plan's features and tasks for `project_id` in one transaction."""
+    # Sections that name the same feature are merged
+    merged: Dict[str, PlannedFeature] = {}
+    for feature in features:
+        if feature.tasks:
+            merged.setdefault(feature.name.lower(), PlannedFeature(feature.name)).tasks.extend(feature.tasks)
+    if not merged:
+        raise EmptyPlanError("The plan has no tasks to create")
+    start = start_date or date.today()
+
+    ids = _existing_features(db, project_id, merged)
+    reused = list(ids.values())
+    new = [feature for key, feature in merged.items() if key not in ids]
+    try:
+        if new:
+            rows = db.execute(
+                insert(Feature).returning(Feature.id, sort_by_parameter_order=True).execution_options(render_nulls=True),
+                [{"project_id": project_id, "milestone_id": milestone_id, "name": f.name, "status": "todo"} for f in new],
+            ).scalars().all()
+            ids.update({f.name.lower(): feature_id for f, feature_id in zip(new, rows)})
+
+        task_rows = [
+            {
+                "project_id": project_id,
+                "feature_id": ids[key],
+                "user_id": user_id,
+                "assigned_by": assigned_by,
+                "description": task.full_description(),
+                "type": task.type or "development",
+                "status": status,
+                "eta": _eta(start, task),
+                "duration_days": task.duration_days,
+            }
+            for key, feature in merged.items()
+            for task in feature.tasks
+        ]
+        # render_nulls keeps unscheduled (eta=None) rows in the same batch instead of a statement of their own
+        db.execute(insert(TaskAssignment).execution_options(render_nulls=True), task_rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    created = [ids[f.name.lower()] for f in new]
+    for feature_id in created:
+        # Only id and project_id are read; keeps loaded dependency graphs in step without reloading the rows
+        dependency_service.feature_created(Feature(id=feature_id, project_id=project_id))
+    metrics.incr("plan_materializer.features_created", len(created))
+    metrics.incr("plan_materializer.tasks_created", len(task_rows))
+    return MaterializedPlan(
+        project_id=project_id,
+        features_created=created,
+        features_reused=reused,
+        tasks_created=len(task_rows),
+    )
@@ -0,0 +1,158 @@
+"""Plan pipeline: roadmap -> milestones -> per-feature daily tasks.
+
+Instead of sending the whole milestones document to the tasks agent in one
+prompt, the milestones are split on their `## <feature>` sections and each
+section is planned concurrently (bounded by a semaphore). Results are emitted
+as soon as each stage or section finishes and reassembled in document order.
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.agents import roadmapLLM, milestonesLLM, tasksLLM
+from app.core.cache import response_cache, make_cache_key
+from app.core.config import settings
+
+PlanEvent = Tuple[str, Dict[str, Any]]
+
+TASK_PLAN_TITLE = "# Daily Task Plan"
+
+_HEADING = re.compile(r"^(#{1,2})\s+(.*?)\s*$")
+_TITLE = re.compile(r"^\s*#\s+daily task plan\s*$", re.IGNORECASE)
+
+
+def split_milestone_sections(milestones: str) -> List[Tuple[str, str]]:
+    """Return [(feature, section markdown)] for every `## ` section, in order.
+
+    A section runs until the next `#` or `##` heading. Returns [] when the
+    document has no level-2 sections (the caller then plans it in one call).
+    """
+    sections: List[Tuple[str, List[str]]] = []
+    current: Optional[Tuple[str, List[str]]] = None
+    for line in milestones.splitlines():
+        match = _HEADING.match(line)
+        if match:
+            level, title = match.groups()
+            current = (title, [line]) if level == "##" else None
+            if current is not None:
+                sections.append(current)
+            continue
+        if current is not None:
+            current[1].append(line)
+    return [(title, "\n".join(lines).strip()) for title, lines in sections]
+
+
+def assemble_task_plan(section_plans: List[str]) -> str:
+    """Join per-section plans under a single title, dropping each section's own title."""
+    bodies = []
+    for plan in section_plans:
+        lines = plan.strip().splitlines()
+        if lines and _TITLE.match(lines[0]):
+            lines = lines[1:]
+        body = "\n".join(lines).strip()
+        if body:
+            bodies.append(body)
+    return TASK_PLAN_TITLE + "\n\n" + "\n\n".join(bodies)
+
+
+class PlanPipeline:
+    """Runs the three planning stages, yielding (event, data) as results land.
+
+    Events, in order: `roadmap`, `milestones`, `tasks_section` (one per feature,
+    in completion order), `tasks` (the reassembled document).
+    """
+
+    def __init__(
+        self,
+        *,
+        tech_stack: str,
+        temperature: float = 0.2,
+        db: Optional[Session] = None,
+        bypass_cache: bool = False,
+        max_concurrency: Optional[int] = None,
+    ) -> None:
+        self.tech_stack = tech_stack
+        self.temperature = temperature
+        self.db = db
+        self.bypass_cache = bypass_cache
+        self.max_concurrency = max(1, max_concurrency or settings.plan_tasks_max_concurrency)
+        self.cache_statuses: List[str] = []
+
+    async def _cached(self, agent, prompt_version, inputs, generate, columns) -> str:
+        key = make_cache_key(agent, prompt_version, inputs, self.temperature)
+        text, cache_status = await response_cache.get_or_generate(
+            agent, key, generate,
+            db=self.db, bypass=self.bypass_cache, temperature=self.temperature, columns=columns,
+        )
+        self.cache_statuses.append(cache_status)
+        return text
+
+    async def _plan_tasks(self, milestones: str) -> str:
+        inputs = {"milestones": milestones, "tech_stack": self.tech_stack}
+        return await self._cached(
+            "tasks", tasksLLM.PROMPT_VERSION, inputs,
+            lambda: tasksLLM.agenerate_tasks(temperature=self.temperature, **inputs),
+            {"milestones": milestones, "tech_stack": self.tech_stack},
+        )
+
+    async def run(self, requirements: str, best_practices: Optional[str] = None) -> AsyncIterator[PlanEvent]:
+        # 1) Generate roadmap text
+        roadmap_inputs = {
+            "requirements": requirements,
+            "tech_stack": self.tech_stack,
+            "best_practices": best_practices,
+        }
+        roadmap_text = await self._cached(
+            "roadmap", roadmapLLM.PROMPT_VERSION, roadmap_inputs,
+            lambda: roadmapLLM.agenerate_roadmap(temperature=self.temperature, **roadmap_inputs),
+            roadmap_inputs,
+        )
+        yield "roadmap", {"text": roadmap_text}
+
+        # 2) Use the roadmap as input 'requirements' for milestones generation
+        milestone_inputs = {"requirements": roadmap_text, "tech_stack": self.tech_stack}
+        milestones_text = await self._cached(
+            "milestones", milestonesLLM.PROMPT_VERSION, milestone_inputs,
+            lambda: milestonesLLM.agenerate_milestones(temperature=self.temperature, **milestone_inputs),
+            milestone_inputs,
+        )
+        yield "milestones", {"text": milestones_text}
+
+        # 3) Fan out one tasks call per feature section
+        sections = split_milestone_sections(milestones_text)
+        if not sections:
+            tasks_text = await self._plan_tasks(milestones_text)
+            yield "tasks", {"text": tasks_text, "sections": 1}
+            return
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def plan_section(index: int, section: str) -> Tuple[int, str]:
+            async with semaphore:
+                return index, await self._plan_tasks(section)
+
+        pending = [asyncio.ensure_future(plan_section(i, body)) for i, (_, body) in enumerate(sections)]
+        results: List[Optional[str]] = [None] * len(sections)
+        try:
+            for finished in asyncio.as_completed(pending):
+                index, text = await finished
+                results[index] = text
+                yield "tasks_section", {"index": index, "feature": sections[index][0], "text": text}
+        finally:
+            # Client disconnects or a failed section must not leave calls running
+            for task in pending:
+                task.cancel()
+
+        yield "tasks", {"text": assemble_task_plan(results), "sections": len(sections)}
+
+    async def collect(self, requirements: str, best_practices: Optional[str] = None) -> Dict[str, str]:
+        """Run every stage and return {"roadmap", "milestones", "tasks"} texts."""
+        result = {}
+        async for stage, data in self.run(requirements, best_practices):
+            if stage in ("roadmap", "milestones", "tasks"):
+                result[stage] = data["text"]
+        return result
@@ -0,0 +1,244 @@
+"""Stored UML diagrams (project_uml): lookups, revisions, viewport queries and server-side re-layout.
+
+Every change bumps `ProjectUML.revision` and is recorded in
+project_uml_revisions:
+- PATCH stores only its RFC 6902 operations (a few hundred bytes for a drag)
+- every `uml_snapshot_every` revisions, and on full replacements, the whole
+  document is stored as a snapshot
+
+A past revision is rebuilt from the nearest snapshot at or before it plus
+the patches after that, so reconstruction never replays more than
+`uml_snapshot_every` patches. Diagrams created before revisions existed get
+a snapshot of their current state on their first change.
+
+Writers send the revision they edited. The update is conditional on it
+(UPDATE ... WHERE revision = :base), so of two concurrent edits to the same
+revision one wins and the other gets RevisionConflictError.
+"""
+from __future__ import annotations
+
+import copy
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import jsonpatch
+from jsonpointer import JsonPointerException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.layout import layout_uml_schema
+from app.core.metrics import metrics
+from app.models.projectuml import ProjectUML
+from app.models.projectumlrevision import ProjectUMLRevision
+from app.useage.uml_viewport import diagram_indexes
+
+
+# Domain-level exceptions (service layer should not depend on FastAPI)
+class UmlNotFoundError(Exception):
+    pass
+
+
+class RevisionNotFoundError(Exception):
+    pass
+
+
+class InvalidPatchError(Exception):
+    pass
+
+
+class RevisionConflictError(Exception):
+    def __init__(self, current: int) -> None:
+        super().__init__(f"UML was changed concurrently; it is now at revision {current}")
+        self.current = current
+
+
+_GEOMETRY = ("x", "y", "w", "h")
+
+
+def check_geometry(document: Dict[str, Any]) -> None:
+    """Reject node boxes that are non-finite or beyond `uml_max_coordinate` (sizes must also be >= 0)."""
+    limit = settings.uml_max_coordinate
+    for i, node in enumerate(document.get("nodes") or []):
+        if not isinstance(node, dict):
+            continue
+        for field in _GEOMETRY:
+            if node.get(field) is None:
+                continue
+            try:
+                value = float(node[field])
+            except (TypeError, ValueError, OverflowError):
+                continue  # not a number: the node is treated as unplaced
+            low = 0.0 if field in ("w", "h") else -limit
+            if not math.isfinite(value) or not low <= value <= limit:
+                raise InvalidPatchError(f"nodes[{i}].{field} must be a finite number between {low:g} and {limit:g}")
+
+
+def get_uml(db: Session, uml_id: int) -> ProjectUML:
+    item = db.query(ProjectUML).filter(ProjectUML.id == uml_id).first()
+    if item is None:
+        raise UmlNotFoundError("UML not found")
+    return item
+
+
+# ---------- revisions ----------
+def _ensure_base_snapshot(db: Session, item: ProjectUML) -> None:
+    """Snapshot the current document if the diagram has no history yet."""
+    has_history = db.query(ProjectUMLRevision.id).filter(ProjectUMLRevision.uml_id == item.id).first()
+    if has_history is None:
+        db.add(ProjectUMLRevision(uml_id=item.id, revision=item.revision or 0, snapshot=item.uml_schema))
+
+
+def _commit_revision(
+    db: Session,
+    item: ProjectUML,
+    base_revision: int,
+    document: Dict[str, Any],
+    patch: Optional[List[Dict[str, Any]]],
+    **changes: Any,
+) -> ProjectUML:
+    revision = base_revision + 1
+    try:
+        _ensure_base_snapshot(db, item)
+        updated = (
+            db.query(ProjectUML)
+            .filter(ProjectUML.id == item.id, ProjectUML.revision == base_revision)
+            .update({"uml_schema": document, "revision": revision, **changes}, synchronize_session=False)
+        )
+        if updated == 0:
+            db.rollback()
+            db.refresh(item)
+            raise RevisionConflictError(item.revision)
+        snapshot = document if patch is None or revision % max(1, settings.uml_snapshot_every) == 0 else None
+        db.add(ProjectUMLRevision(uml_id=item.id, revision=revision, patch=patch, snapshot=snapshot))
+        db.commit()
+    except RevisionConflictError:
+        metrics.incr("uml.revision_conflicts")
+        raise
+    except IntegrityError:
+        # A concurrent edit stored the same base snapshot or revision row first
+        db.rollback()
+        db.refresh(item)
+        metrics.incr("uml.revision_conflicts")
+        raise RevisionConflictError(item.revision)
+    except Exception:
+        db.rollback()
+        raise
+    db.refresh(item)
+    if patch is None:
+        diagram_indexes.replaced(item.id, revision, document)
+    else:
+        diagram_indexes.patched(item.id, base_revision, revision, patch, document)
+    return item
+
+
+def patch_uml(db: Session, uml_id: int, operations: List[Dict[str, Any]], base_revision: int) -> ProjectUML:
+    """Apply RFC 6902 `operations` to the document at `base_revision` and store the result."""
+    item = get_uml(db, uml_id)
+    if item.revision != base_revision:
+        metrics.incr("uml.revision_conflicts")
+        raise RevisionConflictError(item.revision)
+    try:
+        document = jsonpatch.apply_patch(item.uml_schema, operations)  # returns a patched copy
+    except (jsonpatch.JsonPatchException, JsonPointerException) as e:
+        raise InvalidPatchError(str(e))
+    if not isinstance(document, dict):
+        raise InvalidPatchError("The patch must leave a JSON object")
+    check_geometry(document)
+    metrics.incr("uml.patches")
+    return _commit_revision(db, item, base_revision, document, operations)
+
+
+def replace_uml(
+    db: Session,
+    uml_id: int,
+    *,
+    project_id: Optional[int],
+    type: str,
+    uml_schema: Dict[str, Any],
+    base_revision: Optional[int] = None,
+) -> ProjectUML:
+    """Full replacement (PUT); recorded as a snapshot. Without `base_revision` the last write wins."""
+    item = get_uml(db, uml_id)
+    base = item.revision if base_revision is None else base_revision
+    if item.revision != base:
+        metrics.incr("uml.revision_conflicts")
+        raise RevisionConflictError(item.revision)
+    check_geometry(uml_schema)
+    return _commit_revision(db, item, base, uml_schema, None, project_id=project_id, type=type)
+
+
+def document_at(db: Session, uml_id: int, revision: int) -> Dict[str, Any]:
+    """The document as it was at `revision`."""
+    item = get_uml(db, uml_id)
+    if revision == item.revision:
+        return item.uml_schema
+    base = (
+        db.query(ProjectUMLRevision)
+        .filter(
+            ProjectUMLRevision.uml_id == uml_id,
+            ProjectUMLRevision.revision <= revision,
+            ProjectUMLRevision.snapshot.isnot(None),
+        )
+        .order_by(ProjectUMLRevision.revision.desc())
+        .first()
+    )
+    if base is None or revision > item.revision:
+        raise RevisionNotFoundError(f"Revision {revision} of UML {uml_id} is not available")
+
+    steps = (
+        db.query(ProjectUMLRevision.revision, ProjectUMLRevision.patch)
+        .filter(
+            ProjectUMLRevision.uml_id == uml_id,
+            ProjectUMLRevision.revision > base.revision,
+            ProjectUMLRevision.revision <= revision,
+        )
+        .order_by(ProjectUMLRevision.revision)
+        .all()
+    )
+    if [step.revision for step in steps] != list(range(base.revision + 1, revision + 1)):
+        raise RevisionNotFoundError(f"History of UML {uml_id} has a gap before revision {revision}")
+    document = copy.deepcopy(base.snapshot)
+    for step in steps:
+        document = jsonpatch.apply_patch(document, step.patch, in_place=True)
+    return document
+
+
+def delete_uml(db: Session, uml_id: int) -> None:
+    """Delete the diagram and its history (explicitly, so it also works without FK cascades)."""
+    item = get_uml(db, uml_id)
+    try:
+        db.query(ProjectUMLRevision).filter(ProjectUMLRevision.uml_id == uml_id).delete(synchronize_session=False)
+        db.delete(item)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    diagram_indexes.discard(uml_id)
+
+
+def viewport(
+    db: Session, uml_id: int, x: float, y: float, w: float, h: float
+) -> Tuple[int, List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(revision, nodes intersecting the box, relationships touching them).
+
+    Only the revision is read when the cached index is current; the document
+    is loaded just to build or catch up the index.
+    """
+    revision = db.query(ProjectUML.revision).filter(ProjectUML.id == uml_id).scalar()
+    if revision is None:
+        raise UmlNotFoundError("UML not found")
+
+    def load_document() -> Dict[str, Any]:
+        return db.query(ProjectUML.uml_schema).filter(ProjectUML.id == uml_id).scalar() or {}
+
+    nodes, relationships = diagram_indexes.query(uml_id, revision, load_document, (x, y, w, h))
+    return revision, nodes, relationships
+
+
+def relayout(db: Session, uml_id: int) -> ProjectUML:
+    """Recompute x, y, w, h of every node from the relationships and store them as a new revision."""
+    item = get_uml(db, uml_id)
+    return _commit_revision(
+        db, item, item.revision, layout_uml_schema(item.uml_schema or {}), None,
+    )
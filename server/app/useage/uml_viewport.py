@@ -0,0 +1,176 @@
+"""Viewport queries on stored UML diagrams.
+
+Each diagram gets a grid index of its nodes (app.core.spatial) plus a map
+from node id to the relationships touching it. A viewport request returns
+the nodes intersecting the box and the relationships touching those nodes,
+without walking the whole document.
+
+Indexes are cached per diagram in a small LRU and tagged with the revision
+they were built from. Writes keep them current:
+- a PATCH that only changes fields of existing nodes re-files just the
+  nodes whose x/y/w/h changed
+- any other change swaps in the new document and re-files only the nodes
+  whose boxes differ; relationships are re-mapped only if they changed
+
+A request that finds an older revision (another worker wrote) syncs the
+same way before answering.
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.spatial import Box, GridIndex
+
+metrics.define_rate("uml_viewport.index_hit_rate", "uml_viewport.index_hits", "uml_viewport.index_builds")
+
+_GEOMETRY = ("x", "y", "w", "h")
+# Patch paths that edit one field of an existing node, e.g. /nodes/12/x
+_NODE_FIELD = re.compile(r"^/nodes/(\d+)/([^/]+)$")
+
+
+def _box(node: Dict[str, Any]) -> Optional[Box]:
+    try:
+        box = tuple(float(node[k]) for k in _GEOMETRY)
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return None  # not placed yet; invisible to viewport queries
+    return box if all(math.isfinite(v) for v in box) else None  # type: ignore[return-value]
+
+
+class DiagramIndex:
+    def __init__(self, document: Dict[str, Any], revision: int, cell_size: float) -> None:
+        self.grid = GridIndex(cell_size)
+        self.nodes: List[Dict[str, Any]] = []
+        self.relationships: List[Dict[str, Any]] = []
+        self._touching: Dict[str, List[int]] = {}
+        self.revision = revision
+        self.sync(document, revision)
+
+    def _map_relationships(self) -> None:
+        touching: Dict[str, List[int]] = {}
+        for i, rel in enumerate(self.relationships):
+            for end in {str(rel.get("source")), str(rel.get("to"))}:
+                touching.setdefault(end, []).append(i)
+        self._touching = touching
+
+    def _refile(self, i: int) -> None:
+        box = _box(self.nodes[i])
+        if box is None:
+            self.grid.remove(i)
+        else:
+            self.grid.insert(i, box)  # no-op when the box is unchanged
+
+    def sync(self, document: Dict[str, Any], revision: int) -> None:
+        """Catch up with `document`, re-filing only nodes whose boxes changed."""
+        nodes = list(document.get("nodes") or [])
+        relationships = list(document.get("relationships") or [])
+        for stale in range(len(nodes), len(self.nodes)):
+            self.grid.remove(stale)
+        relationships_changed = relationships != self.relationships or [n.get("id") for n in nodes] != [
+            n.get("id") for n in self.nodes
+        ]
+        self.nodes, self.relationships, self.revision = nodes, relationships, revision
+        for i in range(len(nodes)):
+            self._refile(i)
+        if relationships_changed:
+            self._map_relationships()
+
+    def apply_patch(self, operations: Sequence[Dict[str, Any]], document: Dict[str, Any], revision: int) -> None:
+        """Follow a patch that produced `document`; cheap when it only edits fields of existing nodes."""
+        touched: Set[int] = set()
+        for op in operations:
+            if op.get("op") == "test":
+                continue
+            match = _NODE_FIELD.match(op.get("path", ""))
+            if op.get("op") not in ("replace", "add", "remove") or match is None or match.group(2) == "id":
+                self.sync(document, revision)  # structural change: diff the whole document
+                return
+            touched.add(int(match.group(1)))
+        self.nodes = list(document.get("nodes") or [])
+        self.revision = revision
+        for i in touched:
+            if i < len(self.nodes):
+                self._refile(i)
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Nodes intersecting the box (document order) and the relationships touching them."""
+        visible = sorted(self.grid.query(x0, y0, x1, y1))
+        edges: Set[int] = set()
+        for i in visible:
+            edges.update(self._touching.get(str(self.nodes[i].get("id")), ()))
+        return [self.nodes[i] for i in visible], [self.relationships[i] for i in sorted(edges)]
+
+
+class DiagramIndexCache:
+    """Per-diagram indexes, tagged with the revision they reflect."""
+
+    def __init__(self, max_diagrams: int = 32, cell_size: float = 256.0) -> None:
+        self.max_diagrams = max_diagrams
+        self.cell_size = cell_size
+        self._entries: "OrderedDict[int, DiagramIndex]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, uml_id: int, revision: int, load_document) -> DiagramIndex:
+        """The index at `revision`; `load_document()` is only called when it has to be built or synced."""
+        with self._lock:
+            index = self._entries.get(uml_id)
+            if index is not None and index.revision == revision:
+                self._entries.move_to_end(uml_id)
+                metrics.incr("uml_viewport.index_hits")
+                return index
+            document = load_document()
+            if index is None:
+                index = DiagramIndex(document, revision, self.cell_size)
+                metrics.incr("uml_viewport.index_builds")
+            else:
+                index.sync(document, revision)
+                metrics.incr("uml_viewport.index_syncs")
+            self._store(uml_id, index)
+            return index
+
+    def query(self, uml_id: int, revision: int, load_document, box: Box):
+        """`DiagramIndex.query` on the index at `revision`, under the cache lock so writes can't interleave."""
+        x, y, w, h = box
+        with self._lock:
+            return self.get(uml_id, revision, load_document).query(x, y, x + w, y + h)
+
+    def patched(self, uml_id: int, base_revision: int, revision: int, operations, document: Dict[str, Any]) -> None:
+        with self._lock:
+            index = self._entries.get(uml_id)
+            if index is None:
+                return
+            if index.revision == base_revision:
+                index.apply_patch(operations, document, revision)
+            else:
+                index.sync(document, revision)
+
+    def replaced(self, uml_id: int, revision: int, document: Dict[str, Any]) -> None:
+        with self._lock:
+            index = self._entries.get(uml_id)
+            if index is not None:
+                index.sync(document, revision)
+
+    def discard(self, uml_id: int) -> None:
+        with self._lock:
+            self._entries.pop(uml_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, uml_id: int, index: DiagramIndex) -> None:
+        self._entries[uml_id] = index
+        self._entries.move_to_end(uml_id)
+        while len(self._entries) > self.max_diagrams:
+            self._entries.popitem(last=False)
+
+
+diagram_indexes = DiagramIndexCache(
+    max_diagrams=settings.uml_viewport_max_diagrams,
+    cell_size=settings.uml_viewport_cell_size,
+)
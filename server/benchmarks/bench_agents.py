@@ -0,0 +1,169 @@
+"""End-to-end agent path benchmark on the fake LLM backend (app.core.fake_llm).
+
+Drives each LLM-backed route through the ASGI app with a SQLite database and
+no network. With the default zero latency the numbers are pure orchestration
+overhead: prompting, parsing, agent loop, DB and HTTP. Pass --ttft-ms and
+--tps to add a simulated model.
+
+Use --backend replay --cassette FILE to replay real traffic captured earlier
+(app.core.cassette). --replay-speed 1 keeps the recorded timing and 0 replays
+instantly. Record a cassette with --backend record --iterations 1 and a real
+API key. After a replay or record run the benchmark also prints prompt and
+response sizes per agent, to track prompt growth.
+
+/system-design persists to a JSONB column that SQLite cannot create, so that
+path is timed at the agent (systemDesignLLM.agenerate_system_design).
+
+    cd server && python -m benchmarks.bench_agents --iterations 50 --ttft-ms 300 --tps 80
+    cd server && python -m benchmarks.bench_agents --backend record --cassette cassettes/bench.json --iterations 1
+    cd server && python -m benchmarks.bench_agents --backend replay --cassette cassettes/bench.json --replay-speed 1
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def configure(args: argparse.Namespace) -> None:
+    # Must run before app modules are imported: settings are read at import time
+    db_path = Path(tempfile.mkdtemp()) / "bench.db"
+    os.environ["BMS_DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["BMS_LLM_BACKEND"] = args.backend
+    os.environ["BMS_LLM_RECORD_BACKEND"] = args.record_backend
+    os.environ["BMS_LLM_CASSETTE_PATH"] = args.cassette
+    os.environ["BMS_LLM_REPLAY_SPEED"] = str(args.replay_speed)
+    os.environ["BMS_FAKE_LLM_TTFT_MS"] = str(args.ttft_ms)
+    os.environ["BMS_FAKE_LLM_TOKENS_PER_SECOND"] = str(args.tps)
+    os.environ["BMS_RATE_LIMIT_ENABLED"] = "0"  # measure the agents, not the limiter
+
+
+async def run(args: argparse.Namespace) -> None:
+    import httpx
+
+    from app.agents import systemDesignLLM
+    from app.core import db as core_db
+    from app.core import security
+    from app.main import app
+    from app.models.feature import Feature
+    from app.models.job import Job
+    from app.models.milestone import Milestone
+    from app.models.milestoneplan import MilestonePlan
+    from app.models.project import Project
+    from app.models.roadmap import Roadmap
+    from app.models.taskassignment import TaskAssignment
+    from app.models.taskplan import TaskPlan
+    from app.models.tech_stack import TechStack
+
+    tables = [Project, Milestone, Feature, TaskAssignment, TechStack, Roadmap, MilestonePlan, TaskPlan, Job]
+    core_db.Base.metadata.create_all(bind=core_db.engine, tables=[m.__table__ for m in tables])
+    with core_db.SessionLocal() as db:
+        project = Project(name="Bench", description="benchmark project", owner_id=None)
+        db.add(project)
+        db.commit()
+        db.add_all([
+            Feature(project_id=project.id, name="Login", status="done", milestone_id=None),
+            Feature(project_id=project.id, name="Invoices", status="todo", milestone_id=None),
+        ])
+        db.commit()
+        project_id = project.id
+
+    class BenchUser:
+        id = 1
+
+    app.dependency_overrides[security.get_current_user] = lambda: BenchUser()
+    requirements = "User login\nBilling with invoices\nUsage reports\nAdmin dashboard"
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def post(path: str, body: dict) -> None:
+            # Bypass the response cache so every iteration reaches the model
+            r = await client.post(path, json=body, headers={"X-Cache-Bypass": "1"})
+            r.raise_for_status()
+
+        paths: Dict[str, Callable[[], Awaitable[None]]] = {
+            "POST /roadmap": lambda: post("/roadmap", {"requirements": requirements, "tech_stack": "FastAPI", "content": ""}),
+            "POST /plan": lambda: post("/plan", {"requirements": requirements, "tech_stack": "FastAPI", "content": ""}),
+            "POST /chat/agent_query": lambda: post("/chat/agent_query", {"query": "could you look into task 21 for me"}),
+            "POST /features/breakdown": lambda: post("/features/breakdown", {"feature_description": "Password reset"}),
+            "POST /features/analyze-dependencies": lambda: post(
+                "/features/analyze-dependencies", {"project_id": project_id, "new_feature": "Email invoices"}
+            ),
+            "agent system design": lambda: systemDesignLLM.agenerate_system_design(
+                features="Login, Billing, Reports", expected_users="10k MAU", geography="EU"
+            ),
+        }
+
+        if args.backend == "replay":
+            print(f"replaying {args.cassette} at speed {args.replay_speed or 'instant'}, ", end="")
+        else:
+            print(f"fake LLM: ttft={args.ttft_ms} ms, {args.tps or 'unlimited'} tokens/s, ", end="")
+        print(f"{args.iterations} iterations x {args.concurrency} concurrent\n")
+        for label, call in paths.items():
+            await call()  # warm up
+            samples: List[float] = []
+
+            async def timed() -> None:
+                started = time.perf_counter()
+                await call()
+                samples.append((time.perf_counter() - started) * 1000)
+
+            for _ in range(args.iterations):
+                await asyncio.gather(*[timed() for _ in range(args.concurrency)])
+            samples.sort()
+            p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+            print(f"{label:<38} mean {statistics.mean(samples):8.2f} ms   "
+                  f"p50 {statistics.median(samples):8.2f} ms   p95 {p95:8.2f} ms")
+
+    if args.backend in ("record", "replay"):
+        print_prompt_sizes(args.cassette)
+
+
+def print_prompt_sizes(path: str) -> None:
+    """Prompt/response size per agent, keyed by the first line of its system prompt."""
+    from app.core.cassette import get_cassette
+    from app.core.fake_llm import estimate_tokens
+
+    sizes: Dict[str, List[tuple]] = {}
+    for interaction in get_cassette(path).interactions:
+        messages = interaction["request"]["messages"]
+        system = next((m["content"] for m in messages if m["type"] == "system"), "(no system prompt)")
+        agent = str(system).strip().splitlines()[0][:48]
+        prompt = "".join(str(m["content"]) for m in messages) + json.dumps(interaction["request"]["tools"])
+        reply = interaction["response"]["message"]["data"]
+        response = str(reply["content"]) + json.dumps(reply.get("tool_calls", []))
+        sizes.setdefault(agent, []).append((estimate_tokens(prompt), estimate_tokens(response), interaction["response"]["ttft_ms"]))
+
+    print(f"\n{'agent (system prompt)':<50} {'calls':>5} {'prompt tok':>10} {'reply tok':>10} {'ttft ms':>8}")
+    for agent, rows in sizes.items():
+        prompt, reply, ttft = (statistics.mean(column) for column in zip(*rows))
+        print(f"{agent:<50} {len(rows):>5} {prompt:>10.0f} {reply:>10.0f} {ttft:>8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["fake", "record", "replay"], default="fake")
+    parser.add_argument("--record-backend", choices=["gemini", "fake"], default="gemini")
+    parser.add_argument("--cassette", default="cassettes/bench.json")
+    parser.add_argument("--replay-speed", type=float, default=0.0, help="replay timing factor (0 = instant, 1 = recorded)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--ttft-ms", type=float, default=0.0)
+    parser.add_argument("--tps", type=float, default=0.0, help="simulated tokens per second (0 = instant)")
+    args = parser.parse_args()
+    configure(args)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Chat request overhead with a stubbed LLM.
+
+Compares building the tool-calling agent per message (the old behaviour:
+fresh tool closures, create_tool_calling_agent and a verbose AgentExecutor)
+with the prebuilt executor from app.agents.chatAgentLLM. The stub model
+answers instantly, so the numbers are pure framework overhead.
+
+    cd server && python -m benchmarks.bench_chat_agent [iterations]
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+os.environ.setdefault("BMS_DATABASE_URL", "sqlite:///:memory:")
+
+from langchain.agents import AgentExecutor, create_tool_calling_agent  # noqa: E402
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+from langchain_core.tools import StructuredTool  # noqa: E402
+
+from app.agents import chatAgentLLM  # noqa: E402
+
+
+class StubChatModel(BaseChatModel):
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="done"))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self._generate(messages)
+
+
+def legacy_executor(llm) -> AgentExecutor:
+    # What every message used to pay for: new tools, new agent, verbose executor
+    tools = [StructuredTool.from_function(t.func, name=t.name, description=t.description) for t in chatAgentLLM.TOOLS]
+    agent = create_tool_calling_agent(llm, tools, chatAgentLLM.PROMPT)
+    return AgentExecutor(agent=agent, tools=tools, verbose=True, return_intermediate_steps=True)
+
+
+async def run(label: str, get_executor, iterations: int) -> None:
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        with chatAgentLLM.chat_context(1), contextlib.redirect_stdout(io.StringIO()):
+            await get_executor().ainvoke({"input": f"q{i}", "chat_history": []})
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<28} mean {statistics.mean(samples):7.2f} ms   p50 {statistics.median(samples):7.2f} ms   p95 {p95:7.2f} ms")
+
+
+async def main(iterations: int) -> None:
+    llm = StubChatModel()
+    chatAgentLLM.get_chat_model = lambda temperature=0.2: llm  # stub the registry for this process only
+
+    await run("per-message build (old)", lambda: legacy_executor(llm), iterations)
+    await run("prebuilt executor (new)", chatAgentLLM.get_agent_executor, iterations)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -24,6 +24,20 @@ from app.models.feature import Feature
 from app.models.taskassignment import TaskAssignment
 from app.models.tech_stack import TechStack
 from app.models.userproject import UserProject
+from app.models.roadmap import Roadmap
+from app.models.milestoneplan import MilestonePlan
+from app.models.taskplan import TaskPlan
+from app.models.job import Job
+from app.models.featuredependency import FeatureDependency
+from app.models.chatsession import ChatSession, ChatMessage
+from app.models.ratelimitbucket import RateLimitBucket
+from app.models.projectuml import ProjectUML
+from app.models.projectumlrevision import ProjectUMLRevision
+from app.core.cache import response_cache
+from app.core.jobs import job_queue
+from app.core.ratelimit import rate_limiter
+from app.core import llm as llm_registry
+from app.agents import chatAgentLLM
 
 
 @pytest.fixture(scope="session")
@@ -31,7 +45,7 @@ def test_engine(tmp_path_factory):
     # Use a file-based SQLite DB for persistence across connections
     db_path = tmp_path_factory.mktemp("data") / "test.db"
     engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
-    # Create only tables compatible with SQLite (skip models using PostgreSQL JSONB like User, ProjectUML)
+    # Create only tables compatible with SQLite (skip models using PostgreSQL JSONB like User)
     Base.metadata.create_all(bind=engine, tables=[
         Project.__table__,
         Milestone.__table__,
@@ -39,11 +53,37 @@ def test_engine(tmp_path_factory):
         TaskAssignment.__table__,
         TechStack.__table__,
         UserProject.__table__,
+        Roadmap.__table__,
+        MilestonePlan.__table__,
+        TaskPlan.__table__,
+        Job.__table__,
+        FeatureDependency.__table__,
+        ChatSession.__table__,
+        ChatMessage.__table__,
+        RateLimitBucket.__table__,
+        ProjectUML.__table__,
+        ProjectUMLRevision.__table__,
     ])
     yield engine
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    # Generated documents must not leak between tests through the in-memory tier
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    # Buckets are per process; every test starts with full quotas
+    rate_limiter.reset()
+    yield
+    rate_limiter.reset()
+
+
 @pytest.fixture()
 def db_session(test_engine):
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
@@ -55,7 +95,7 @@ def db_session(test_engine):
 
 
 @pytest.fixture()
-def client(db_session):
+def client(db_session, test_engine):
     # Override get_db to use the test session
     def override_get_db():
         try:
@@ -64,11 +104,15 @@ def client(db_session):
             pass
 
     app.dependency_overrides[core_db.get_db] = override_get_db
+    # Job workers open their own sessions
+    original_session_factory = job_queue.session_factory
+    job_queue.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
     with TestClient(app) as c:
         yield c
 
     app.dependency_overrides.clear()
+    job_queue.session_factory = original_session_factory
 
 
 @pytest.fixture()
@@ -82,3 +126,17 @@ def test_user():
             self.email = "test@example.com"
             self.role = "user"
     return _User()
+
+
+@pytest.fixture()
+def fake_backend(monkeypatch):
+    # Offline LLM (app.core.fake_llm); fresh clients so no real model is cached across tests
+    settings = llm_registry.get_settings()
+    monkeypatch.setattr(settings, "llm_backend", "fake")
+    monkeypatch.delenv("API_KEY", raising=False)
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    llm_registry.clear_chat_models()
+    chatAgentLLM.clear_agent_executor()
+    yield settings
+    llm_registry.clear_chat_models()
+    chatAgentLLM.clear_agent_executor()
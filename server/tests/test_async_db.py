@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from sqlalchemy.engine import make_url
+
+from app.main import app
+from app.core import db as core_db
+from app.core.config import settings
+from app.models.feature import Feature
+from app.models.milestone import Milestone
+from app.models.project import Project
+from app.models.taskassignment import TaskAssignment
+from app.routes.user import get_current_user
+
+
+def test_async_database_url_swaps_in_the_async_driver():
+    assert core_db.async_database_url("postgresql+psycopg2://u:secret@db:5432/pm") == "postgresql+asyncpg://u:secret@db:5432/pm"
+    assert core_db.async_database_url("postgresql://u@db/pm") == "postgresql+asyncpg://u@db/pm"
+    assert core_db.async_database_url("sqlite:///./local.db") == "sqlite+aiosqlite:///./local.db"
+    with pytest.raises(ValueError):
+        core_db.async_database_url("mysql+pymysql://u@db/pm")
+
+
+def test_default_postgres_url_builds_an_asyncpg_engine(monkeypatch):
+    default = type(settings).model_fields["database_url"].default
+    monkeypatch.setattr(settings, "database_url", default)
+    monkeypatch.setattr(settings, "async_database_url", None)
+    asyncio.run(core_db.dispose_async_engine())
+    try:
+        engine = core_db.get_async_engine()  # no connection is opened until first use
+        assert engine.url.drivername == "postgresql+asyncpg"
+        assert engine.dialect.driver == "asyncpg"
+        assert (engine.url.host, engine.url.database) == (make_url(default).host, make_url(default).database)
+        assert engine.pool._pre_ping
+    finally:
+        asyncio.run(core_db.dispose_async_engine())
+
+
+@pytest.fixture()
+def seeded(db_session):
+    project = Project(name="AsyncProj", description="desc", owner_id=1)
+    db_session.add(project)
+    db_session.flush()
+    milestone = Milestone(project_id=project.id, name="M1", done=False, progress=0)
+    db_session.add(milestone)
+    db_session.flush()
+    feature = Feature(project_id=project.id, milestone_id=milestone.id, name="Login", status="todo")
+    db_session.add(feature)
+    db_session.flush()
+    db_session.add(TaskAssignment(user_id=1, project_id=project.id, feature_id=feature.id, description="Build login form"))
+    db_session.commit()
+    yield project, feature
+
+
+@pytest.fixture()
+def async_mode(client, test_engine, monkeypatch):
+    # The real lazily created async engine (aiosqlite) on the test database file
+    monkeypatch.setattr(settings, "async_database_url", f"sqlite+aiosqlite:///{test_engine.url.database}")
+    app.dependency_overrides[core_db.get_read_db] = core_db.get_async_db
+    yield
+    app.dependency_overrides.pop(core_db.get_read_db, None)
+
+
+def _read_routes(client, project, feature):
+    app.dependency_overrides[get_current_user] = lambda: type("U", (), {"id": 1})()
+    try:
+        one = client.get(f"/features/{feature.id}")
+        assert one.status_code == 200
+        assert one.json()["name"] == "Login"
+        assert client.get("/features/999999").status_code == 404
+
+        by_project = client.get(f"/features/project/{project.id}")
+        assert [f["id"] for f in by_project.json()] == [feature.id]
+
+        mine = client.get("/task-assignments/my")
+        assert mine.status_code == 200
+        assert "Build login form" in [t["description"] for t in mine.json()]
+
+        public = client.get("/projects/all/public")
+        assert project.id in [p["id"] for p in public.json()]
+        owned = client.get("/projects/get")  # anonymous: owner 1
+        assert project.id in [p["id"] for p in owned.json()]
+        assert client.get(f"/projects/{project.id}").status_code == 401
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_read_routes_on_the_threadpool_session(client, seeded):
+    _read_routes(client, *seeded)
+
+
+def test_read_routes_on_an_async_session(async_mode, client, seeded):
+    _read_routes(client, *seeded)
+    assert core_db._async_engine is not None
+    assert core_db._async_engine.url.drivername == "sqlite+aiosqlite"
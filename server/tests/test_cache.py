@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+
+from sqlalchemy import event
+
+from app.core.cache import ResponseCache, make_cache_key
+from app.core.metrics import metrics
+from app.models.milestoneplan import MilestonePlan
+from app.models.roadmap import Roadmap
+from app.models.taskplan import TaskPlan
+
+
+ROADMAP_PAYLOAD = {
+    "requirements": "cache reqs",
+    "tech_stack": "cache stack",
+    "best_practices": "bp",
+    "temperature": 0.2,
+    "content": "unused",
+}
+
+
+def test_roadmap_regenerate_is_served_from_cache(client, monkeypatch):
+    calls = []
+
+    async def fake_generate_roadmap(requirements, tech_stack, best_practices, temperature):
+        calls.append(requirements)
+        return f"ROADMAP-{len(calls)}"
+
+    monkeypatch.setattr("app.agents.roadmapLLM.agenerate_roadmap", fake_generate_roadmap)
+
+    r1 = client.post("/roadmap", json=ROADMAP_PAYLOAD)
+    r2 = client.post("/roadmap", json=ROADMAP_PAYLOAD)
+    assert r1.json() == r2.json() == {"roadmap": "ROADMAP-1"}
+    assert r1.headers["X-Cache"] == "MISS"
+    assert r2.headers["X-Cache"] == "HIT"
+    assert len(calls) == 1
+
+    # Bypass header forces a fresh generation (and refreshes the cache)
+    r3 = client.post("/roadmap", json=ROADMAP_PAYLOAD, headers={"Cache-Control": "no-cache"})
+    assert r3.headers["X-Cache"] == "BYPASS"
+    assert r3.json() == {"roadmap": "ROADMAP-2"}
+
+    counters = client.get("/metrics").json()["counters"]
+    assert counters["llm_cache.hits.memory"] >= 1
+    assert counters["llm_cache.bypass"] >= 1
+
+
+def test_persistent_tier_survives_memory_eviction(client, db_session, monkeypatch):
+    calls = []
+
+    async def fake_generate_roadmap(requirements, tech_stack, best_practices, temperature):
+        calls.append(requirements)
+        return "PERSISTED"
+
+    monkeypatch.setattr("app.agents.roadmapLLM.agenerate_roadmap", fake_generate_roadmap)
+    payload = dict(ROADMAP_PAYLOAD, requirements="persisted reqs")
+
+    assert client.post("/roadmap", json=payload).headers["X-Cache"] == "MISS"
+    row = db_session.query(Roadmap).filter(Roadmap.requirements == "persisted reqs").one()
+    assert row.cache_key and row.content == "PERSISTED"
+
+    from app.core.cache import response_cache
+    response_cache.clear()  # simulate a restart / another worker
+
+    r = client.post("/roadmap", json=payload)
+    assert r.headers["X-Cache"] == "HIT"
+    assert len(calls) == 1
+
+
+def test_task_plans_are_persisted_apart_from_milestone_plans(client, db_session, monkeypatch):
+    async def fake_generate_tasks(milestones, tech_stack, temperature):
+        return "# Daily Task Plan"
+
+    monkeypatch.setattr("app.agents.tasksLLM.agenerate_tasks", fake_generate_tasks)
+    payload = {"milestones": "task plan milestones", "tech_stack": "ts", "temperature": 0.2, "content": "unused"}
+
+    assert client.post("/tasks", json=payload).headers["X-Cache"] == "MISS"
+    row = db_session.query(TaskPlan).filter(TaskPlan.milestones == "task plan milestones").one()
+    assert row.cache_key and row.content == "# Daily Task Plan"
+    assert db_session.query(MilestonePlan).filter(MilestonePlan.requirements == "task plan milestones").count() == 0
+
+
+def test_persistent_tier_runs_off_the_event_loop(db_session):
+    cache = ResponseCache()
+    engine = db_session.get_bind()
+    threads = []
+    listener = lambda *args: threads.append(threading.get_ident())
+    event.listen(engine, "before_cursor_execute", listener)
+
+    async def generate():
+        return "OFF-LOOP"
+
+    async def run():
+        loop_thread = threading.get_ident()
+        first = await cache.get_or_generate("roadmap", "off-loop-key", generate, db=db_session,
+                                            columns={"requirements": "r", "tech_stack": "t"})
+        cache.clear()
+        second = await cache.get_or_generate("roadmap", "off-loop-key", generate, db=db_session)
+        return loop_thread, first, second
+
+    try:
+        loop_thread, first, second = asyncio.run(run())
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert (first, second) == (("OFF-LOOP", "MISS"), ("OFF-LOOP", "HIT"))
+    assert threads and loop_thread not in threads
+
+
+def test_key_covers_agent_version_inputs_temperature_and_model():
+    base = make_cache_key("roadmap", "1", {"a": 1}, 0.2, "m")
+    assert base == make_cache_key("roadmap", "1", {"a": 1}, 0.2, "m")
+    assert base != make_cache_key("milestones", "1", {"a": 1}, 0.2, "m")
+    assert base != make_cache_key("roadmap", "2", {"a": 1}, 0.2, "m")
+    assert base != make_cache_key("roadmap", "1", {"a": 2}, 0.2, "m")
+    assert base != make_cache_key("roadmap", "1", {"a": 1}, 0.3, "m")
+    assert base != make_cache_key("roadmap", "1", {"a": 1}, 0.2, "other")
+
+
+def test_memory_tier_lru_and_ttl():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    cache.store("x", "k1", "v1")
+    cache.store("x", "k2", "v2")
+    assert cache.lookup("x", "k1") == "v1"  # k1 is now most recently used
+    cache.store("x", "k3", "v3")
+    assert cache.lookup("x", "k2") is None  # evicted
+    assert cache.lookup("x", "k1") == "v1"
+
+    short = ResponseCache(max_entries=2, ttl_seconds=0.01)
+    short.store("x", "k", "v")
+    time.sleep(0.02)
+    before = metrics.get("llm_cache.expired")
+    assert short.lookup("x", "k") is None
+    assert metrics.get("llm_cache.expired") == before + 1
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.agents import chatAgentLLM, featureBreakdownLLM, roadmapLLM
+from app.core import llm as llm_registry
+from app.core.cassette import CASSETTE_VERSION, CassetteChatModel, CassetteMissError
+from app.core.fake_llm import FakeChatModel
+
+REQUIREMENTS = "User login\nBilling with invoices"
+
+
+@pytest.fixture()
+def cassette_backend(monkeypatch, tmp_path):
+    """Switch the registry between record (wrapping the fake backend) and replay."""
+    settings = llm_registry.get_settings()
+    monkeypatch.setattr(settings, "llm_record_backend", "fake")
+    monkeypatch.setattr(settings, "llm_cassette_path", str(tmp_path / "llm.json"))
+    monkeypatch.delenv("API_KEY", raising=False)
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+
+    def use(mode: str, speed: float = 0.0):
+        monkeypatch.setattr(settings, "llm_backend", mode)
+        monkeypatch.setattr(settings, "llm_replay_speed", speed)
+        llm_registry.clear_chat_models()  # reload the cassette from disk
+        chatAgentLLM.clear_agent_executor()
+
+    yield use
+    llm_registry.clear_chat_models()
+    chatAgentLLM.clear_agent_executor()
+
+
+def _fake_never_called(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("replay reached the backend")
+
+    monkeypatch.setattr(FakeChatModel, "reply", fail)
+
+
+def test_record_then_replay_offline(cassette_backend, monkeypatch, tmp_path):
+    cassette_backend("record")
+    assert isinstance(llm_registry.get_chat_model(0.2), CassetteChatModel)
+    recorded = roadmapLLM.generate_roadmap(REQUIREMENTS, "FastAPI")
+
+    data = json.loads((tmp_path / "llm.json").read_text())
+    assert data["version"] == CASSETTE_VERSION
+    [interaction] = data["interactions"]
+    assert interaction["request"]["messages"][0]["type"] == "system"
+    assert interaction["response"]["chunks"]
+
+    cassette_backend("replay")
+    _fake_never_called(monkeypatch)
+    assert roadmapLLM.generate_roadmap(REQUIREMENTS, "FastAPI") == recorded
+
+    async def stream():
+        return "".join([chunk async for chunk in roadmapLLM.astream_roadmap(REQUIREMENTS, "FastAPI")])
+
+    assert asyncio.run(stream()) == recorded
+
+
+def test_replay_structured_output_and_tool_calls(cassette_backend, monkeypatch):
+    cassette_backend("record")
+    breakdown = asyncio.run(featureBreakdownLLM.abreakdown_feature("Password reset"))
+    chat = asyncio.run(chatAgentLLM.achat_with_agent("can you check on task 21 for me", 5))
+
+    cassette_backend("replay")
+    _fake_never_called(monkeypatch)
+    assert asyncio.run(featureBreakdownLLM.abreakdown_feature("Password reset")) == breakdown
+    assert asyncio.run(chatAgentLLM.achat_with_agent("can you check on task 21 for me", 5)) == chat
+
+
+def test_replay_miss_raises(cassette_backend):
+    cassette_backend("record")
+    roadmapLLM.generate_roadmap(REQUIREMENTS, "FastAPI")
+
+    cassette_backend("replay")
+    with pytest.raises(CassetteMissError):
+        roadmapLLM.generate_roadmap(REQUIREMENTS, "Django")
+
+
+def test_replay_timing_can_be_accelerated(cassette_backend, monkeypatch):
+    monkeypatch.setattr(llm_registry.get_settings(), "fake_llm_ttft_ms", 150.0)
+    cassette_backend("record")
+    roadmapLLM.generate_roadmap(REQUIREMENTS, "FastAPI")
+
+    def timed() -> float:
+        started = time.perf_counter()
+        roadmapLLM.generate_roadmap(REQUIREMENTS, "FastAPI")
+        return time.perf_counter() - started
+
+    cassette_backend("replay", speed=1.0)
+    assert timed() >= 0.14
+    cassette_backend("replay", speed=10.0)
+    assert timed() < 0.1
+
+
+def test_unknown_cassette_version_is_rejected(cassette_backend, tmp_path):
+    (tmp_path / "llm.json").write_text(json.dumps({"version": CASSETTE_VERSION + 1, "interactions": []}))
+    cassette_backend("replay")
+    with pytest.raises(RuntimeError, match="re-record"):
+        llm_registry.get_chat_model(0.2)
@@ -1,4 +1,14 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
 from app.core import security
+from app.models.taskassignment import TaskAssignment
 
 def test_chat_agent_query(client, test_user, monkeypatch):
     # Override auth to return our test user
@@ -6,10 +16,10 @@ def test_chat_agent_query(client, test_user, monkeypatch):
     app.dependency_overrides[security.get_current_user] = lambda: test_user
 
     # Mock the LLM call
-    def fake_chat_with_agent(query, user_id):
+    async def fake_chat_with_agent(query, user_id):
         return {"output": f"echo:{query}", "tool_action": None}
 
-    monkeypatch.setattr("app.agents.chatAgentLLM.chat_with_agent", fake_chat_with_agent)
+    monkeypatch.setattr("app.agents.chatAgentLLM.achat_with_agent", fake_chat_with_agent)
 
     resp = client.post("/chat/agent_query", json={"query": "hello"})
     assert resp.status_code == 200
@@ -19,3 +29,196 @@ def test_chat_agent_query(client, test_user, monkeypatch):
 
     # cleanup
     app.dependency_overrides.pop(security.get_current_user, None)
+
+
+def test_concurrent_chat_queries_do_not_serialize(test_user, monkeypatch):
+    from app.main import app
+
+    delay = 0.3
+
+    class SlowChatModel(BaseChatModel):
+        """Stands in for Gemini: answers after `delay` seconds without calling tools."""
+
+        @property
+        def _llm_type(self) -> str:
+            return "slow-fake"
+
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            time.sleep(delay)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content="done"))])
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            await asyncio.sleep(delay)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content="done"))])
+
+    monkeypatch.setattr("app.agents.chatAgentLLM.get_chat_model", lambda temperature=0.2: SlowChatModel())
+    app.dependency_overrides[security.get_current_user] = lambda: test_user
+
+    async def fire(n):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*[ac.post("/chat/agent_query", json={"query": f"q{i}"}) for i in range(n)])
+
+    n = 5
+    started = time.perf_counter()
+    responses = asyncio.run(fire(n))
+    elapsed = time.perf_counter() - started
+
+    app.dependency_overrides.pop(security.get_current_user, None)
+
+    assert all(r.status_code == 200 and r.json()["response"] == "done" for r in responses)
+    # Serialized calls would take n * delay; overlapped ones finish in about one delay
+    assert elapsed < 2 * delay, f"{n} chats took {elapsed:.2f}s"
+
+
+class ToolCallingChatModel(BaseChatModel):
+    """Calls show_task_status once, then answers with the tool's output."""
+
+    delay: float = 0.05
+
+    @property
+    def _llm_type(self) -> str:
+        return "tool-calling-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _reply(self, messages):
+        last = messages[-1]
+        if last.type == "tool":
+            message = AIMessage(content=last.content)
+        else:
+            message = AIMessage(
+                content="",
+                tool_calls=[{"name": "show_task_status", "args": {"task_id": 21}, "id": "call-1"}],
+            )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        return self._reply(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self._reply(messages)
+
+
+def test_agent_is_built_once_and_binds_user_per_request(monkeypatch):
+    from app.agents import chatAgentLLM
+
+    llm = ToolCallingChatModel()
+    builds = []
+    original_build = chatAgentLLM._build_agent_executor
+    monkeypatch.setattr("app.agents.chatAgentLLM.get_chat_model", lambda temperature=0.2: llm)
+    monkeypatch.setattr(
+        "app.agents.chatAgentLLM._build_agent_executor",
+        lambda model: builds.append(model) or original_build(model),
+    )
+    chatAgentLLM.clear_agent_executor()
+
+    async def chat_as_users():
+        # Interleaved requests for different users share one executor
+        return await asyncio.gather(*[chatAgentLLM.achat_with_agent("status of 21?", user_id) for user_id in (1, 2, 3)])
+
+    results = asyncio.run(chat_as_users())
+    chatAgentLLM.clear_agent_executor()
+
+    assert len(builds) == 1
+    assert [r["output"] for r in results] == [f"Show status for task 21 for user {u}" for u in (1, 2, 3)]
+    assert [r["tool_action"]["user_id"] for r in results] == [1, 2, 3]
+
+
+def test_chat_tools_require_a_bound_user():
+    from app.agents import chatAgentLLM
+
+    with pytest.raises(RuntimeError):
+        chatAgentLLM.show_task_status.func(task_id=1)
+    with chatAgentLLM.chat_context(7):
+        assert chatAgentLLM.show_task_status.func(task_id=1) == "Show status for task 1 for user 7"
+
+
+def _feature(db_session):
+    from app.models.feature import Feature
+    from app.models.project import Project
+
+    project = Project(name="ToolProj", description="desc", owner_id=None)
+    db_session.add(project)
+    db_session.commit()
+    feature = Feature(project_id=project.id, name="Tools", status="todo")
+    db_session.add(feature)
+    db_session.commit()
+    return feature
+
+
+def test_task_listing_is_paged_with_counts(db_session):
+    from app.agents.tasksLLM import list_tasks_for_user
+
+    user_id = 4242
+    feature = _feature(db_session)
+    db_session.add_all(
+        [TaskAssignment(description=f"Task {i} " + "x" * 300, project_id=feature.project_id, feature_id=feature.id,
+                        user_id=user_id, status="todo" if i % 3 else "in progress")
+         for i in range(25)]
+    )
+    db_session.commit()
+
+    first = list_tasks_for_user(db_session, user_id, limit=10)
+    lines = first.splitlines()
+    assert lines[0] == "Tasks: 25 total (16 todo, 9 in progress)."
+    assert len([line for line in lines if line.startswith("- Task ID")]) == 10
+    assert all(len(line) < 300 for line in lines)  # descriptions are shortened
+    assert lines[-1] == "Showing 1-10 of 25; call again with offset=10 for more."
+
+    last = list_tasks_for_user(db_session, user_id, limit=10, offset=20)
+    assert len([line for line in last.splitlines() if line.startswith("- Task ID")]) == 5
+    assert "call again" not in last
+    assert "No tasks at offset 40" in list_tasks_for_user(db_session, user_id, limit=10, offset=40)
+
+
+class ListingChatModel(ToolCallingChatModel):
+    """Lists tasks twice, creates one, lists again, then answers with the last tool output."""
+
+    calls: list = [
+        ("get_tasks_for_agent", {}),
+        ("get_tasks_for_agent", {}),
+        ("create_task_for_agent", {"description": "Write docs", "project_id": 1, "user_id": 4343}),
+        ("get_tasks_for_agent", {}),
+    ]
+
+    def _reply(self, messages):
+        done = sum(1 for m in messages if m.type == "tool")
+        if done == len(self.calls):
+            message = AIMessage(content=messages[-1].content)
+        else:
+            name, args = self.calls[done]
+            message = AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call-{done}"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def test_agent_turn_shares_one_session_and_caches_reads(db_session, test_engine, monkeypatch):
+    from sqlalchemy.orm import sessionmaker
+
+    from app.agents import chatAgentLLM
+    from app.core.metrics import metrics
+
+    feature = _feature(db_session)
+    db_session.add(TaskAssignment(description="Review", project_id=feature.project_id, feature_id=feature.id, user_id=4343, status="todo"))
+    db_session.commit()
+
+    opened = []
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    monkeypatch.setattr("app.agents.chatAgentLLM.SessionLocal", lambda: opened.append(1) or factory())
+    monkeypatch.setattr("app.agents.chatAgentLLM.get_chat_model", lambda temperature=0.2: ListingChatModel(delay=0))
+    chatAgentLLM.clear_agent_executor()
+    cached, fetched = metrics.get("chat.tool_reads.cached"), metrics.get("chat.tool_reads.fetched")
+
+    result = asyncio.run(chatAgentLLM.achat_with_agent("what are my tasks?", 4343))
+    chatAgentLLM.clear_agent_executor()
+
+    assert len(opened) == 1
+    assert metrics.get("chat.tool_reads.cached") - cached == 1  # the repeated listing
+    assert metrics.get("chat.tool_reads.fetched") - fetched == 2  # first listing, and the one after the write
+    assert result["output"].startswith("Tasks: 1 total (1 todo).")  # the session survived the failed write
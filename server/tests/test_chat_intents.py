@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+
+from app.agents.chatIntents import GRAMMAR
+from app.core import security
+from app.core.metrics import metrics
+from app.models.feature import Feature
+from app.models.project import Project
+from app.models.taskassignment import TaskAssignment
+
+
+@pytest.mark.parametrize("query, name, params", [
+    ("status of task 21", "show_task_status", {"task_id": "21"}),
+    ("What is the status of task 21?", "show_task_status", {"task_id": "21"}),
+    ("give me status of task id 21", "show_task_status", {"task_id": "21"}),
+    ("Can you show me task #7 status please", "show_task_status", {"task_id": "7"}),
+    ("how is task 3 going", "show_task_status", {"task_id": "3"}),
+    ("show my todo tasks", "get_tasks_for_agent", {"status": "todo"}),
+    ("What are my tasks?", "get_tasks_for_agent", {}),
+    ("list my tasks that are completed", "get_tasks_for_agent", {"status": "completed"}),
+    ("my in progress tasks", "get_tasks_for_agent", {"status": "in progress"}),
+])
+def test_grammar_recognises_simple_commands(query, name, params):
+    intent = GRAMMAR.classify(query)
+    assert intent is not None
+    assert (intent.name, intent.params) == (name, params)
+
+
+@pytest.mark.parametrize("query", [
+    "hello",
+    "create a task for the login page",
+    "assign task 21 to Priya",
+    "what is the status of task 21 and task 22",
+    "why is task 21 blocked",
+    "summarise the risks in this project",
+])
+def test_grammar_falls_through_on_anything_else(query):
+    assert GRAMMAR.classify(query) is None
+
+
+@pytest.fixture()
+def chat_user(client, test_user):
+    from app.main import app
+    app.dependency_overrides[security.get_current_user] = lambda: test_user
+    yield test_user
+    app.dependency_overrides.pop(security.get_current_user, None)
+
+
+@pytest.fixture()
+def user_tasks(db_session, chat_user):
+    p = Project(name="IntentProj", description="desc", owner_id=None)
+    db_session.add(p)
+    db_session.commit()
+    f = Feature(project_id=p.id, name="Login", status="todo", milestone_id=None)
+    db_session.add(f)
+    db_session.commit()
+    tasks = [
+        TaskAssignment(user_id=chat_user.id, project_id=p.id, feature_id=f.id, description="Build form", status="todo"),
+        TaskAssignment(user_id=chat_user.id, project_id=p.id, feature_id=f.id, description="Ship it", status="done"),
+    ]
+    db_session.add_all(tasks)
+    db_session.commit()
+    return tasks
+
+
+def _agent_must_not_run(monkeypatch):
+    async def fail(*args, **kwargs):
+        raise AssertionError("fast path should have answered without the LLM")
+
+    monkeypatch.setattr("app.agents.chatAgentLLM.achat_with_agent", fail)
+
+
+def test_task_status_is_answered_without_llm(client, user_tasks, monkeypatch):
+    _agent_must_not_run(monkeypatch)
+    task = user_tasks[0]
+
+    data = client.post("/chat/agent_query", json={"query": f"what's the status of task {task.id}?"}).json()
+    assert data["response"] == f"Task {task.id} is todo."
+    assert data["tool_action"] == {"type": "show_task_status", "task_id": task.id, "user_id": 1}
+
+
+def test_task_status_of_another_users_task_is_not_found(client, db_session, user_tasks, monkeypatch):
+    _agent_must_not_run(monkeypatch)
+    mine = user_tasks[0]
+    theirs = TaskAssignment(user_id=mine.user_id + 1, assigned_by=mine.user_id + 2, project_id=mine.project_id,
+                            feature_id=mine.feature_id, description="Private", status="in progress")
+    db_session.add(theirs)
+    db_session.commit()
+
+    data = client.post("/chat/agent_query", json={"query": f"status of task {theirs.id}"}).json()
+    assert data["response"] == f"I couldn't find task {theirs.id}."
+    assert data["tool_action"] is None
+
+
+def test_task_listing_is_answered_without_llm(client, user_tasks, monkeypatch):
+    _agent_must_not_run(monkeypatch)
+
+    data = client.post("/chat/agent_query", json={"query": "show my done tasks"}).json()
+    assert "Ship it" in data["response"]
+    assert "Build form" not in data["response"]
+    assert data["tool_action"] is None
+
+
+def test_ambiguous_query_falls_through_and_hit_rate_is_reported(client, chat_user, monkeypatch):
+    metrics.reset()
+
+    async def fake_chat_with_agent(query, user_id):
+        return {"output": f"agent:{query}", "tool_action": None}
+
+    monkeypatch.setattr("app.agents.chatAgentLLM.achat_with_agent", fake_chat_with_agent)
+
+    data = client.post("/chat/agent_query", json={"query": "create a task to fix task 21"}).json()
+    assert data["response"] == "agent:create a task to fix task 21"
+    client.post("/chat/agent_query", json={"query": "status of task 999999"})
+
+    body = client.get("/metrics").json()
+    assert body["counters"]["chat.fast_path.hits"] == 1
+    assert body["counters"]["chat.fast_path.misses"] == 1
+    assert body["rates"]["chat.fast_path.hit_rate"] == 0.5
+
+
+def test_fast_path_queries_run_off_the_event_loop(client, test_engine, user_tasks, monkeypatch):
+    _agent_must_not_run(monkeypatch)
+    on_loop = []
+
+    def listener(*args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:  # a threadpool worker
+            on_loop.append(False)
+
+    event.listen(test_engine, "before_cursor_execute", listener)
+    try:
+        data = client.post("/chat/agent_query", json={"query": f"status of task {user_tasks[0].id}"}).json()
+    finally:
+        event.remove(test_engine, "before_cursor_execute", listener)
+
+    assert data["response"] == f"Task {user_tasks[0].id} is todo."
+    assert on_loop and not any(on_loop)
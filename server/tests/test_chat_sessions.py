@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from sqlalchemy import event
+
+from app.core import security
+from app.core.config import settings
+from app.models.chatsession import ChatSession
+from app.useage import chat_service
+
+
+@pytest.fixture()
+def chat_client(client, test_user, monkeypatch):
+    from app.main import app
+    app.dependency_overrides[security.get_current_user] = lambda: test_user
+    monkeypatch.setattr(settings, "chat_history_turns", 2)
+    monkeypatch.setattr(settings, "chat_summary_batch_turns", 2)
+
+    histories = []
+
+    async def fake_chat_with_agent(query, user_id, chat_history=None):
+        histories.append(list(chat_history or []))
+        return {"output": f"echo:{query}", "tool_action": None}
+
+    async def fake_summarize(summary, turns, *, max_words=200, temperature=0.0):
+        return ((summary or "") + " | " + ";".join(m.content for m in turns)).strip(" |")
+
+    monkeypatch.setattr("app.agents.chatAgentLLM.achat_with_agent", fake_chat_with_agent)
+    monkeypatch.setattr("app.agents.chatSummaryLLM.asummarize_chat", fake_summarize)
+    client.histories = histories
+    yield client
+    app.dependency_overrides.pop(security.get_current_user, None)
+
+
+def _wait_for_summary(db_session, session_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db_session.expire_all()
+        session = db_session.get(ChatSession, session_id)
+        if session.summary_job_id is None and session.summary:
+            return session
+        time.sleep(0.02)
+    raise AssertionError("summary job never finished")
+
+
+def test_session_keeps_history_and_summarizes_older_turns(chat_client, db_session):
+    session_id = chat_client.post("/chat/sessions", json={}).json()["id"]
+
+    for i in range(4):
+        resp = chat_client.post("/chat/agent_query", json={"query": f"q{i}", "session_id": session_id})
+        assert resp.status_code == 200
+        assert resp.json() == {"response": f"echo:q{i}", "tool_action": None, "session_id": session_id}
+
+    # The agent sees the earlier turns of the session, oldest first
+    assert chat_client.histories[0] == []
+    assert [m.content for m in chat_client.histories[3]] == ["q0", "echo:q0", "q1", "echo:q1", "q2", "echo:q2"]
+    assert isinstance(chat_client.histories[3][0], HumanMessage)
+    assert isinstance(chat_client.histories[3][1], AIMessage)
+
+    # 4 turns with a window of 2 leaves 2 turns to fold: a summary job ran in the background
+    session = _wait_for_summary(db_session, session_id)
+    assert session.summary == "q0;echo:q0;q1;echo:q1"
+
+    chat_client.post("/chat/agent_query", json={"query": "q4", "session_id": session_id})
+    history = chat_client.histories[4]
+    assert isinstance(history[0], SystemMessage) and "q0;echo:q0;q1;echo:q1" in history[0].content
+    assert [m.content for m in history[1:]] == ["q2", "echo:q2", "q3", "echo:q3"]
+
+    detail = chat_client.get(f"/chat/sessions/{session_id}", params={"limit": 4}).json()
+    assert detail["title"] == "q0"
+    assert [m["content"] for m in detail["messages"]] == ["q3", "echo:q3", "q4", "echo:q4"]
+
+
+def test_history_is_capped_while_summary_is_pending(db_session, test_user, monkeypatch):
+    monkeypatch.setattr(settings, "chat_history_turns", 2)
+    monkeypatch.setattr(settings, "chat_summary_batch_turns", 1)
+    session = chat_service.create_session(db_session, test_user.id)
+    for i in range(10):
+        db_session.add_all([
+            chat_service.ChatMessage(session_id=session.id, role="user", content=f"q{i}"),
+            chat_service.ChatMessage(session_id=session.id, role="assistant", content=f"a{i}"),
+        ])
+    db_session.commit()
+
+    history = chat_service.build_history(db_session, session)
+    assert [m.content for m in history] == ["q7", "a7", "q8", "a8", "q9", "a9"]
+
+
+def test_sessions_are_private_to_their_owner(chat_client, db_session):
+    other = chat_service.create_session(db_session, user_id=999, title="not yours")
+
+    assert chat_client.get(f"/chat/sessions/{other.id}").status_code == 404
+    assert chat_client.post("/chat/agent_query", json={"query": "hi", "session_id": other.id}).status_code == 404
+    assert chat_client.delete(f"/chat/sessions/{other.id}").status_code == 404
+    assert other.id not in [s["id"] for s in chat_client.get("/chat/sessions").json()]
+
+    mine = chat_client.post("/chat/sessions", json={"title": "mine"}).json()
+    assert chat_client.delete(f"/chat/sessions/{mine['id']}").status_code == 204
+    assert chat_client.get(f"/chat/sessions/{mine['id']}").status_code == 404
+
+
+def test_session_turn_queries_run_off_the_event_loop(chat_client, test_engine):
+    session_id = chat_client.post("/chat/sessions", json={}).json()["id"]
+    chat_client.post("/chat/agent_query", json={"query": "q0", "session_id": session_id})
+    on_loop = []
+
+    def listener(*args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:  # a threadpool worker
+            on_loop.append(False)
+
+    event.listen(test_engine, "before_cursor_execute", listener)
+    try:
+        resp = chat_client.post("/chat/agent_query", json={"query": "q1", "session_id": session_id})
+    finally:
+        event.remove(test_engine, "before_cursor_execute", listener)
+
+    assert resp.json() == {"response": "echo:q1", "tool_action": None, "session_id": session_id}
+    assert [m.content for m in chat_client.histories[1]] == ["q0", "echo:q0"]
+    assert on_loop and not any(on_loop)
@@ -0,0 +1,97 @@
+from app.agents.backEndLLM import DependencyAnalysisOutput
+from app.core.metrics import metrics
+from app.core.retrieval import TfidfIndex, tokenize
+from app.models.feature import Feature
+from app.models.milestone import Milestone
+from app.models.project import Project
+from app.useage.dependency_context import build_dependency_context, feature_index_cache
+
+FILLER = ["Theme picker", "Audit log", "Locale switcher", "Avatar upload", "Keyboard shortcuts", "Onboarding tour"]
+
+
+def _features(n_filler: int):
+    milestones = [Milestone(id=1, name="Billing", done=False, progress=0), Milestone(id=2, name="Platform", done=False, progress=0)]
+    features = [
+        Feature(id=1, name="Invoice generation", status="done", milestone_id=1),
+        Feature(id=2, name="Email delivery service", status="todo", milestone_id=None),
+        Feature(id=3, name="User login", status="done", milestone_id=2),
+    ]
+    features += [
+        Feature(id=10 + i, name=f"{FILLER[i % len(FILLER)]} {i}", status="todo", milestone_id=2)
+        for i in range(n_filler)
+    ]
+    return features, milestones
+
+
+def test_tfidf_ranks_related_features_first():
+    index = TfidfIndex([1, 2, 3, 4], ["User login", "Password reset", "Invoice export", "Email invoices monthly"])
+    hits = index.search("Send invoices by email", k=2)
+    assert [key for key, _ in hits] == [4, 3]
+    assert hits[0][1] > hits[1][1] > 0
+    assert index.search("Kubernetes autoscaling", k=3) == []
+    assert tokenize("Invoices for users") == ["invoice", "user", "invoice user"]
+
+
+def test_small_project_is_sent_unchanged():
+    features, milestones = _features(0)
+    context = build_dependency_context(900, "Email invoices", features, milestones, top_k=10, token_budget=1000)
+    assert context.features_selected == context.features_total == 3
+    assert "most relevant" not in context.features
+    assert context.milestones.count("ID:") == 2
+
+
+def test_large_project_is_pruned_to_relevant_features_within_budget():
+    features, milestones = _features(300)
+    context = build_dependency_context(901, "Email invoices to customers", features, milestones, top_k=5, token_budget=1000)
+    lines = context.features.splitlines()
+    assert lines[0] == "(The 2 of 303 project features most relevant to the new feature.)"
+    assert {line.split(",")[0] for line in lines[1:]} == {"ID: 1", "ID: 2"}
+    # Only the milestone of a selected feature is kept
+    assert context.milestones.startswith("ID: 1, Name: Billing")
+    assert "Platform" not in context.milestones
+
+    tight = build_dependency_context(901, "Email invoices to customers", features, milestones, top_k=5, token_budget=20)
+    assert tight.features_selected == 1
+
+
+def test_index_is_cached_per_project_until_features_change():
+    feature_index_cache.clear()
+    metrics.reset()
+    features, milestones = _features(100)
+    for _ in range(3):
+        build_dependency_context(902, "Invoice reminders", features, milestones, top_k=5)
+    assert metrics.get("dependency_context.index_builds") == 1
+    assert metrics.get("dependency_context.index_hits") == 2
+
+    features[1].name = "Invoice reminder emails"
+    context = build_dependency_context(902, "Invoice reminders", features, milestones, top_k=5)
+    assert metrics.get("dependency_context.index_builds") == 2
+    assert context.features.splitlines()[1].startswith("ID: 2,")
+
+
+def test_analyze_dependencies_prompt_only_carries_relevant_features(client, db_session, monkeypatch):
+    p = Project(name="Big", description="many features", owner_id=None)
+    db_session.add(p)
+    db_session.commit()
+    billing = Milestone(project_id=p.id, name="Billing", done=False, progress=10)
+    db_session.add(billing)
+    db_session.commit()
+    db_session.add(Feature(project_id=p.id, name="Invoice generation", status="done", milestone_id=billing.id))
+    db_session.add_all([
+        Feature(project_id=p.id, name=f"{FILLER[i % len(FILLER)]} {i}", status="todo", milestone_id=None)
+        for i in range(200)
+    ])
+    db_session.commit()
+
+    captured = {}
+
+    async def fake_get_feature_dependencies(project_name, features, milestones, tech_stack, new_feature):
+        captured.update(features=features, milestones=milestones)
+        return DependencyAnalysisOutput(new_feature=new_feature, depends_on=[], reasoning="-")
+
+    monkeypatch.setattr("app.agents.backEndLLM.aget_feature_dependencies", fake_get_feature_dependencies)
+    r = client.post("/features/analyze-dependencies", json={"project_id": p.id, "new_feature": "Monthly invoice emails"})
+    assert r.status_code == 200
+    assert "Name: Invoice generation" in captured["features"]
+    assert captured["features"].count("\n") == 1  # header + the one relevant feature
+    assert "Name: Billing" in captured["milestones"]
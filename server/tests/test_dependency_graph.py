@@ -0,0 +1,148 @@
+import time
+
+import pytest
+
+from app.agents.backEndLLM import DependencyAnalysisOutput
+from app.core.dependency_graph import DependencyGraph, GraphRegistry
+from app.main import app
+from app.models.feature import Feature
+from app.models.featuredependency import FeatureDependency
+from app.models.milestone import Milestone
+from app.models.project import Project
+from app.routes.user import get_current_user
+from app.useage.dependency_service import graph_registry
+
+
+def test_transitive_queries_order_and_cycles():
+    # 4 -> 2 -> 1, 3 -> 1, 5 -> 4
+    graph = DependencyGraph(nodes=[1, 2, 3, 4, 5, 6], edges=[(2, 1), (3, 1), (4, 2), (5, 4)])
+    assert graph.dependencies(5) == [4, 2, 1]
+    assert graph.dependencies(5, transitive=False) == [4]
+    assert graph.dependents(1) == [2, 3, 4, 5]
+    order, cycles = graph.topological_order()
+    assert cycles == []
+    assert order.index(1) < order.index(2) < order.index(4) < order.index(5)
+    assert sorted(order) == [1, 2, 3, 4, 5, 6]
+
+    assert graph.would_create_cycle(1, 5)
+    assert not graph.would_create_cycle(6, 5)
+    graph.add_edge(1, 5)  # the graph itself allows it; the service refuses it
+    order, cycles = graph.topological_order()
+    assert cycles == [[1, 2, 4, 5]]
+    assert 3 not in order and 6 in order  # 3 sits behind the cycle
+
+    graph.remove_node(4)
+    assert graph.topological_order()[1] == []
+    assert graph.dependents(1) == [2, 3]
+
+
+def test_queries_stay_sub_millisecond_on_large_graphs():
+    n = 2000
+    graph = DependencyGraph(nodes=range(n), edges=[(i, i // 2) for i in range(1, n)] + [(i, i - 1) for i in range(1, n, 7)])
+    graph.topological_order()  # memoised after the first call
+    started = time.perf_counter()
+    for _ in range(100):
+        graph.dependencies(n - 1)
+        graph.topological_order()
+    assert (time.perf_counter() - started) / 100 < 0.001
+
+
+def test_registry_reloads_after_ttl_and_invalidate():
+    loads = []
+
+    def loader(project_id):
+        loads.append(project_id)
+        return [1, 2], [(2, 1)]
+
+    registry = GraphRegistry(ttl_seconds=60)
+    assert registry.get(7, loader) is registry.get(7, loader)
+    registry.invalidate(7)
+    registry.get(7, loader)
+    assert loads == [7, 7]
+    registry.ttl_seconds = 0
+    registry.get(7, loader)
+    assert loads == [7, 7, 7]
+
+
+@pytest.fixture()
+def graph_client(client, test_user):
+    app.dependency_overrides[get_current_user] = lambda: test_user
+    graph_registry.invalidate()
+    yield client
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.fixture()
+def features(db_session):
+    p = Project(name="GraphProj", description="desc", owner_id=None)
+    db_session.add(p)
+    db_session.commit()
+    rows = [Feature(project_id=p.id, name=name, status="todo") for name in ["Schema", "API", "UI", "Reports"]]
+    db_session.add_all(rows)
+    db_session.commit()
+    return p, [f.id for f in rows]
+
+
+def test_dependency_endpoints(graph_client, features):
+    project, (schema, api, ui, reports) = features
+    assert graph_client.put(f"/features/{api}/dependencies/{schema}").json()["source"] == "manual"
+    graph_client.put(f"/features/{ui}/dependencies/{api}")
+    graph_client.put(f"/features/{reports}/dependencies/{api}")
+
+    r = graph_client.put(f"/features/{schema}/dependencies/{ui}")
+    assert r.status_code == 409
+    assert graph_client.put(f"/features/{api}/dependencies/{api}").status_code == 400
+    assert graph_client.put(f"/features/{api}/dependencies/999999").status_code == 404
+
+    assert graph_client.get(f"/features/{ui}/dependencies").json()["feature_ids"] == [api, schema]
+    assert graph_client.get(f"/features/{ui}/dependencies?transitive=false").json()["feature_ids"] == [api]
+    assert graph_client.get(f"/features/{schema}/dependents").json()["feature_ids"] == [api, ui, reports]
+    order = graph_client.get(f"/features/project/{project.id}/dependency-order").json()
+    assert order["order"][:2] == [schema, api] and order["cycles"] == []
+    assert graph_client.get(f"/features/project/{project.id}/dependency-cycles").json() == []
+
+    assert graph_client.delete(f"/features/{reports}/dependencies/{api}").status_code == 204
+    assert graph_client.delete(f"/features/{reports}/dependencies/{api}").status_code == 404
+    assert graph_client.get(f"/features/{schema}/dependents").json()["feature_ids"] == [api, ui]
+
+
+def test_feature_changes_update_the_loaded_graph(graph_client, features, db_session):
+    project, (schema, api, ui, _) = features
+    graph_client.put(f"/features/{ui}/dependencies/{api}")
+    graph_client.put(f"/features/{api}/dependencies/{schema}")
+
+    milestone = Milestone(project_id=project.id, name="M1", done=False, progress=0)
+    db_session.add(milestone)
+    db_session.commit()
+    payload = {"project_id": project.id, "name": "Exports", "milestone_id": milestone.id}
+    created = graph_client.post("/features/", json=payload).json()
+    graph = graph_registry.loaded(project.id)
+    assert created["id"] in graph
+
+    assert graph_client.delete(f"/features/{api}").status_code == 204
+    assert graph_client.get(f"/features/{ui}/dependencies").json()["feature_ids"] == []
+    assert db_session.query(FeatureDependency).filter(FeatureDependency.project_id == project.id).count() == 0
+
+
+def test_analysis_of_an_existing_feature_is_stored(graph_client, features, db_session, monkeypatch):
+    project, (schema, api, ui, reports) = features
+    answers = iter([[api, schema, 424242], [schema]])
+
+    async def fake_get_feature_dependencies(project_name, features, milestones, tech_stack, new_feature):
+        assert f"ID: {reports}," not in features  # the feature itself isn't a candidate
+        return DependencyAnalysisOutput(new_feature=new_feature, depends_on=next(answers), reasoning="-")
+
+    monkeypatch.setattr("app.agents.backEndLLM.aget_feature_dependencies", fake_get_feature_dependencies)
+    payload = {"project_id": project.id, "new_feature": "Reports", "feature_id": reports}
+    assert graph_client.post("/features/analyze-dependencies", json=payload).status_code == 200
+    assert graph_client.get(f"/features/{reports}/dependencies?transitive=false").json()["feature_ids"] == [schema, api]
+
+    # Re-running replaces the LLM edges; unknown ids were dropped
+    graph_client.post("/features/analyze-dependencies", json=payload)
+    graph_registry.invalidate()  # read back from the database
+    assert graph_client.get(f"/features/{reports}/dependencies?transitive=false").json()["feature_ids"] == [schema]
+    sources = {e.source for e in db_session.query(FeatureDependency).filter(FeatureDependency.feature_id == reports)}
+    assert sources == {"llm"}
+
+    other = {"project_id": project.id + 1000, "new_feature": "X", "feature_id": reports}
+    assert graph_client.post("/features/analyze-dependencies", json=other).status_code == 404
@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.agents import featureBreakdownLLM
+from app.agents.featureBreakdownLLM import FeatureBreakdown, repair_breakdown
+from app.core.metrics import metrics
+
+VALID = {
+    "frontend_tasks": ["Login form"],
+    "backend_tasks": ["POST /login"],
+    "database_tasks": ["users table"],
+    "security_tasks": ["Hash passwords"],
+    "other_tasks": [],
+}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Returns one prepared message per call."""
+
+    message: AIMessage
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.message)])
+
+
+def _tool_call(args):
+    return AIMessage(content="", tool_calls=[{"name": "FeatureBreakdown", "args": args, "id": "call-1"}])
+
+
+@pytest.fixture()
+def scripted(monkeypatch):
+    def use(message):
+        llm = ScriptedChatModel(message=message)
+        monkeypatch.setattr("app.agents.featureBreakdownLLM.get_chat_model", lambda temperature=0.2: llm)
+    metrics.reset()
+    return use
+
+
+def test_valid_structured_output_takes_one_call(scripted):
+    scripted(_tool_call(VALID))
+
+    result = asyncio.run(featureBreakdownLLM.abreakdown_feature("Login"))
+    assert result == FeatureBreakdown(**VALID)
+    assert metrics.get("feature_breakdown.requests") == 1
+    assert metrics.get("feature_breakdown.llm_calls") == 1
+    assert metrics.get("feature_breakdown.repaired") == 0
+
+
+def test_malformed_tool_args_are_repaired_without_reasking(scripted):
+    # Missing fields, a string instead of a list, a loose key name
+    scripted(_tool_call({"Frontend Tasks": "Login form\n- Error banner", "backend_tasks": ["POST /login"]}))
+
+    result = featureBreakdownLLM.breakdown_feature("Login")
+    assert result.frontend_tasks == ["Login form", "Error banner"]
+    assert result.backend_tasks == ["POST /login"]
+    assert result.database_tasks == []
+    assert metrics.get("feature_breakdown.llm_calls") == 1
+    assert metrics.get("feature_breakdown.repaired") == 1
+
+
+@pytest.mark.parametrize("content", [
+    "```json\n" + json.dumps(VALID) + "\n```",
+    "Here you go: " + json.dumps(VALID)[:-1] + ",}",  # prose + trailing comma
+    "## Frontend\n- Login form\n## Backend\n- POST /login\n**Database Tasks:**\n1. users table\n## Security\n* Hash passwords",
+])
+def test_repair_from_free_text(content):
+    assert repair_breakdown(AIMessage(content=content)) == FeatureBreakdown(**VALID)
+
+
+def test_unrepairable_output_returns_empty_breakdown(scripted):
+    scripted(AIMessage(content="Sorry, I can't help with that."))
+
+    result = featureBreakdownLLM.breakdown_feature("Login")
+    assert result == FeatureBreakdown(frontend_tasks=[], backend_tasks=[], database_tasks=[], security_tasks=[], other_tasks=[])
+    assert metrics.get("feature_breakdown.failed") == 1
@@ -1,8 +1,13 @@
+import asyncio
+import json
+
 from app.models.project import Project
 from app.models.tech_stack import TechStack
 from app.models.feature import Feature
 from app.models.milestone import Milestone
 from app.agents.backEndLLM import DependencyAnalysisOutput
+from app.agents.featureBreakdownLLM import FeatureBreakdown
+from app.core.config import settings
 
 
 def test_analyze_feature_dependencies(client, db_session, monkeypatch):
@@ -25,10 +30,10 @@ def test_analyze_feature_dependencies(client, db_session, monkeypatch):
     db_session.commit()
 
     # Mock LLM call
-    def fake_get_feature_dependencies(project_name, features, milestones, tech_stack, new_feature):
+    async def fake_get_feature_dependencies(project_name, features, milestones, tech_stack, new_feature):
         return DependencyAnalysisOutput(new_feature=new_feature, depends_on=[1], reasoning="depends")
 
-    monkeypatch.setattr("app.agents.backEndLLM.get_feature_dependencies", fake_get_feature_dependencies)
+    monkeypatch.setattr("app.agents.backEndLLM.aget_feature_dependencies", fake_get_feature_dependencies)
 
     payload = {"project_id": p.id, "new_feature": "Reports"}
     r = client.post("/features/analyze-dependencies", json=payload)
@@ -37,3 +42,40 @@ def test_analyze_feature_dependencies(client, db_session, monkeypatch):
     assert data["new_feature"] == "Reports"
     assert data["depends_on"] == [1]
     assert "reasoning" in data
+
+
+def test_breakdown_batch_dedupes_and_streams_ndjson(client, monkeypatch):
+    calls, in_flight, peak = [], [], [0]
+
+    async def fake_breakdown(description):
+        calls.append(description)
+        in_flight.append(1)
+        peak[0] = max(peak[0], len(in_flight))
+        await asyncio.sleep(0.05)
+        in_flight.pop()
+        if description == "Broken":
+            raise RuntimeError("model unavailable")
+        return FeatureBreakdown(frontend_tasks=[f"{description} UI"], backend_tasks=[], database_tasks=[], security_tasks=[], other_tasks=[])
+
+    monkeypatch.setattr("app.agents.featureBreakdownLLM.abreakdown_feature", fake_breakdown)
+    monkeypatch.setattr(settings, "feature_breakdown_max_concurrency", 2)
+
+    features = ["Login", "Billing", " Login ", "Reports", "Broken"]
+    r = client.post("/features/breakdown/batch", json={"feature_descriptions": features})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    results, summary = lines[:-1], lines[-1]
+    assert sorted(calls) == ["Billing", "Broken", "Login", "Reports"]  # duplicate broken down once
+    assert peak[0] == 2
+    assert summary == {"done": True, "total": 5, "unique": 4, "failed": 1}
+
+    by_feature = {res["feature_description"]: res for res in results}
+    assert by_feature["Login"]["indices"] == [0, 2]
+    assert by_feature["Billing"]["breakdown"]["frontend_tasks"] == ["Billing UI"]
+    assert by_feature["Broken"]["error"] == "model unavailable"
+
+
+def test_breakdown_batch_rejects_empty_batch(client):
+    assert client.post("/features/breakdown/batch", json={"feature_descriptions": []}).status_code == 422
@@ -0,0 +1,94 @@
+import asyncio
+from uuid import uuid4
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.runnables import RunnableLambda
+
+from app.agents import chatAgentLLM, roadmapLLM
+from app.core.instrumentation import LLM_CALLBACKS, USAGE_HEADER, RequestUsage, _REQUEST_USAGE, llm_config
+from app.core.metrics import Histogram, metrics
+
+
+def _series(name, **labels):
+    return [s for s in metrics.histograms().get(name, []) if all(s["labels"].get(k) == v for k, v in labels.items())]
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram([10, 100, 1000])
+    for value in [5, 50, 50, 500]:
+        histogram.observe(value)
+    data = histogram.to_dict()
+    assert data["buckets"] == {"10": 1, "100": 3, "1000": 4, "+Inf": 4}
+    assert 10 <= data["p50"] <= 100
+    assert 100 <= data["p95"] <= 1000
+
+
+def test_plan_request_reports_usage_header_and_histograms(client, fake_backend):
+    metrics.reset()
+    payload = {"requirements": "Login\nBilling", "tech_stack": "TS-instrumentation", "temperature": 0.2, "content": ""}
+    r = client.post("/plan", json=payload)
+    assert r.status_code == 200
+
+    usage = dict(part.split("=", 1) for part in r.headers[USAGE_HEADER].split("; "))
+    assert int(usage["calls"]) == 4  # roadmap, milestones, one task plan per milestone
+    assert int(usage["prompt_tokens"]) > 0 and int(usage["completion_tokens"]) > 0
+    assert usage["agents"] == "roadmap,milestones,tasks"
+    assert "llm;dur=" in r.headers["server-timing"]
+
+    [tasks] = _series("llm.latency_ms", agent="tasks", route="POST /plan")
+    assert tasks["count"] == 2
+    assert _series("llm.prompt_tokens", agent="milestones", route="POST /plan")[0]["count"] == 1
+    body = client.get("/metrics").json()
+    assert body["counters"]["llm.calls.tasks"] == 2
+    assert "llm.ttft_ms" in body["histograms"]
+
+
+def test_streaming_records_time_to_first_token(fake_backend, monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(fake_backend, "fake_llm_ttft_ms", 60.0)
+    monkeypatch.setattr(fake_backend, "fake_llm_tokens_per_second", 2000.0)
+
+    async def stream():
+        return [chunk async for chunk in roadmapLLM.astream_roadmap("Login", "FastAPI")]
+
+    asyncio.run(stream())
+    [ttft] = _series("llm.ttft_ms", agent="roadmap")
+    [latency] = _series("llm.latency_ms", agent="roadmap")
+    assert 50 <= ttft["sum"] < latency["sum"]
+
+
+def test_chat_agent_tool_calls_are_counted(fake_backend):
+    metrics.reset()
+    asyncio.run(chatAgentLLM.achat_with_agent("can you check on task 21 for me", 5))
+    assert metrics.get("llm.tool_calls.chat") == 1
+    assert metrics.get("llm.calls.chat") == 2  # tool call, then the answer
+
+
+def test_provider_usage_metadata_wins_over_estimates():
+    metrics.reset()
+    usage = RequestUsage()
+    token = _REQUEST_USAGE.set(usage)
+    try:
+        run_id = uuid4()
+        LLM_CALLBACKS.on_chat_model_start({}, [[AIMessage(content="x" * 400)]], run_id=run_id, metadata={"agent": "a"})
+        message = AIMessage(content="hi", usage_metadata={"input_tokens": 7, "output_tokens": 3, "total_tokens": 10})
+        LLM_CALLBACKS.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=run_id)
+    finally:
+        _REQUEST_USAGE.reset(token)
+    assert (usage.prompt_tokens, usage.completion_tokens, usage.calls) == (7, 3, 1)
+
+
+def test_retries_are_counted_per_agent():
+    metrics.reset()
+    attempts = []
+
+    def flaky(x):
+        attempts.append(x)
+        if len(attempts) == 1:
+            raise ConnectionError("transient")
+        return x
+
+    chain = RunnableLambda(flaky).with_retry(stop_after_attempt=2, wait_exponential_jitter=False)
+    assert chain.invoke(1, config=llm_config("flaky")) == 1
+    assert metrics.get("llm.retries.flaky") == 1
@@ -0,0 +1,222 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.jobs import JobQueue, job_queue
+from app.main import app
+from app.models.job import Job
+from app.routes.user import get_current_user
+
+PLAN_PAYLOAD = {"requirements": "REQS", "tech_stack": "TS-jobs", "temperature": 0.2, "content": "unused"}
+
+
+@pytest.fixture(autouse=True)
+def signed_in(test_user):
+    app.dependency_overrides[get_current_user] = lambda: test_user
+    yield test_user
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def _patch_plan(monkeypatch, tasks):
+    async def fake_generate_roadmap(requirements, tech_stack, best_practices, temperature):
+        return "ROADMAP"
+
+    async def fake_generate_milestones(requirements, tech_stack, temperature):
+        return "MILESTONES"
+
+    monkeypatch.setattr("app.agents.roadmapLLM.agenerate_roadmap", fake_generate_roadmap)
+    monkeypatch.setattr("app.agents.milestonesLLM.agenerate_milestones", fake_generate_milestones)
+    monkeypatch.setattr("app.agents.tasksLLM.agenerate_tasks", tasks)
+
+
+def _wait_for(client, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} never reached {statuses}: {job}")
+
+
+def test_submit_returns_immediately_and_poll_returns_result(client, monkeypatch):
+    async def slow_tasks(milestones, tech_stack, temperature):
+        await asyncio.sleep(0.3)
+        return "TASKS"
+
+    _patch_plan(monkeypatch, slow_tasks)
+
+    started = time.perf_counter()
+    r = client.post("/jobs/plan", json=PLAN_PAYLOAD)
+    assert time.perf_counter() - started < 0.2
+    assert r.status_code == 202
+    job = r.json()
+    assert job["status"] in ("queued", "running")
+    assert r.headers["location"] == f"/jobs/{job['id']}"
+
+    done = _wait_for(client, job["id"], {"succeeded", "failed"})
+    assert done["status"] == "succeeded"
+    assert done["attempts"] == 1
+    assert done["result"] == {"roadmap": "ROADMAP", "milestones": "MILESTONES", "tasks": "TASKS"}
+    assert done["expires_at"] is not None
+
+
+def test_failed_attempt_is_retried(client, monkeypatch):
+    calls = []
+
+    async def flaky_tasks(milestones, tech_stack, temperature):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("provider overloaded")
+        return "TASKS"
+
+    _patch_plan(monkeypatch, flaky_tasks)
+    monkeypatch.setattr(job_queue, "retry_backoff_seconds", 0.01)
+
+    job = client.post("/jobs/plan", json={**PLAN_PAYLOAD, "tech_stack": "TS-retry"}).json()
+    done = _wait_for(client, job["id"], {"succeeded", "failed"})
+    assert done["status"] == "succeeded"
+    assert done["attempts"] == 2
+    assert done["error"] is None
+
+
+def test_missing_project_fails_without_retry(client):
+    job = client.post("/jobs/analyze-dependencies", json={"project_id": 999999, "new_feature": "SSO"}).json()
+    done = _wait_for(client, job["id"], {"succeeded", "failed"})
+    assert done["status"] == "failed"
+    assert done["attempts"] == 1
+    assert done["error"] == "Project not found"
+
+
+def test_cancel_running_job(client, monkeypatch):
+    started, cancelled = [], []
+
+    async def hanging_tasks(milestones, tech_stack, temperature):
+        started.append(1)
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    _patch_plan(monkeypatch, hanging_tasks)
+
+    job = client.post("/jobs/plan", json={**PLAN_PAYLOAD, "tech_stack": "TS-cancel"}).json()
+    _wait_for(client, job["id"], {"running"})
+    deadline = time.monotonic() + 5
+    while not started and time.monotonic() < deadline:  # earlier stages first await their cache lookups
+        time.sleep(0.01)
+
+    r = client.delete(f"/jobs/{job['id']}")
+    assert r.status_code == 200
+    assert r.json()["status"] == "cancelled"
+    time.sleep(0.05)
+    assert cancelled == [1]  # the LLM call was interrupted, not left running
+    assert client.get(f"/jobs/{job['id']}").json()["status"] == "cancelled"
+    assert client.delete(f"/jobs/{job['id']}").status_code == 409
+
+
+def test_stream_ends_with_result(client, monkeypatch):
+    from tests.test_streaming import parse_sse
+
+    async def slow_tasks(milestones, tech_stack, temperature):
+        await asyncio.sleep(0.1)
+        return "TASKS"
+
+    _patch_plan(monkeypatch, slow_tasks)
+
+    job = client.post("/jobs/plan", json={**PLAN_PAYLOAD, "tech_stack": "TS-stream"}).json()
+    r = client.get(f"/jobs/{job['id']}/stream")
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(r.text)
+    assert events[-1][0] == "succeeded"
+    assert events[-1][1]["result"]["tasks"] == "TASKS"
+    assert "running" in [name for name, _ in events]
+
+
+def test_expired_jobs_are_swept(client, db_session, monkeypatch):
+    _patch_plan(monkeypatch, lambda **kw: asyncio.sleep(0, "TASKS"))
+
+    job = client.post("/jobs/plan", json={**PLAN_PAYLOAD, "tech_stack": "TS-sweep"}).json()
+    _wait_for(client, job["id"], {"succeeded"})
+
+    db_session.query(Job).filter(Job.id == job["id"]).update(
+        {Job.expires_at: datetime.now(timezone.utc) - timedelta(seconds=1)}
+    )
+    db_session.commit()
+    assert job_queue.sweep() >= 1
+    assert client.get(f"/jobs/{job['id']}").status_code == 404
+
+
+def test_submit_validates_kind_and_payload(client):
+    assert client.post("/jobs/unknown", json={}).status_code == 404
+    assert client.post("/jobs/plan", json={"requirements": "only"}).status_code == 422
+    assert client.get("/jobs/does-not-exist").status_code == 404
+
+
+def test_jobs_are_only_visible_to_their_owner(client, monkeypatch, signed_in):
+    _patch_plan(monkeypatch, lambda **kw: asyncio.sleep(0, "TASKS"))
+    job = client.post("/jobs/plan", json={**PLAN_PAYLOAD, "tech_stack": "TS-owner"}).json()
+    _wait_for(client, job["id"], {"succeeded"})
+
+    other = type("OtherUser", (), {"id": signed_in.id + 1})()
+    app.dependency_overrides[get_current_user] = lambda: other
+    assert client.get(f"/jobs/{job['id']}").status_code == 404
+    assert client.get(f"/jobs/{job['id']}/stream").status_code == 404
+    assert client.delete(f"/jobs/{job['id']}").status_code == 404
+
+    app.dependency_overrides.pop(get_current_user)
+    assert client.get(f"/jobs/{job['id']}").status_code in (401, 403)  # no token
+
+
+def test_queue_database_work_runs_off_the_event_loop(client, test_engine, monkeypatch):
+    from tests.test_streaming import parse_sse
+
+    _patch_plan(monkeypatch, lambda **kw: asyncio.sleep(0.05, "TASKS"))
+    on_loop = []
+
+    def listener(*args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:  # a threadpool worker
+            on_loop.append(False)
+
+    event.listen(test_engine, "before_cursor_execute", listener)
+    try:
+        job = client.post("/jobs/plan", json={**PLAN_PAYLOAD, "tech_stack": "TS-off-loop"}).json()
+        events = parse_sse(client.get(f"/jobs/{job['id']}/stream").text)
+        assert client.get(f"/jobs/{job['id']}").json()["status"] == "succeeded"
+        assert client.delete(f"/jobs/{job['id']}").status_code == 409
+    finally:
+        event.remove(test_engine, "before_cursor_execute", listener)
+
+    assert events[-1][0] == "succeeded"
+    assert on_loop and not any(on_loop)
+
+
+def test_stop_hands_running_jobs_back(db_session, test_engine):
+    queue = JobQueue(sessionmaker(autocommit=False, autoflush=False, bind=test_engine), workers=1)
+    started = asyncio.Event()
+
+    async def hang(payload, db):
+        started.set()
+        await asyncio.sleep(30)
+
+    queue.register("hang", hang)
+
+    async def run():
+        await queue.start()
+        job = queue.submit("hang", {}, db_session)
+        await asyncio.wait_for(started.wait(), timeout=5)
+        await queue.stop()
+        return job.id
+
+    job_id = asyncio.run(run())
+    db_session.expire_all()
+    job = db_session.get(Job, job_id)
+    assert (job.status, job.attempts) == ("queued", 0)
@@ -0,0 +1,77 @@
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from app.agents import systemDesignLLM
+from app.core.layout import layered_layout, layout_uml_schema
+
+
+def _overlaps(box):
+    x, y, w, h = box.T
+    hit = (x[:, None] < (x + w)[None, :]) & (x[None, :] < (x + w)[:, None]) \
+        & (y[:, None] < (y + h)[None, :]) & (y[None, :] < (y + h)[:, None])
+    np.fill_diagonal(hit, False)
+    return int(hit.sum() // 2)
+
+
+def _random_graph(n, m, seed=0):
+    rng = random.Random(seed)
+    ids = [f"n{i}" for i in range(n)]
+    return ids, [(rng.choice(ids), rng.choice(ids)) for _ in range(m)]
+
+
+def test_layout_is_layered_and_deterministic():
+    ids = ["lb", "auth", "billing", "cache", "db"]
+    edges = [("lb", "auth"), ("lb", "billing"), ("auth", "db"), ("billing", "db"), ("auth", "cache")]
+    box = layered_layout(ids, edges)
+
+    y = dict(zip(ids, box[:, 1]))
+    assert all(y[a] < y[b] for a, b in edges)  # every edge points down
+    assert box[:, 0].min() == box[:, 1].min() == 40
+    assert _overlaps(box) == 0
+    assert np.array_equal(box, layered_layout(ids, edges))
+
+
+def test_cycles_and_unknown_ids_are_tolerated():
+    box = layered_layout(["a", "b", "c"], [("a", "b"), ("b", "c"), ("c", "a"), ("a", "ghost"), ("b", "b")])
+    assert box.shape == (3, 4)
+    assert len(set(box[:, 1])) == 3  # the cycle is cut once, leaving a chain
+    assert layered_layout([], []).shape == (0, 4)
+
+
+def test_hundreds_of_nodes_lay_out_quickly_without_overlaps():
+    ids, edges = _random_graph(500, 900)
+    layered_layout(ids, edges)  # warm up NumPy
+
+    started = time.perf_counter()
+    box = layered_layout(ids, edges)
+    elapsed = time.perf_counter() - started
+
+    assert _overlaps(box) == 0
+    assert elapsed < 0.2, f"{elapsed * 1000:.0f} ms"
+
+
+def test_generated_design_gets_coordinates(fake_backend):
+    design = asyncio.run(systemDesignLLM.agenerate_system_design(
+        features="Login, Billing", expected_users="10k", geography="EU", project_id=7,
+    ))
+    nodes = {node.id: node for node in design.uml_schema.nodes}
+    assert nodes["lb"].y < nodes["svc1"].y < nodes["db"].y
+    assert nodes["svc1"].w >= 8 * len(nodes["svc1"].name)  # sized to its name
+    assert layout_uml_schema(design.uml_schema.model_dump()) == design.uml_schema.model_dump()
+
+
+def test_relayout_endpoint(client):
+    created = client.post("/project-uml/add", json={"type": "system", "uml_schema": {
+        "nodes": [{"id": "a", "name": "Api", "x": 0, "y": 0, "w": 1, "h": 1}, {"id": "b", "name": "Db", "x": 0, "y": 0, "w": 1, "h": 1}],
+        "relationships": [{"source": "a", "to": "b", "type": "sql"}],
+    }}).json()
+
+    r = client.post(f"/project-uml/{created['id']}/layout")
+    assert r.status_code == 200
+    a, b = r.json()["uml_schema"]["nodes"]
+    assert (a["w"], a["h"]) == (120, 80)
+    assert a["y"] + a["h"] < b["y"]
+    assert client.post("/project-uml/999999/layout").status_code == 404
@@ -0,0 +1,49 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.core import llm as llm_registry
+from app.agents.roadmapLLM import generate_roadmap
+from app.agents.milestonesLLM import generate_milestones
+
+
+@pytest.fixture()
+def counted_models(monkeypatch):
+    built = []
+
+    def fake_chat_model(**kwargs):
+        built.append(kwargs)
+        return FakeListChatModel(responses=["GENERATED"])
+
+    monkeypatch.setenv("API_KEY", "test-key")
+    monkeypatch.setattr(llm_registry, "ChatGoogleGenerativeAI", fake_chat_model)
+    llm_registry.clear_chat_models()
+    yield built
+    llm_registry.clear_chat_models()
+
+
+def test_agents_reuse_one_client_per_model_and_temperature(counted_models):
+    for _ in range(5):
+        assert generate_roadmap("reqs", "stack", temperature=0.2) == "GENERATED"
+        assert generate_milestones("reqs", "stack", temperature=0.2) == "GENERATED"
+
+    # Ten generations across two agents, one client construction
+    assert len(counted_models) == 1
+    assert counted_models[0]["temperature"] == 0.2
+
+    generate_roadmap("reqs", "stack", temperature=0.7)
+    assert len(counted_models) == 2
+
+
+def test_registry_rounds_temperature_into_same_key(counted_models):
+    a = llm_registry.get_chat_model(0.2)
+    b = llm_registry.get_chat_model(0.2000001)
+    assert a is b
+    assert len(counted_models) == 1
+
+
+def test_registry_requires_api_key(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    monkeypatch.setattr(llm_registry.get_settings(), "api_key", None)
+    with pytest.raises(RuntimeError):
+        llm_registry.get_chat_model()
@@ -1,10 +1,10 @@
 from app.models.project import Project
 
 def test_generate_milestones(client, monkeypatch):
-    def fake_generate_milestones(requirements, tech_stack, temperature):
+    async def fake_generate_milestones(requirements, tech_stack, temperature):
         return "DUMMY_MILESTONES"
 
-    monkeypatch.setattr("app.agents.milestonesLLM.generate_milestones", fake_generate_milestones)
+    monkeypatch.setattr("app.agents.milestonesLLM.agenerate_milestones", fake_generate_milestones)
 
     payload = {
         "requirements": "reqs",
@@ -1,23 +1,23 @@
 def test_plan_chain(client, monkeypatch):
     calls = {"roadmap": 0, "milestones": 0, "tasks": 0}
 
-    def fake_generate_roadmap(requirements, tech_stack, best_practices, temperature):
+    async def fake_generate_roadmap(requirements, tech_stack, best_practices, temperature):
         calls["roadmap"] += 1
         return "ROADMAP"
 
-    def fake_generate_milestones(requirements, tech_stack, temperature):
+    async def fake_generate_milestones(requirements, tech_stack, temperature):
         calls["milestones"] += 1
         assert requirements == "ROADMAP"
         return "MILESTONES"
 
-    def fake_generate_tasks(milestones, tech_stack, temperature):
+    async def fake_generate_tasks(milestones, tech_stack, temperature):
         calls["tasks"] += 1
         assert milestones == "MILESTONES"
         return "TASKS"
 
-    monkeypatch.setattr("app.agents.roadmapLLM.generate_roadmap", fake_generate_roadmap)
-    monkeypatch.setattr("app.agents.milestonesLLM.generate_milestones", fake_generate_milestones)
-    monkeypatch.setattr("app.agents.tasksLLM.generate_tasks", fake_generate_tasks)
+    monkeypatch.setattr("app.agents.roadmapLLM.agenerate_roadmap", fake_generate_roadmap)
+    monkeypatch.setattr("app.agents.milestonesLLM.agenerate_milestones", fake_generate_milestones)
+    monkeypatch.setattr("app.agents.tasksLLM.agenerate_tasks", fake_generate_tasks)
 
     payload = {
         "requirements": "REQS",
@@ -31,3 +31,102 @@ def test_plan_chain(client, monkeypatch):
     data = r.json()
     assert data == {"roadmap": "ROADMAP", "milestones": "MILESTONES", "tasks": "TASKS"}
     assert calls == {"roadmap": 1, "milestones": 1, "tasks": 1}
+
+
+MILESTONES_DOC = """# Features
+- Login
+- Billing
+- Reports
+
+# Milestones by Feature
+## Login
+- Schema: users table
+- API: POST /login
+## Billing
+- Schema: invoices table
+## Reports
+- UI: reports page
+
+# Notes
+- Keep it short.
+"""
+
+
+def test_split_milestone_sections():
+    from app.useage.plan_pipeline import split_milestone_sections
+
+    sections = split_milestone_sections(MILESTONES_DOC)
+    assert [title for title, _ in sections] == ["Login", "Billing", "Reports"]
+    assert sections[0][1] == "## Login\n- Schema: users table\n- API: POST /login"
+    assert "Keep it short" not in sections[2][1]  # "# Notes" closes the last section
+
+
+def _patch_fanout(monkeypatch, delay, in_flight, peak):
+    import asyncio
+
+    async def fake_generate_roadmap(requirements, tech_stack, best_practices, temperature):
+        return "ROADMAP"
+
+    async def fake_generate_milestones(requirements, tech_stack, temperature):
+        return MILESTONES_DOC
+
+    async def fake_generate_tasks(milestones, tech_stack, temperature):
+        in_flight.append(1)
+        peak[0] = max(peak[0], len(in_flight))
+        feature = milestones.splitlines()[0][3:]
+        # Later sections finish first, so completion order != document order
+        await asyncio.sleep(delay * (3 - ["Login", "Billing", "Reports"].index(feature)) / 3)
+        in_flight.pop()
+        return f"# Daily Task Plan\n\n## {feature} work\n- Day 1: build {feature}"
+
+    monkeypatch.setattr("app.agents.roadmapLLM.agenerate_roadmap", fake_generate_roadmap)
+    monkeypatch.setattr("app.agents.milestonesLLM.agenerate_milestones", fake_generate_milestones)
+    monkeypatch.setattr("app.agents.tasksLLM.agenerate_tasks", fake_generate_tasks)
+
+
+def test_plan_fans_out_tasks_per_feature_and_reassembles_in_order(client, monkeypatch):
+    import time
+
+    in_flight, peak = [], [0]
+    _patch_fanout(monkeypatch, 0.3, in_flight, peak)
+
+    payload = {"requirements": "FANOUT", "tech_stack": "TS-fanout", "temperature": 0.2, "content": "unused"}
+    started = time.perf_counter()
+    r = client.post("/plan", json=payload)
+    elapsed = time.perf_counter() - started
+
+    assert r.status_code == 200
+    tasks = r.json()["tasks"]
+    assert tasks.startswith("# Daily Task Plan\n\n## Login work")
+    assert tasks.index("Login work") < tasks.index("Billing work") < tasks.index("Reports work")
+    assert tasks.count("# Daily Task Plan") == 1
+    assert peak[0] > 1  # sections ran concurrently
+    assert elapsed < 0.55  # sequential would be 0.3 + 0.2 + 0.1
+
+
+def test_plan_fanout_respects_concurrency_limit(client, monkeypatch):
+    from app.core.config import settings
+
+    in_flight, peak = [], [0]
+    _patch_fanout(monkeypatch, 0.05, in_flight, peak)
+    monkeypatch.setattr(settings, "plan_tasks_max_concurrency", 1)
+
+    payload = {"requirements": "LIMITED", "tech_stack": "TS-limited", "temperature": 0.2, "content": "unused"}
+    assert client.post("/plan", json=payload).status_code == 200
+    assert peak[0] == 1
+
+
+def test_plan_streams_each_stage_as_it_finishes(client, monkeypatch):
+    from tests.test_streaming import parse_sse
+
+    in_flight, peak = [], [0]
+    _patch_fanout(monkeypatch, 0.1, in_flight, peak)
+
+    payload = {"requirements": "STREAMED", "tech_stack": "TS-streamed", "temperature": 0.2, "content": "unused"}
+    r = client.post("/plan", json=payload, headers={"Accept": "text/event-stream"})
+    events = parse_sse(r.text)
+    names = [name for name, _ in events]
+    assert names == ["roadmap", "milestones", "tasks_section", "tasks_section", "tasks_section", "tasks", "summary"]
+    # Sections are emitted in completion order, the shortest (Reports) first
+    assert [data["feature"] for name, data in events if name == "tasks_section"] == ["Reports", "Billing", "Login"]
+    assert events[-1][1]["cache"] == ["MISS"] * 5
@@ -0,0 +1,132 @@
+from app.core.config import settings
+
+
+def _diagram(n=3):
+    return {
+        "nodes": [{"id": f"n{i}", "name": f"Node{i}", "x": 10 * i, "y": 0, "w": 120, "h": 80} for i in range(n)],
+        "relationships": [{"source": "n0", "to": "n1", "type": "http"}],
+    }
+
+
+def _create(client):
+    r = client.post("/project-uml/add", json={"type": "system", "uml_schema": _diagram()})
+    assert r.status_code == 201
+    assert r.json()["revision"] == 0
+    return r.json()["id"]
+
+
+def _move(client, uml_id, revision, node, x):
+    return client.patch(f"/project-uml/{uml_id}", json={
+        "revision": revision,
+        "operations": [{"op": "replace", "path": f"/nodes/{node}/x", "value": x}],
+    })
+
+
+def test_patch_applies_operations_and_bumps_revision(client):
+    uml_id = _create(client)
+
+    r = client.patch(f"/project-uml/{uml_id}", json={"revision": 0, "operations": [
+        {"op": "test", "path": "/nodes/1/id", "value": "n1"},
+        {"op": "replace", "path": "/nodes/1/x", "value": 500},
+        {"op": "add", "path": "/relationships/-", "value": {"source": "n1", "to": "n2", "type": "sql"}},
+        {"op": "copy", "from": "/nodes/0/w", "path": "/nodes/2/w"},
+    ]})
+    assert r.status_code == 200, r.text
+    assert r.json() == {"id": uml_id, "revision": 1}
+
+    doc = client.get(f"/project-uml/{uml_id}").json()
+    assert doc["revision"] == 1
+    assert doc["uml_schema"]["nodes"][1]["x"] == 500
+    assert doc["uml_schema"]["relationships"][-1] == {"source": "n1", "to": "n2", "type": "sql"}
+
+
+def test_stale_revisions_and_bad_patches_are_rejected(client):
+    uml_id = _create(client)
+    assert _move(client, uml_id, 0, 0, 1).status_code == 200
+
+    stale = _move(client, uml_id, 0, 1, 2)  # edited revision 0, but revision 1 exists
+    assert stale.status_code == 409
+    assert stale.headers["X-UML-Revision"] == "1"
+
+    failed_test = client.patch(f"/project-uml/{uml_id}", json={"revision": 1, "operations": [
+        {"op": "test", "path": "/nodes/0/x", "value": 999},
+        {"op": "replace", "path": "/nodes/0/x", "value": 5},
+    ]})
+    assert failed_test.status_code == 422
+    assert _move(client, uml_id, 1, 42, 0).status_code == 422  # no such node
+    assert client.get(f"/project-uml/{uml_id}").json()["revision"] == 1  # nothing was stored
+
+
+def test_history_is_deltas_with_periodic_snapshots(client, db_session, monkeypatch):
+    from app.models.projectumlrevision import ProjectUMLRevision
+
+    monkeypatch.setattr(settings, "uml_snapshot_every", 4)
+    uml_id = _create(client)
+    for revision in range(10):
+        assert _move(client, uml_id, revision, revision % 3, 100 + revision).status_code == 200
+
+    rows = db_session.query(ProjectUMLRevision).filter(ProjectUMLRevision.uml_id == uml_id).order_by(ProjectUMLRevision.revision).all()
+    assert [row.revision for row in rows] == list(range(11))
+    assert [row.revision for row in rows if row.snapshot is not None] == [0, 4, 8]
+    assert all(row.patch is not None for row in rows[1:])
+
+    assert client.get(f"/project-uml/{uml_id}/revisions/0").json()["uml_schema"] == _diagram()
+    for revision in (3, 4, 6, 10):
+        nodes = client.get(f"/project-uml/{uml_id}/revisions/{revision}").json()["uml_schema"]["nodes"]
+        last_move = revision - 1
+        assert nodes[last_move % 3]["x"] == 100 + last_move
+    assert client.get(f"/project-uml/{uml_id}/revisions/11").status_code == 404
+
+
+def test_put_is_a_snapshot_revision_with_optional_check(client):
+    uml_id = _create(client)
+    replaced = client.put(f"/project-uml/{uml_id}", json={"type": "system", "uml_schema": _diagram(1)})
+    assert replaced.json()["revision"] == 1
+
+    stale = client.put(f"/project-uml/{uml_id}", json={"type": "system", "uml_schema": _diagram(2), "revision": 0})
+    assert stale.status_code == 409
+    assert client.get(f"/project-uml/{uml_id}/revisions/0").json()["uml_schema"] == _diagram()
+    assert len(client.get(f"/project-uml/{uml_id}/revisions/1").json()["uml_schema"]["nodes"]) == 1
+
+
+def test_delete_removes_the_revision_history(client, db_session):
+    from app.models.projectumlrevision import ProjectUMLRevision
+
+    uml_id = _create(client)
+    assert _move(client, uml_id, 0, 0, 10).status_code == 200
+    assert _move(client, uml_id, 1, 1, 20).status_code == 200
+    history = db_session.query(ProjectUMLRevision).filter(ProjectUMLRevision.uml_id == uml_id)
+    assert history.count() == 3  # base snapshot + two patches
+
+    assert client.delete(f"/project-uml/{uml_id}").status_code == 204
+    assert history.count() == 0  # SQLite doesn't enforce ON DELETE CASCADE here
+    assert client.get(f"/project-uml/{uml_id}/revisions/1").status_code == 404
+
+
+def test_concurrent_first_edits_conflict_instead_of_failing(client, db_session, test_engine, monkeypatch):
+    from sqlalchemy.orm import Session
+
+    from app.core.metrics import metrics
+    from app.models.projectumlrevision import ProjectUMLRevision
+    from app.useage import uml_service
+
+    uml_id = _create(client)
+    ensure = uml_service._ensure_base_snapshot
+
+    def racing_snapshot(db, item):
+        ensure(db, item)  # saw no history, so this request adds the base snapshot too...
+        with Session(bind=test_engine) as other:  # ...but another first edit commits it before we do
+            other.add(ProjectUMLRevision(uml_id=item.id, revision=0, snapshot=item.uml_schema))
+            other.commit()
+
+    monkeypatch.setattr(uml_service, "_ensure_base_snapshot", racing_snapshot)
+    conflicts = metrics.get("uml.revision_conflicts")
+    r = _move(client, uml_id, 0, 0, 10)
+    assert r.status_code == 409
+    assert r.headers["X-UML-Revision"] == "0"
+    assert metrics.get("uml.revision_conflicts") - conflicts == 1
+
+    monkeypatch.setattr(uml_service, "_ensure_base_snapshot", ensure)
+    assert _move(client, uml_id, 0, 0, 10).status_code == 200  # the retry goes through
+    history = db_session.query(ProjectUMLRevision).filter(ProjectUMLRevision.uml_id == uml_id)
+    assert sorted(row.revision for row in history) == [0, 1]
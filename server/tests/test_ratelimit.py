@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core import ratelimit
+from app.core.ratelimit import CRUD, LLM, Identity, Limit, MemoryBackend, RateLimiter, SQLBackend, rate_limiter
+from app.core.security import create_access_token
+from app.routes.user import get_current_user
+
+
+@pytest.fixture(params=["memory", "sql"])
+def backend(request, test_engine):
+    if request.param == "memory":
+        yield MemoryBackend()
+    else:
+        backend = SQLBackend(sessionmaker(bind=test_engine))
+        backend.reset()
+        yield backend
+        backend.reset()
+
+
+def test_bucket_allows_a_burst_then_refills_at_the_average_rate(backend):
+    limit = Limit(capacity=3, period=60)  # one token every 20 s
+    decisions = [backend.spend("k", limit, now=1000.0) for _ in range(4)]
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert decisions[3].retry_after == pytest.approx(20.0)
+
+    assert not backend.spend("k", limit, now=1019.0).allowed
+    assert backend.spend("k", limit, now=1020.5).allowed
+    # Other keys are independent
+    assert backend.spend("other", limit, now=1020.5).allowed
+
+
+def test_sql_buckets_are_shared_between_workers(test_engine):
+    factory = sessionmaker(bind=test_engine)
+    worker_a, worker_b = SQLBackend(factory), SQLBackend(factory)
+    worker_a.reset()
+    limit = Limit(capacity=2, period=60)
+    assert worker_a.spend("shared", limit, now=50.0).allowed
+    assert worker_b.spend("shared", limit, now=50.0).allowed
+    assert not worker_a.spend("shared", limit, now=50.0).allowed
+    worker_a.reset()
+
+
+def test_company_denial_does_not_spend_the_user_token():
+    limits = {LLM: {"user": Limit(5), "company": Limit(1)}}
+    limiter = RateLimiter(MemoryBackend(), limits)
+    alice = Identity(user_id=1, company="Acme")
+    bob = Identity(user_id=2, company="acme ")
+
+    assert limiter.hit(LLM, alice)[0].allowed
+    decision, level = limiter.hit(LLM, bob)  # same company, different spelling
+    assert not decision.allowed and level == "company"
+    # Bob's own bucket was refunded: spending from it alone leaves 4 of 5
+    decision, level = limiter.hit(LLM, Identity(user_id=2))
+    assert decision.allowed and decision.remaining == pytest.approx(4, abs=0.01)
+
+
+def test_routes_return_429_with_retry_after_per_scope(client, test_user, monkeypatch):
+    from app.main import app
+    app.dependency_overrides[get_current_user] = lambda: test_user
+    monkeypatch.setattr(rate_limiter, "limits", {
+        CRUD: {"user": Limit(2), "company": Limit(100)},
+        LLM: {"user": Limit(1), "company": Limit(100)},
+    })
+    monkeypatch.setattr(ratelimit, "_company_of", lambda user_id: "acme")
+    headers = {"Authorization": f"Bearer {create_access_token(test_user.id)}"}
+
+    first = client.get("/features/project/987654", headers=headers)
+    assert first.status_code == 200
+    assert first.headers["X-RateLimit-Remaining"] == "1"
+    assert client.get("/features/project/987654", headers=headers).status_code == 200
+    limited = client.get("/features/project/987654", headers=headers)
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "30"
+    assert limited.headers["X-RateLimit-Scope"] == "crud:user"
+
+    # The LLM scope has its own buckets; an invalid body still costs the token
+    assert client.post("/features/breakdown", json={}, headers=headers).status_code == 422
+    assert client.post("/features/breakdown", json={}, headers=headers).status_code == 429
+
+    # Anonymous callers are limited per address, separately from the user
+    assert client.get("/features/project/987654").status_code == 200
+
+
+def test_limiter_can_be_disabled(client, test_user, monkeypatch):
+    from app.main import app
+    app.dependency_overrides[get_current_user] = lambda: test_user
+    monkeypatch.setattr(rate_limiter, "limits", {CRUD: {"user": Limit(1), "company": Limit(1)}, LLM: {}})
+    monkeypatch.setattr(rate_limiter, "enabled", False)
+    for _ in range(3):
+        assert client.get("/features/project/987654").status_code == 200
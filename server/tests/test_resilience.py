@@ -0,0 +1,154 @@
+import asyncio
+import time
+from typing import List
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.core.fake_llm import FakeChatModel
+from app.core.instrumentation import llm_config
+from app.core.metrics import metrics
+from app.core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceededError,
+    ResilientChatModel,
+    set_deadline,
+)
+
+
+class ServiceUnavailable(Exception):
+    status_code = 503
+
+
+class ScriptedModel(BaseChatModel):
+    """Each call pops the next step: a number of seconds to sleep before answering, or an exception."""
+
+    steps: List = []
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _step(self):
+        self.calls += 1
+        return self.steps.pop(0) if self.steps else 0.0
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        step = self._step()
+        if isinstance(step, Exception):
+            raise step
+        time.sleep(step)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"answer {self.calls}"))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        step = self._step()
+        if isinstance(step, Exception):
+            raise step
+        await asyncio.sleep(step)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"answer {self.calls}"))])
+
+
+def _wrap(inner, **overrides):
+    options = dict(
+        inner=inner,
+        breaker=CircuitBreaker("test", failure_threshold=3, reset_seconds=0.2),
+        max_attempts=3,
+        attempt_timeout=0.2,
+        backoff_seconds=0.001,
+    )
+    options.update(overrides)
+    return ResilientChatModel(**options)
+
+
+def _ask(model, agent="resilience_test"):
+    return asyncio.run(model.ainvoke([HumanMessage(content="hi")], config=llm_config(agent)))
+
+
+def test_retryable_errors_and_timeouts_are_retried():
+    inner = ScriptedModel(steps=[ServiceUnavailable("busy"), 1.0, 0.0])  # 503, then a stuck call
+    before = metrics.get("llm.retries.resilience_test")
+
+    assert _ask(_wrap(inner)).content == "answer 3"
+    assert inner.calls == 3
+    assert metrics.get("llm.retries.resilience_test") - before == 2
+
+
+def test_other_errors_are_not_retried():
+    inner = ScriptedModel(steps=[ValueError("bad request")])
+    with pytest.raises(ValueError):
+        _ask(_wrap(inner))
+    assert inner.calls == 1
+
+
+def test_deadline_budget_caps_all_attempts():
+    inner = ScriptedModel(steps=[1.0, 1.0, 1.0])
+    model = _wrap(inner, attempt_timeout=5.0)
+
+    async def main():
+        set_deadline(0.1)
+        return await model.ainvoke([HumanMessage(content="hi")])
+
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(main())
+    assert time.perf_counter() - started < 0.5
+    assert inner.calls == 1  # no retry could have finished in time
+
+
+def test_hedge_after_p95_takes_the_first_answer():
+    for _ in range(20):
+        metrics.observe("llm.latency_ms", 20.0, agent="hedge_test", route="-")
+    inner = ScriptedModel(steps=[1.0, 0.0])  # the first call is stuck, the duplicate is fast
+    before = metrics.get("llm.hedges.won")
+
+    started = time.perf_counter()
+    answer = _ask(_wrap(inner, hedge=True, attempt_timeout=5.0), agent="hedge_test")
+    assert answer.content == "answer 2"
+    assert time.perf_counter() - started < 0.5
+    assert metrics.get("llm.hedges.won") - before == 1
+
+
+def test_circuit_opens_fails_fast_then_probes():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=0.2)
+    inner = ScriptedModel(steps=[ServiceUnavailable("down")] * 3)
+    model = _wrap(inner, breaker=breaker, max_attempts=3)
+
+    with pytest.raises(ServiceUnavailable):
+        _ask(model)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as rejected:
+        _ask(model)
+    assert inner.calls == 3  # rejected without calling the provider
+    assert 0 < rejected.value.retry_after <= 0.2
+
+    time.sleep(0.25)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert _ask(model).content == "answer 4"  # the probe succeeds
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_circuit_returns_503_with_retry_after(monkeypatch):
+    from app.main import app
+
+    breaker = CircuitBreaker("route_test", failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    model = _wrap(FakeChatModel(), breaker=breaker)
+    monkeypatch.setattr("app.agents.featureBreakdownLLM.get_chat_model", lambda temperature=0.2: model)
+
+    with TestClient(app) as client:
+        response = client.post("/features/breakdown", json={"feature_description": "Login"})
+    assert response.status_code == 503
+    assert 29 <= int(response.headers["Retry-After"]) <= 30
+
+
+def test_tools_are_bound_through_the_wrapper():
+    from app.agents.featureBreakdownLLM import FeatureBreakdown
+
+    structured = _wrap(FakeChatModel()).with_structured_output(FeatureBreakdown)
+    result = asyncio.run(structured.ainvoke("Break down: Login"))
+    assert isinstance(result, FeatureBreakdown)
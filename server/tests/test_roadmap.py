@@ -1,8 +1,8 @@
 def test_create_roadmap(client, monkeypatch):
-    def fake_generate_roadmap(requirements, tech_stack, best_practices, temperature):
+    async def fake_generate_roadmap(requirements, tech_stack, best_practices, temperature):
         return "DUMMY_ROADMAP"
 
-    monkeypatch.setattr("app.agents.roadmapLLM.generate_roadmap", fake_generate_roadmap)
+    monkeypatch.setattr("app.agents.roadmapLLM.agenerate_roadmap", fake_generate_roadmap)
 
     payload = {
         "requirements": "reqs",
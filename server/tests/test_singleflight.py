@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from app.agents import systemDesignLLM
+from app.core.metrics import metrics
+from app.core.singleflight import SingleFlight, call_key
+
+
+def test_identical_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight("test_share")
+    calls = []
+
+    async def upstream(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return {"value": value}
+
+    async def main():
+        return await asyncio.gather(
+            flight.do("a", lambda: upstream(1)),
+            flight.do("a", lambda: upstream(1)),
+            flight.do("b", lambda: upstream(2)),
+        )
+
+    first, second, other = asyncio.run(main())
+    assert calls == [1, 2]
+    assert first == second == {"value": 1} and first is not second  # followers get a copy
+    assert other == {"value": 2}
+    assert metrics.rates()["singleflight.test_share.coalesced_rate"] == pytest.approx(1 / 3, abs=1e-3)
+    assert flight.in_flight() == 0
+
+
+def test_errors_are_shared_and_not_remembered():
+    flight = SingleFlight("test_errors")
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        results = await asyncio.gather(
+            flight.do("k", failing), flight.do("k", failing), return_exceptions=True
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+        with pytest.raises(ValueError):
+            await flight.do("k", failing)  # a finished call is never reused
+
+    asyncio.run(main())
+    assert len(attempts) == 2
+
+
+def test_upstream_survives_until_the_last_caller_gives_up():
+    flight = SingleFlight("test_cancel")
+    started = []
+
+    async def upstream():
+        started.append(1)
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("k", upstream))
+        follower = asyncio.ensure_future(flight.do("k", upstream))
+        await asyncio.sleep(0.01)
+        leader.cancel()  # the leader's client disconnects
+        assert await follower == "done"
+
+        lonely = asyncio.ensure_future(flight.do("k2", upstream))
+        await asyncio.sleep(0.01)
+        lonely.cancel()
+        await asyncio.sleep(0.01)
+        assert flight.in_flight() == 0  # nobody waits: the upstream call was cancelled
+
+    asyncio.run(main())
+    assert len(started) == 2
+
+
+def test_call_key_ignores_how_defaults_are_passed():
+    async def agent(features, *, temperature=0.2):
+        pass
+
+    assert call_key(agent, ("x",), {}) == call_key(agent, (), {"features": "x", "temperature": 0.2})
+    assert call_key(agent, ("x",), {}) != call_key(agent, ("x",), {"temperature": 0.7})
+
+
+def test_system_design_requests_coalesce(fake_backend, monkeypatch):
+    monkeypatch.setattr(fake_backend, "fake_llm_ttft_ms", 50.0)
+    before = metrics.get("llm.calls.system_design")
+
+    async def main():
+        request = dict(features="Login, Billing", expected_users="10k", geography="EU", project_id=3)
+        return await asyncio.gather(*(systemDesignLLM.agenerate_system_design(**request) for _ in range(3)))
+
+    designs = asyncio.run(main())
+    assert metrics.get("llm.calls.system_design") - before == 1
+    assert designs[0] == designs[1] == designs[2]
@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from app.core.streaming import stream_events
+
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+ROADMAP_PAYLOAD = {
+    "requirements": "stream reqs",
+    "tech_stack": "stack",
+    "best_practices": "bp",
+    "temperature": 0.2,
+    "content": "unused",
+}
+
+
+def test_roadmap_streams_tokens_then_summary(client, monkeypatch):
+    monkeypatch.setattr(
+        "app.agents.roadmapLLM.get_chat_model",
+        lambda temperature=0.2: GenericFakeChatModel(messages=iter([AIMessage(content="# Features\n- Login")])),
+    )
+
+    r = client.post("/roadmap", json=ROADMAP_PAYLOAD, headers={"Accept": "text/event-stream"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert r.headers["X-Cache"] == "MISS"
+
+    events = parse_sse(r.text)
+    tokens = [data["text"] for name, data in events if name == "token"]
+    assert len(tokens) > 1  # delivered incrementally, not as one buffered document
+    assert "".join(tokens) == "# Features\n- Login"
+    name, summary = events[-1]
+    assert name == "summary"
+    assert summary["chars"] == len("# Features\n- Login")
+    assert summary["cache"] == "MISS"
+
+    # The completed stream populated the cache for the buffered endpoint too
+    r2 = client.post("/roadmap", json=ROADMAP_PAYLOAD)
+    assert r2.headers["X-Cache"] == "HIT"
+    assert r2.json() == {"roadmap": "# Features\n- Login"}
+
+
+def test_stream_error_is_reported_as_event(client, monkeypatch):
+    async def failing_stream(requirements, tech_stack, temperature):
+        yield "partial"
+        raise RuntimeError("upstream failed")
+
+    monkeypatch.setattr("app.agents.milestonesLLM.astream_milestones", failing_stream)
+    payload = {"requirements": "r", "tech_stack": "t", "temperature": 0.2, "content": ""}
+    r = client.post("/milestones", json=payload, headers={"Accept": "text/event-stream"})
+    events = parse_sse(r.text)
+    assert events[0] == ("token", {"text": "partial"})
+    assert events[-1] == ("error", {"detail": "upstream failed"})
+
+
+def test_disconnect_closes_upstream_and_skips_cache():
+    closed = []
+    completed = []
+
+    async def model_stream():
+        try:
+            for word in ["a", "b", "c"]:
+                yield word
+        finally:
+            closed.append(True)
+
+    async def consume_first_event():
+        events = stream_events(model_stream(), on_complete=completed.append)
+        first = await events.__anext__()
+        await events.aclose()  # what Starlette does when the client goes away
+        return first
+
+    first = asyncio.run(consume_first_event())
+    assert first.startswith("event: token")
+    assert closed == [True]
+    assert completed == []
+
+
+def test_streamed_document_is_persisted_after_the_request_session_closes(client, db_session, test_engine, monkeypatch):
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core import db as core_db
+    from app.core.cache import response_cache
+    from app.main import app
+    from app.models.roadmap import Roadmap
+
+    def closed_session_use(*args, **kwargs):
+        raise AssertionError("request session used after get_db closed it")
+
+    def get_db_like_production():
+        request_db = sessionmaker(bind=test_engine)()
+        try:
+            yield request_db
+        finally:
+            request_db.close()
+            for name in ("query", "add", "commit", "execute"):
+                setattr(request_db, name, closed_session_use)
+
+    app.dependency_overrides[core_db.get_db] = get_db_like_production
+    monkeypatch.setattr(
+        "app.agents.roadmapLLM.get_chat_model",
+        lambda temperature=0.2: GenericFakeChatModel(messages=iter([AIMessage(content="# Persisted stream")])),
+    )
+    payload = dict(ROADMAP_PAYLOAD, requirements="stream persisted reqs")
+
+    r = client.post("/roadmap", json=payload, headers={"Accept": "text/event-stream"})
+    assert [name for name, _ in parse_sse(r.text)][-1] == "summary"
+    row = db_session.query(Roadmap).filter(Roadmap.requirements == "stream persisted reqs").one()
+    assert row.content == "# Persisted stream"
+
+    response_cache.clear()  # next lookup has to come from the table
+    again = client.post("/roadmap", json=payload, headers={"Accept": "text/event-stream"})
+    assert again.headers["X-Cache"] == "HIT"
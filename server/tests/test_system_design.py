@@ -5,13 +5,13 @@ from app.main import app
 
 def test_system_design_creates_item_without_real_db(client, monkeypatch):
     # Mock LLM generator to return a simple object with type and uml_schema
-    def fake_generate_system_design(**kwargs):
+    async def fake_generate_system_design(**kwargs):
         return SimpleNamespace(
             type="class",
             uml_schema={"nodes": [], "relationships": []},
         )
 
-    monkeypatch.setattr("app.agents.systemDesignLLM.generate_system_design", fake_generate_system_design)
+    monkeypatch.setattr("app.agents.systemDesignLLM.agenerate_system_design", fake_generate_system_design)
 
     # Override DB with a fake session that returns a simple object on refresh
     class FakeSession:
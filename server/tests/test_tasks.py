@@ -1,8 +1,8 @@
 def test_create_tasks(client, monkeypatch):
-    def fake_generate_tasks(milestones, tech_stack, temperature):
+    async def fake_generate_tasks(milestones, tech_stack, temperature):
         return "DUMMY_TASKS"
 
-    monkeypatch.setattr("app.agents.tasksLLM.generate_tasks", fake_generate_tasks)
+    monkeypatch.setattr("app.agents.tasksLLM.agenerate_tasks", fake_generate_tasks)
 
     payload = {
         "milestones": "MS",
@@ -13,3 +13,94 @@ def test_create_tasks(client, monkeypatch):
     r = client.post("/tasks", json=payload)
     assert r.status_code == 200
     assert r.json() == {"tasks": "DUMMY_TASKS"}
+
+
+PLAN = """# Daily Task Plan
+
+## Authentication
+- Day 1: Design user table
+  - Subtasks: Columns, indexes
+- Day 2-3: Implement **login API**
+- Write API tests
+
+## Dashboard
+- Day 1:
+  - Create React layout
+"""
+
+
+def test_parse_task_plan():
+    from app.useage.plan_materializer import parse_task_plan
+
+    auth, dashboard = parse_task_plan(PLAN)
+    assert auth.name == "Authentication"
+    assert [(t.description, t.first_day, t.duration_days) for t in auth.tasks] == [
+        ("Design user table", 1, 1),
+        ("Implement login API", 2, 2),
+        ("Write API tests", 2, 2),  # no day of its own: runs with the task above
+    ]
+    assert auth.tasks[0].full_description() == "Design user table\n- Columns, indexes"
+    assert [(t.description, t.first_day) for t in dashboard.tasks] == [("Create React layout", 1)]
+
+
+def test_materialize_plan_in_one_transaction(client, db_session, test_user):
+    from sqlalchemy import event
+
+    from app.main import app
+    from app.models.feature import Feature
+    from app.models.project import Project
+    from app.models.taskassignment import TaskAssignment
+    from app.routes.user import get_current_user
+
+    project = Project(name="PlanProj", description="desc", owner_id=None)
+    db_session.add(project)
+    db_session.commit()
+    existing = Feature(project_id=project.id, name="authentication", status="done")
+    db_session.add(existing)
+    db_session.commit()
+    app.dependency_overrides[get_current_user] = lambda: test_user
+
+    statements = []
+    engine = db_session.get_bind()
+    listener = lambda conn, cursor, statement, params, context, executemany: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    many = [{"feature": "Reports", "breakdown": {
+        "frontend_tasks": [f"Chart {i}" for i in range(150)], "backend_tasks": [f"Endpoint {i}" for i in range(150)],
+        "database_tasks": [], "security_tasks": [], "other_tasks": [],
+    }}]
+    r = client.post("/task-assignments/from-plan", json={
+        "project_id": project.id, "user_id": 1, "plan": PLAN, "breakdowns": many, "start_date": "2026-03-02",
+    })
+    event.remove(engine, "before_cursor_execute", listener)
+    body = r.json()
+    # Created features have no milestone; they must still be readable
+    listed = client.get(f"/features/project/{project.id}")
+    one = client.get(f"/features/{body['features_created'][0]}")
+    app.dependency_overrides.pop(get_current_user, None)
+
+    assert r.status_code == 201, r.text
+    assert listed.status_code == 200, listed.text
+    assert sorted(f["id"] for f in listed.json()) == sorted([existing.id] + body["features_created"])
+    assert one.status_code == 200 and one.json()["milestone_id"] is None
+    assert body["features_reused"] == [existing.id]  # matched case-insensitively
+    assert len(body["features_created"]) == 2
+    assert body["tasks_created"] == 304
+    assert len([s for s in statements if s.startswith("INSERT INTO task_assignments")]) == 1
+
+    tasks = db_session.query(TaskAssignment).filter(TaskAssignment.project_id == project.id).order_by(TaskAssignment.id).all()
+    login = next(t for t in tasks if t.description == "Implement login API")
+    assert (login.feature_id, login.duration_days, login.eta.isoformat()) == (existing.id, 2, "2026-03-04T00:00:00")
+    assert {t.type for t in tasks if t.eta is None} == {"frontend", "backend"}
+
+
+def test_materialize_rejects_empty_plans(client, test_user):
+    from app.main import app
+    from app.routes.user import get_current_user
+
+    app.dependency_overrides[get_current_user] = lambda: test_user
+    missing = client.post("/task-assignments/from-plan", json={"project_id": 1, "user_id": 1})
+    empty = client.post("/task-assignments/from-plan", json={"project_id": 1, "user_id": 1, "plan": "# Daily Task Plan\n\nNothing."})
+    app.dependency_overrides.pop(get_current_user, None)
+
+    assert missing.status_code == 422
+    assert empty.status_code == 422
@@ -0,0 +1,145 @@
+import random
+import time
+
+import pytest
+
+from app.core.metrics import metrics
+from app.core.spatial import GridIndex
+from app.useage.uml_viewport import diagram_indexes
+
+
+def _brute_force(boxes, x0, y0, x1, y1):
+    return sorted(k for k, (x, y, w, h) in boxes.items() if x <= x1 and x + w >= x0 and y <= y1 and y + h >= y0)
+
+
+def test_grid_matches_brute_force_through_moves_and_removals():
+    rng = random.Random(3)
+    grid, boxes = GridIndex(cell_size=100), {}
+    for key in range(400):
+        boxes[key] = (rng.uniform(-2000, 2000), rng.uniform(-2000, 2000), rng.uniform(10, 300), rng.uniform(10, 150))
+        grid.insert(key, boxes[key])
+    for key in range(0, 400, 7):
+        boxes[key] = (rng.uniform(-2000, 2000), rng.uniform(-2000, 2000), 120, 80)
+        grid.insert(key, boxes[key])  # moved
+    for key in range(0, 400, 11):
+        del boxes[key]
+        grid.remove(key)
+
+    for _ in range(50):
+        x0, y0 = rng.uniform(-2500, 2500), rng.uniform(-2500, 2500)
+        x1, y1 = x0 + rng.uniform(0, 1500), y0 + rng.uniform(0, 1500)
+        assert sorted(grid.query(x0, y0, x1, y1)) == _brute_force(boxes, x0, y0, x1, y1)
+    assert sorted(grid.query(-1e6, -1e6, 1e6, 1e6)) == sorted(boxes)  # zoomed out: full scan
+    assert len(grid) == len(boxes)
+
+
+def _grid_diagram(side):
+    nodes = [
+        {"id": f"n{i}", "name": f"N{i}", "x": 200 * (i % side), "y": 150 * (i // side), "w": 120, "h": 80}
+        for i in range(side * side)
+    ]
+    relationships = [{"source": f"n{i}", "to": f"n{i + 1}", "type": "http"} for i in range(len(nodes) - 1)]
+    return {"nodes": nodes, "relationships": relationships}
+
+
+def test_viewport_returns_visible_nodes_and_touching_edges(client):
+    diagram_indexes.clear()
+    uml_id = client.post("/project-uml/add", json={"type": "system", "uml_schema": _grid_diagram(60)}).json()["id"]
+
+    r = client.get(f"/project-uml/{uml_id}/viewport", params={"x": 0, "y": 0, "w": 300, "h": 200})
+    assert r.status_code == 200
+    body = r.json()
+    assert [n["id"] for n in body["nodes"]] == ["n0", "n1", "n60", "n61"]
+    assert {(e["source"], e["to"]) for e in body["relationships"]} == {
+        ("n0", "n1"), ("n1", "n2"), ("n59", "n60"), ("n60", "n61"), ("n61", "n62"),
+    }
+    assert client.get("/project-uml/999999/viewport", params={"x": 0, "y": 0, "w": 1, "h": 1}).status_code == 404
+
+
+def test_index_is_cached_and_follows_patches(client):
+    diagram_indexes.clear()
+    uml_id = client.post("/project-uml/add", json={"type": "system", "uml_schema": _grid_diagram(30)}).json()["id"]
+    window = {"x": 0, "y": 0, "w": 150, "h": 100}
+    builds, hits, syncs = (metrics.get(f"uml_viewport.index_{m}") for m in ("builds", "hits", "syncs"))
+
+    assert [n["id"] for n in client.get(f"/project-uml/{uml_id}/viewport", params=window).json()["nodes"]] == ["n0"]
+    client.get(f"/project-uml/{uml_id}/viewport", params=window)
+    # Drag n899 into the window: only that node is re-filed
+    moved = client.patch(f"/project-uml/{uml_id}", json={"revision": 0, "operations": [
+        {"op": "replace", "path": "/nodes/899/x", "value": 10}, {"op": "replace", "path": "/nodes/899/y", "value": 10},
+    ]})
+    assert moved.status_code == 200
+    after = client.get(f"/project-uml/{uml_id}/viewport", params=window).json()
+    assert after["revision"] == 1
+    assert [n["id"] for n in after["nodes"]] == ["n0", "n899"]
+    assert after["nodes"][1]["x"] == 10
+
+    # Structural change through PUT: the index is synced, not rebuilt
+    smaller = _grid_diagram(2)
+    client.put(f"/project-uml/{uml_id}", json={"type": "system", "uml_schema": smaller})
+    assert len(client.get(f"/project-uml/{uml_id}/viewport", params={"x": 0, "y": 0, "w": 1000, "h": 1000}).json()["nodes"]) == 4
+
+    assert metrics.get("uml_viewport.index_builds") - builds == 1
+    assert metrics.get("uml_viewport.index_hits") - hits == 3  # every read after the first
+    assert metrics.get("uml_viewport.index_syncs") - syncs == 0
+
+
+def test_huge_and_infinite_boxes_in_the_grid():
+    grid = GridIndex(cell_size=256)
+    started = time.perf_counter()
+    grid.insert("huge", (0, 0, 2.56e7, 2.56e5))  # ~10^8 cells if filed cell by cell
+    grid.insert("small", (10, 10, 50, 50))
+    assert sorted(grid.query(0, 0, 100, 100)) == ["huge", "small"]
+    assert grid.query(1e6, 1e4, 1e6 + 10, 1e4 + 10) == ["huge"]
+    grid.remove("huge")
+    assert grid.query(1e6, 1e4, 1e6 + 10, 1e4 + 10) == []
+    assert time.perf_counter() - started < 1.0
+
+    with pytest.raises(ValueError):
+        grid.insert("inf", (0, 0, float("inf"), 10))
+    with pytest.raises(ValueError):
+        grid.query(0, 0, float("inf"), 10)
+    assert "inf" not in grid
+
+
+def test_out_of_range_geometry_is_rejected_with_422(client):
+    diagram_indexes.clear()
+    uml_id = client.post("/project-uml/add", json={"type": "system", "uml_schema": _grid_diagram(2)}).json()["id"]
+    client.get(f"/project-uml/{uml_id}/viewport", params={"x": 0, "y": 0, "w": 100, "h": 100})  # index built
+
+    huge = client.patch(f"/project-uml/{uml_id}", json={"revision": 0, "operations": [
+        {"op": "replace", "path": "/nodes/0/w", "value": 2.56e7},
+    ]})
+    # JSON has no infinity; 1e999 is how a client can still send one
+    infinite = client.patch(
+        f"/project-uml/{uml_id}",
+        content='{"revision": 0, "operations": [{"op": "replace", "path": "/nodes/0/w", "value": 1e999}]}',
+        headers={"Content-Type": "application/json"},
+    )
+    replaced = client.put(f"/project-uml/{uml_id}", json={"type": "system", "uml_schema": {
+        "nodes": [{"id": "a", "x": -2e9, "y": 0, "w": 10, "h": 10}], "relationships": [],
+    }})
+    created = client.post("/project-uml/add", json={"type": "system", "uml_schema": {
+        "nodes": [{"id": "a", "x": 0, "y": 0, "w": 10, "h": 2e9}], "relationships": [],
+    }})
+    assert [r.status_code for r in (huge, infinite, replaced, created)] == [422, 422, 422, 422]
+    assert client.get(f"/project-uml/{uml_id}").json()["revision"] == 0  # nothing was committed
+
+    for params in ({"x": 0, "y": 0, "w": 1e999, "h": 10}, {"x": "inf", "y": 0, "w": 10, "h": 10},
+                   {"x": 0, "y": 0, "w": 2.56e7, "h": 2.56e5}, {"x": "nan", "y": 0, "w": 10, "h": 10}):
+        assert client.get(f"/project-uml/{uml_id}/viewport", params=params).status_code == 422
+
+
+def test_stored_non_finite_geometry_does_not_break_the_viewport(client, db_session):
+    from app.models.projectuml import ProjectUML
+
+    diagram_indexes.clear()
+    document = _grid_diagram(2)
+    document["nodes"][0]["w"] = "Infinity"  # written before validation existed
+    item = ProjectUML(type="system", uml_schema=document, revision=0)
+    db_session.add(item)
+    db_session.commit()
+
+    r = client.get(f"/project-uml/{item.id}/viewport", params={"x": 0, "y": 0, "w": 1000, "h": 1000})
+    assert r.status_code == 200
+    assert "n0" not in [n["id"] for n in r.json()["nodes"]]  # treated as unplaced